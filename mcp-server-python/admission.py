@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+"""
+Admission Control for the MCP Database Server
+Orders database work by priority class, caps per-class concurrency and queue
+depth, and sheds load with a fast "busy, retry after N ms" error
+"""
+
+import asyncio
+import contextvars
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, List
+
+
+# Futures started by the admitted call that is running in this context
+_call_futures = contextvars.ContextVar("admission_call_futures", default=None)
+
+
+def hold_slot_until(future: asyncio.Future):
+    """Keep the current call's slot until future is done, even if the caller stops waiting for it"""
+    futures = _call_futures.get()
+    if futures is not None:
+        futures.append(future)
+
+
+class ServerBusyError(Exception):
+    """Raised when a priority class queue is full"""
+
+    def __init__(self, message: str, retry_after_ms: int):
+        super().__init__(message)
+        self.retry_after_ms = retry_after_ms
+
+
+class PriorityClass:
+    """Limits and live counters for one priority class"""
+
+    def __init__(self, name: str, rank: int, max_concurrency: int, max_queue: int):
+        self.name = name
+        # Lower rank is served first
+        self.rank = rank
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.running = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.shed = 0
+        # Exponentially weighted averages, in seconds
+        self.avg_service = 0.0
+        self.avg_wait = 0.0
+
+    def record(self, wait: float, service: float):
+        weight = 0.2 if self.admitted > 1 else 1.0
+        self.avg_wait += weight * (wait - self.avg_wait)
+        self.avg_service += weight * (service - self.avg_service)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": len(self.waiters),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "avg_wait_ms": round(self.avg_wait * 1000, 1),
+            "avg_service_ms": round(self.avg_service * 1000, 1)
+        }
+
+
+class AdmissionController:
+    """Admits database work by priority, never running more than capacity calls at once"""
+
+    def __init__(self, capacity: int, classes: List[PriorityClass]):
+        self.capacity = capacity
+        self.running = 0
+        self.classes: Dict[str, PriorityClass] = {cls.name: cls for cls in classes}
+        self._by_rank = sorted(classes, key=lambda cls: cls.rank)
+
+    def _can_start(self, cls: PriorityClass) -> bool:
+        return self.running < self.capacity and cls.running < cls.max_concurrency
+
+    def _grant(self, cls: PriorityClass):
+        self.running += 1
+        cls.running += 1
+        cls.admitted += 1
+
+    def _dispatch(self):
+        """Hand free slots to the highest priority waiters that are within their class limit"""
+        while self.running < self.capacity:
+            for cls in self._by_rank:
+                # Drop waiters whose callers gave up
+                while cls.waiters and cls.waiters[0].done():
+                    cls.waiters.popleft()
+                if cls.waiters and cls.running < cls.max_concurrency:
+                    self._grant(cls)
+                    cls.waiters.popleft().set_result(None)
+                    break
+            else:
+                return
+
+    def retry_after_ms(self, cls: PriorityClass) -> int:
+        """Estimate when a slot in this class is likely to free up"""
+        backlog = (len(cls.waiters) + 1) / max(1, cls.max_concurrency)
+        return max(50, int(cls.avg_service * backlog * 1000))
+
+    @asynccontextmanager
+    async def admit(self, priority: str):
+        """Wait for a slot in the given priority class, or fail fast when its queue is full"""
+        cls = self.classes.get(priority)
+        if cls is None:
+            raise ValueError(f"Unknown priority '{priority}'. Use one of: {', '.join(self.classes)}")
+
+        queued_at = time.monotonic()
+        # Queue behind waiters of equal or higher priority so ordering is kept
+        ahead = any(other.waiters for other in self._by_rank if other.rank <= cls.rank)
+        if not ahead and self._can_start(cls):
+            self._grant(cls)
+        else:
+            if len(cls.waiters) >= cls.max_queue:
+                cls.shed += 1
+                retry_after = self.retry_after_ms(cls)
+                raise ServerBusyError(
+                    f"Server busy: the {cls.name} queue is full ({len(cls.waiters)} waiting). "
+                    f"Retry after {retry_after} ms.",
+                    retry_after
+                )
+            waiter = asyncio.get_running_loop().create_future()
+            cls.waiters.append(waiter)
+            self._dispatch()
+            try:
+                await waiter
+            except BaseException:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was granted just as the caller gave up - pass it on
+                    self._release(cls)
+                elif waiter in cls.waiters:
+                    cls.waiters.remove(waiter)
+                raise
+
+        started_at = time.monotonic()
+        futures: List[asyncio.Future] = []
+        token = _call_futures.set(futures)
+        try:
+            yield started_at - queued_at
+        finally:
+            _call_futures.reset(token)
+            unfinished = [future for future in futures if not future.done()]
+            if unfinished:
+                # The caller timed out or was cancelled while a worker still runs its
+                # statement; that worker keeps a connection busy, so it keeps the slot too
+                self._release_when_done(cls, started_at - queued_at, started_at, unfinished)
+            else:
+                cls.record(started_at - queued_at, time.monotonic() - started_at)
+                self._release(cls)
+
+    def _release_when_done(self, cls: PriorityClass, wait: float, started_at: float,
+                           futures: List[asyncio.Future]):
+        remaining = len(futures)
+
+        def on_done(_):
+            nonlocal remaining
+            remaining -= 1
+            if remaining == 0:
+                cls.record(wait, time.monotonic() - started_at)
+                self._release(cls)
+
+        for future in futures:
+            future.add_done_callback(on_done)
+
+    def _release(self, cls: PriorityClass):
+        self.running -= 1
+        cls.running -= 1
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "running": self.running,
+            "classes": {name: cls.stats() for name, cls in self.classes.items()}
+        }
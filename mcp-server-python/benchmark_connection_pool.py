@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+"""
+Connection Pool Benchmark
+Measures DatabaseService throughput as concurrent tool calls increase, using
+stand-in connections with a fixed server-side latency so no database is needed.
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from server import DatabaseService
+
+
+QUERY_LATENCY = 0.05  # seconds each stand-in statement "runs" on the server
+CALLS = 80
+
+
+class StandInCursor:
+    """Cursor that sleeps for the configured latency and returns one row"""
+
+    def __init__(self):
+        self.description = None
+        self.rowcount = -1
+        self.rows = []
+
+    def execute(self, query, params=None):
+        time.sleep(QUERY_LATENCY)
+        self.description = [("value", int, None, None, None, None, None)]
+        self.rows = [(1,)]
+        return self
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def nextset(self):
+        return False
+
+    def close(self):
+        pass
+
+
+class StandInConnection:
+    def cursor(self):
+        return StandInCursor()
+
+    def close(self):
+        pass
+
+
+def stand_in_connect(conn_str, timeout=None, autocommit=False):
+    return StandInConnection()
+
+
+def run(pool_size: int, concurrency: int) -> float:
+    """Return tool calls per second for the given pool size and client concurrency"""
+    service = DatabaseService(connection_factory=stand_in_connect)
+    service.pool_min_size = 1
+    service.pool_max_size = pool_size
+    service.connect("benchmark", "benchmark")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda _: service.execute_query("SELECT 1 AS value"), range(CALLS)))
+    elapsed = time.perf_counter() - start
+
+    service.disconnect()
+    return CALLS / elapsed
+
+
+def main():
+    print(f"📊 {CALLS} execute_query calls, {QUERY_LATENCY * 1000:.0f} ms per statement\n")
+    print(f"{'pool size':>10} {'concurrency':>12} {'calls/sec':>10}")
+
+    # A pool of 1 behaves like the old single shared connection
+    for pool_size, concurrency in [(1, 1), (1, 8), (2, 8), (4, 8), (8, 8), (16, 16)]:
+        throughput = run(pool_size, concurrency)
+        print(f"{pool_size:>10} {concurrency:>12} {throughput:>10.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
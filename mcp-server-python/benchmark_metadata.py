@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+"""
+Metadata Round Trip Benchmark
+Compares describe_table and get_related_tables as single multi-statement
+batches with the previous one-statement-per-round-trip implementation, using
+stand-in connections with a fixed network round trip time so no database is
+needed.
+
+Usage: python benchmark_metadata.py [rtt_ms] [related_tables]
+"""
+
+import sys
+import time
+
+from server import (
+    DatabaseService,
+    INCOMING_FOREIGN_KEYS_SQL,
+    OUTGOING_FOREIGN_KEYS_SQL,
+    TABLE_COLUMNS_SQL,
+    TABLE_INDEXES_SQL,
+    TABLE_PARAMETERS_SQL
+)
+
+
+ROUND_TRIP = 0.04  # seconds per execute, e.g. a server in another region
+RELATED_TABLES = 8
+CALLS = 5
+
+
+class StandInCursor:
+    """Cursor that sleeps one round trip per execute and returns canned result sets"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self.result_sets = []
+
+    def execute(self, query, params=None):
+        time.sleep(ROUND_TRIP)
+        self.connection.round_trips += 1
+        # One result set per metadata statement in the batch, in batch order
+        statements = [
+            (TABLE_COLUMNS_SQL, ["COLUMN_NAME", "DATA_TYPE"], [("ID", "int"), ("NAME", "varchar")]),
+            (TABLE_INDEXES_SQL, ["index_name", "column_name"], [("PK_T", "ID")]),
+            (OUTGOING_FOREIGN_KEYS_SQL, self.relation_columns("referenced"), self.relations()),
+            (INCOMING_FOREIGN_KEYS_SQL, self.relation_columns("referencing"), self.relations())
+        ]
+        self.result_sets = [(columns, rows) for sql, columns, rows in statements if sql in query]
+        if "COUNT(*)" in query:
+            self.result_sets = [(["row_count"], [(1000,)])]
+        if not self.result_sets:
+            self.result_sets = [(["value"], [(1,)])]
+        self.load()
+        return self
+
+    @staticmethod
+    def relation_columns(side: str):
+        return [f"{side}_schema", f"{side}_table", "referencing_column", "referenced_column",
+                "foreign_key_name", "relationship_type", "row_count"]
+
+    @staticmethod
+    def relations():
+        half = RELATED_TABLES // 2
+        return [("dbo", f"T{i}", "ID", "T_ID", f"FK_{i}", "", 1000) for i in range(half)]
+
+    def load(self):
+        columns, self.rows = self.result_sets[0]
+        self.description = [(name, str, None, None, None, None, None) for name in columns]
+
+    def fetchmany(self, size=1):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def nextset(self):
+        self.result_sets = self.result_sets[1:]
+        if not self.result_sets:
+            self.description = None
+            return False
+        self.load()
+        return True
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class StandInConnection:
+    def __init__(self):
+        self.round_trips = 0
+
+    def cursor(self):
+        return StandInCursor(self)
+
+    def close(self):
+        pass
+
+
+connections = []
+
+
+def stand_in_connect(conn_str, timeout=None, autocommit=False):
+    connection = StandInConnection()
+    connections.append(connection)
+    return connection
+
+
+def serial_metadata(service: DatabaseService, table_name: str, schema: str = "dbo"):
+    """The previous implementation: one statement per round trip, then a COUNT(*) per related table"""
+    params = [schema, table_name]
+
+    def run_statement(statement: str):
+        return service.execute_result_sets(f"{TABLE_PARAMETERS_SQL}\n{statement}", params)[0]
+
+    # describe_table, which get_related_tables also called first
+    for _ in range(2):
+        run_statement(TABLE_COLUMNS_SQL)
+        run_statement(TABLE_INDEXES_SQL)
+
+    related = run_statement(OUTGOING_FOREIGN_KEYS_SQL) + run_statement(INCOMING_FOREIGN_KEYS_SQL)
+    for relation in related:
+        table = relation.get("referenced_table") or relation.get("referencing_table")
+        service.execute_result_sets(f"SELECT COUNT(*) AS row_count FROM dbo.{table}")
+
+
+def batched_metadata(service: DatabaseService, table_name: str, schema: str = "dbo"):
+    service.describe_table(table_name, schema)
+    service.get_related_tables(table_name, schema)
+
+
+def run(func) -> tuple:
+    """Return seconds and round trips per describe_table + get_related_tables pair"""
+    service = DatabaseService(connection_factory=stand_in_connect)
+    # Every call should reach the stand-in server
+    service.query_cache = None
+    service.connect("benchmark", "benchmark")
+    before = sum(connection.round_trips for connection in connections)
+
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        func(service, "UM_AUTH")
+    elapsed = time.perf_counter() - start
+
+    round_trips = sum(connection.round_trips for connection in connections) - before
+    service.disconnect()
+    return elapsed / CALLS, round_trips / CALLS
+
+
+def main():
+    global ROUND_TRIP, RELATED_TABLES
+    if len(sys.argv) > 1:
+        ROUND_TRIP = float(sys.argv[1]) / 1000
+    if len(sys.argv) > 2:
+        RELATED_TABLES = int(sys.argv[2])
+
+    print(f"🌐 {ROUND_TRIP * 1000:.0f} ms round trip, {RELATED_TABLES} related tables, "
+          f"describe_table + get_related_tables\n")
+    print(f"{'implementation':<28} {'round trips':>12} {'ms/pair':>10}")
+    for label, func in [("one statement per trip", serial_metadata), ("multi-statement batches", batched_metadata)]:
+        seconds, round_trips = run(func)
+        print(f"{label:<28} {round_trips:>12.0f} {seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
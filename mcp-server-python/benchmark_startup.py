@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""
+Startup Benchmark
+Measures how long the MCP server takes to answer initialize and tools/list while
+its auto-connect target is slow or unreachable.
+
+Usage: python benchmark_startup.py [db_server] [db_name]
+The default server is a non-routable address, so the ODBC login waits for its
+full timeout. Before background auto-connect, initialize was only answered after
+that timeout (about 30 seconds).
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+
+async def read_response(process, request_id: int, timeout: float) -> dict:
+    """Read stdout lines until the JSON-RPC response with the given id arrives"""
+    while True:
+        line = await asyncio.wait_for(process.stdout.readline(), timeout=timeout)
+        if not line:
+            raise RuntimeError("Server exited before responding")
+        try:
+            message = json.loads(line.decode())
+        except ValueError:
+            # Plain log output on stdout
+            continue
+        if message.get("id") == request_id:
+            return message
+
+
+async def send(process, message: dict):
+    process.stdin.write((json.dumps(message) + "\n").encode())
+    await process.stdin.drain()
+
+
+async def main():
+    db_server = sys.argv[1] if len(sys.argv) > 1 else "10.255.255.1"
+    db_name = sys.argv[2] if len(sys.argv) > 2 else "Ahs_Bit_Red_QA_8170"
+    server_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+
+    print(f"⏱️  Starting server with auto-connect to {db_name} on {db_server}")
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, server_path,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+        env={**os.environ, "DB_SERVER": db_server, "DB_NAME": db_name}
+    )
+
+    try:
+        await send(process, {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "initialize",
+            "params": {
+                "protocolVersion": "2024-11-05",
+                "capabilities": {},
+                "clientInfo": {"name": "benchmark-startup", "version": "1.0.0"}
+            }
+        })
+        await read_response(process, 1, timeout=120)
+        initialized = time.perf_counter() - start
+        print(f"✅ initialize answered after {initialized * 1000:.0f} ms")
+
+        await send(process, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        await send(process, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        await read_response(process, 2, timeout=120)
+        listed = time.perf_counter() - start
+        print(f"✅ tools/list answered after {listed * 1000:.0f} ms")
+
+        await send(process, {
+            "jsonrpc": "2.0",
+            "id": 3,
+            "method": "tools/call",
+            "params": {"name": "server_diagnostics", "arguments": {}}
+        })
+        diagnostics = await read_response(process, 3, timeout=120)
+        status = json.loads(diagnostics["result"]["content"][0]["text"])["startup"]
+        print(f"📋 Auto-connect status: {status['auto_connect']}")
+    finally:
+        process.kill()
+        await process.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+"""
+Call Cancellation for the MCP Database Server
+Tracks the cursors each tool call has open so a cancelled or timed-out call
+can stop its SQL statements on the server with cursor.cancel()
+"""
+
+import threading
+from typing import Any, List, Optional, Tuple
+
+
+class CallCancelledError(Exception):
+    """Raised when a cancelled call tries to start another statement"""
+
+
+class CallScope:
+    """The cursors one tool call currently has open"""
+
+    def __init__(self, name: str):
+        self.name = name
+        # (connection, cursor) pairs, so a checkout can forget its cursors before release
+        self._cursors: List[Tuple[Any, Any]] = []
+        # Scopes of sub-calls (e.g. execute_batch items) cancelled along with this one
+        self._children: List["CallScope"] = []
+        self._lock = threading.Lock()
+        self.cancel_reason: Optional[str] = None
+        self.cancelled_cursors = 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_reason is not None
+
+    def child(self, name: str) -> "CallScope":
+        """A scope for part of this call that can also be cancelled on its own"""
+        scope = CallScope(name)
+        with self._lock:
+            scope.cancel_reason = self.cancel_reason
+            self._children.append(scope)
+        return scope
+
+    def track(self, connection: Any, cursor: Any):
+        """Register a cursor opened on connection; refuse new statements once cancelled"""
+        with self._lock:
+            if self.cancel_reason is not None:
+                raise CallCancelledError(f"{self.name} was cancelled ({self.cancel_reason})")
+            self._cursors.append((connection, cursor))
+
+    def forget(self, connection: Any = None, cursor: Any = None):
+        """Stop tracking the cursors of a connection (or one cursor) before it leaves the call"""
+        with self._lock:
+            self._cursors = [
+                (conn, cur) for conn, cur in self._cursors
+                if not ((connection is not None and conn is connection) or (cursor is not None and cur is cursor))
+            ]
+
+    def cancel(self, reason: str) -> int:
+        """Cancel every tracked cursor; statements they are running fail with SQLSTATE HY008"""
+        with self._lock:
+            if self.cancel_reason is None:
+                self.cancel_reason = reason
+            cursors = [cursor for _, cursor in self._cursors]
+            children = list(self._children)
+
+        cancelled = sum(child.cancel(reason) for child in children)
+        for cursor in cursors:
+            try:
+                cursor.cancel()
+                cancelled += 1
+            except Exception:
+                # Already closed or finished
+                pass
+        self.cancelled_cursors += cancelled
+        return cancelled
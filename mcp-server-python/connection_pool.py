@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+
+"""
+Connection Pool for the MCP Database Server
+Thread-safe pool of database connections shared by all DatabaseService methods
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available before the checkout timeout"""
+
+
+class PooledConnection:
+    """A database connection owned by the pool, plus its health state"""
+
+    def __init__(self, connection: Any):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+        self.last_ping_at: Optional[float] = None
+        self.checkout_count = 0
+        # idle | in_use | broken | closed
+        self.state = "idle"
+        self.last_error: Optional[str] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.state not in ("broken", "closed")
+
+    def idle_seconds(self, now: float = None) -> float:
+        """Seconds since the connection was last returned to the pool"""
+        return (now if now is not None else time.monotonic()) - self.last_used_at
+
+    def mark_broken(self, error: Exception = None):
+        """Flag the connection so the pool discards it instead of reusing it"""
+        self.state = "broken"
+        if error is not None:
+            self.last_error = str(error)
+
+    def close(self):
+        """Close the underlying connection, ignoring errors from dead sockets"""
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+        self.state = "closed"
+
+
+class PinnedSession:
+    """A pooled connection reserved for one client session until it ends or idles out"""
+
+    def __init__(self, session_id: str, pooled: PooledConnection, idle_ttl: float):
+        self.session_id = session_id
+        self.pooled = pooled
+        self.idle_ttl = idle_ttl
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+        self.statements = 0
+        # One statement at a time on the pinned connection
+        self.lock = threading.Lock()
+
+    def touch(self):
+        self.last_used_at = time.monotonic()
+        self.statements += 1
+
+    def expired(self, now: float = None) -> bool:
+        now = now if now is not None else time.monotonic()
+        return not self.lock.locked() and now - self.last_used_at > self.idle_ttl
+
+    def describe(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "sessionId": self.session_id,
+            "idleTtlSeconds": self.idle_ttl,
+            "idleSeconds": round(now - self.last_used_at, 1),
+            "ageSeconds": round(now - self.created_at, 1),
+            "statements": self.statements
+        }
+
+
+class PagedCursor:
+    """An open result set on a checked-out connection, read one page at a time"""
+
+    def __init__(self, token: str, pool: "ConnectionPool", pooled: PooledConnection, cursor: Any,
+                 columns: List[str], page_size: int, idle_ttl: float):
+        self.token = token
+        self.pool = pool
+        self.pooled = pooled
+        self.cursor = cursor
+        self.columns = columns
+        # Default size for later pages
+        self.page_size = page_size
+        self.idle_ttl = idle_ttl
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+        self.pages = 0
+        self.rows_fetched = 0
+        # Row read ahead to learn whether another page exists
+        self._lookahead: List[Any] = []
+        self.exhausted = False
+        # One page at a time on the cursor
+        self.lock = threading.Lock()
+
+    def fetch_page(self, size: int) -> List[Any]:
+        """Return the next page of rows; at most size + 1 rows are held in memory"""
+        rows = self._lookahead + self.cursor.fetchmany(size + 1 - len(self._lookahead))
+        self._lookahead = rows[size:]
+        self.exhausted = not self._lookahead
+        page = rows[:size]
+        self.pages += 1
+        self.rows_fetched += len(page)
+        self.last_used_at = time.monotonic()
+        return page
+
+    def expired(self, now: float = None) -> bool:
+        now = now if now is not None else time.monotonic()
+        return not self.lock.locked() and now - self.last_used_at > self.idle_ttl
+
+    def close(self):
+        """Cancel any unread rows on the server and return the connection to the pool"""
+        try:
+            if not self.exhausted:
+                self.cursor.cancel()
+            self.cursor.close()
+        except Exception as e:
+            self.pooled.mark_broken(e)
+        self.pool.release(self.pooled)
+
+    def describe(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "idleTtlSeconds": self.idle_ttl,
+            "idleSeconds": round(now - self.last_used_at, 1),
+            "ageSeconds": round(now - self.created_at, 1),
+            "pageSize": self.page_size,
+            "pages": self.pages,
+            "rowsFetched": self.rows_fetched
+        }
+
+
+class ConnectionPool:
+    """Bounded pool with checkout timeouts, idle eviction and health tracking"""
+
+    def __init__(self, connect: Callable[[], Any], min_size: int = 1, max_size: int = 10,
+                 checkout_timeout: float = 30.0, idle_timeout: float = 300.0,
+                 is_disconnect: Callable[[Exception], bool] = None):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        if min_size < 0 or min_size > max_size:
+            raise ValueError("min_size must be between 0 and max_size")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.idle_timeout = idle_timeout
+        # Classifies errors that prove the connection is dead, skipping the ping
+        self._is_disconnect = is_disconnect
+
+        # Idle connections, least recently used on the left
+        self._idle: Deque[PooledConnection] = deque()
+        self._in_use: Set[PooledConnection] = set()
+        # Open connections plus connections currently being opened
+        self._size = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+        # Counters reported by stats()
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._created = 0
+        self._evicted = 0
+        self._discarded = 0
+        self._pings = 0
+        self._ping_failures = 0
+        self._ping_total = 0.0
+        self._ping_last = 0.0
+        self._ping_max = 0.0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def open(self):
+        """Open the minimum number of connections up front"""
+        opened = []
+        try:
+            for _ in range(self.min_size):
+                opened.append(PooledConnection(self._connect()))
+        except Exception:
+            for pooled in opened:
+                pooled.close()
+            raise
+
+        with self._lock:
+            self._idle.extend(opened)
+            self._size += len(opened)
+            self._created += len(opened)
+
+    def acquire(self, timeout: float = None) -> PooledConnection:
+        """Check out a connection, opening a new one if the pool is below max_size"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+
+        with self._available:
+            while True:
+                if self._closed:
+                    raise Exception("Connection pool is closed")
+
+                # Reuse the most recently returned connection so cold ones age out
+                while self._idle:
+                    pooled = self._idle.pop()
+                    if pooled.healthy:
+                        return self._checkout_locked(pooled)
+                    self._size -= 1
+                    self._discarded += 1
+                    pooled.close()
+
+                if self._size < self.max_size:
+                    # Reserve the slot now, open the connection outside the lock
+                    self._size += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after {timeout:.1f}s waiting for a database connection "
+                        f"({self.max_size} of {self.max_size} in use)"
+                    )
+                if not waited:
+                    self._waits += 1
+                    waited = True
+                self._available.wait(remaining)
+
+        try:
+            pooled = PooledConnection(self._connect())
+        except Exception:
+            with self._available:
+                self._size -= 1
+                self._available.notify()
+            raise
+
+        with self._lock:
+            self._created += 1
+            return self._checkout_locked(pooled)
+
+    def _checkout_locked(self, pooled: PooledConnection) -> PooledConnection:
+        pooled.state = "in_use"
+        pooled.checkout_count += 1
+        self._in_use.add(pooled)
+        self._checkouts += 1
+        return pooled
+
+    def release(self, pooled: PooledConnection, discard: bool = False):
+        """Return a connection to the pool, closing it if it is broken or unwanted"""
+        to_close = []
+
+        with self._available:
+            self._in_use.discard(pooled)
+            if discard or not pooled.healthy or self._closed:
+                self._size -= 1
+                self._discarded += 1
+                to_close.append(pooled)
+            else:
+                pooled.state = "idle"
+                pooled.last_used_at = time.monotonic()
+                self._idle.append(pooled)
+            to_close.extend(self._collect_idle_locked())
+            self._available.notify()
+
+        for stale in to_close:
+            stale.close()
+
+    def _collect_idle_locked(self):
+        """Remove connections idle longer than idle_timeout, keeping min_size open"""
+        evicted = []
+        now = time.monotonic()
+        while (self._idle and self._size > self.min_size
+               and self._idle[0].idle_seconds(now) > self.idle_timeout):
+            evicted.append(self._idle.popleft())
+            self._size -= 1
+            self._evicted += 1
+        return evicted
+
+    def evict_idle(self) -> int:
+        """Close connections that have been idle longer than idle_timeout"""
+        with self._lock:
+            evicted = self._collect_idle_locked()
+        for pooled in evicted:
+            pooled.close()
+        return len(evicted)
+
+    def discard_idle(self, created_before: float) -> int:
+        """Close idle connections opened before created_before, e.g. every one that predates a failover"""
+        with self._available:
+            stale = [pooled for pooled in self._idle if pooled.created_at <= created_before]
+            if stale:
+                self._idle = deque(pooled for pooled in self._idle if pooled.created_at > created_before)
+                self._size -= len(stale)
+                self._discarded += len(stale)
+                self._available.notify_all()
+        for pooled in stale:
+            pooled.close()
+        return len(stale)
+
+    def ping(self, pooled: PooledConnection) -> float:
+        """Run a cheap round trip on the connection and return its latency in seconds"""
+        start = time.perf_counter()
+        try:
+            cursor = pooled.connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+        except Exception as e:
+            pooled.mark_broken(e)
+            with self._lock:
+                self._pings += 1
+                self._ping_failures += 1
+            raise
+
+        latency = time.perf_counter() - start
+        pooled.last_ping_at = time.monotonic()
+        with self._lock:
+            self._pings += 1
+            self._ping_total += latency
+            self._ping_last = latency
+            self._ping_max = max(self._ping_max, latency)
+        return latency
+
+    def ping_idle(self, idle_after: float) -> int:
+        """Pre-ping connections idle (and unpinged) for idle_after seconds, discarding dead ones"""
+        now = time.monotonic()
+        with self._lock:
+            if self._closed:
+                return 0
+            due = [
+                pooled for pooled in self._idle
+                if now - max(pooled.last_used_at, pooled.last_ping_at or 0) >= idle_after
+            ]
+            # Take them out of circulation while they are pinged
+            for pooled in due:
+                self._idle.remove(pooled)
+                pooled.state = "in_use"
+                self._in_use.add(pooled)
+
+        failures = 0
+        for pooled in due:
+            try:
+                self.ping(pooled)
+            except Exception:
+                failures += 1
+
+        to_close = []
+        with self._available:
+            for pooled in due:
+                self._in_use.discard(pooled)
+                if pooled.healthy and not self._closed:
+                    pooled.state = "idle"
+                    self._idle.append(pooled)
+                else:
+                    self._size -= 1
+                    self._discarded += 1
+                    to_close.append(pooled)
+            # Keep least recently used on the left for idle eviction
+            self._idle = deque(sorted(self._idle, key=lambda pooled: pooled.last_used_at))
+            self._available.notify_all()
+
+        for pooled in to_close:
+            pooled.close()
+        return failures
+
+    def fill_to_min(self) -> int:
+        """Open connections until the pool is back at min_size"""
+        opened = 0
+        while True:
+            with self._lock:
+                if self._closed or self._size >= self.min_size:
+                    return opened
+                self._size += 1
+
+            try:
+                pooled = PooledConnection(self._connect())
+            except Exception:
+                with self._available:
+                    self._size -= 1
+                raise
+
+            with self._available:
+                self._created += 1
+                if self._closed:
+                    self._size -= 1
+                    to_close = pooled
+                else:
+                    self._idle.append(pooled)
+                    to_close = None
+                self._available.notify()
+            if to_close is not None:
+                to_close.close()
+                return opened
+            opened += 1
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """Check out a connection for the duration of a with block"""
+        pooled = self.acquire(timeout)
+        try:
+            yield pooled.connection
+        except Exception as e:
+            # A failed statement may mean a dead connection - verify before reuse
+            if self._is_disconnect is not None and self._is_disconnect(e):
+                pooled.mark_broken(e)
+                # A lost server (failover, restart) killed the idle connections too; drop
+                # them so a retry opens a fresh connection instead of popping a dead one
+                self.discard_idle(time.monotonic())
+            else:
+                pooled.last_error = str(e)
+                try:
+                    self.ping(pooled)
+                except Exception:
+                    pass
+            raise
+        finally:
+            self.release(pooled)
+
+    def close(self):
+        """Close idle connections now and in-use connections as they are returned"""
+        with self._available:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._available.notify_all()
+
+        for pooled in idle:
+            pooled.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool size, usage and health counters"""
+        with self._lock:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "evicted": self._evicted,
+                "discarded": self._discarded,
+                "closed": self._closed,
+                "ping": {
+                    "count": self._pings,
+                    "failures": self._ping_failures,
+                    "last_ms": round(self._ping_last * 1000, 3),
+                    "mean_ms": round(self._ping_total / (self._pings - self._ping_failures) * 1000, 3)
+                    if self._pings > self._ping_failures else 0.0,
+                    "max_ms": round(self._ping_max * 1000, 3)
+                }
+            }
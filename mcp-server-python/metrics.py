@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+"""
+Runtime Metrics for the MCP Database Server
+In-memory measurements reported by the server_diagnostics and query_stats tools
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a fixed-interval sleep"""
+
+    def __init__(self, interval: float = 0.1, window: int = 600, stall_threshold: float = 0.1):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        # Recent samples, used for the windowed percentile
+        self._recent: Deque[float] = deque(maxlen=window)
+        self._samples = 0
+        self._total = 0.0
+        self._max = 0.0
+        self._last = 0.0
+        self._stalls = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        """Start sampling on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - start - self.interval))
+
+    def record(self, lag: float):
+        self._recent.append(lag)
+        self._samples += 1
+        self._total += lag
+        self._last = lag
+        self._max = max(self._max, lag)
+        if lag >= self.stall_threshold:
+            self._stalls += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Lag statistics in milliseconds"""
+        recent = sorted(self._recent)
+        p99 = recent[min(len(recent) - 1, int(len(recent) * 0.99))] if recent else 0.0
+        return {
+            "interval_ms": self.interval * 1000,
+            "samples": self._samples,
+            "last_ms": round(self._last * 1000, 3),
+            "mean_ms": round(self._total / self._samples * 1000, 3) if self._samples else 0.0,
+            "max_ms": round(self._max * 1000, 3),
+            "recent_p99_ms": round(p99 * 1000, 3),
+            "stalls": self._stalls,
+            "stall_threshold_ms": self.stall_threshold * 1000
+        }
+
+
+class LatencyHistogram:
+    """Streaming histogram over log-spaced buckets, so percentiles cost no per-sample memory"""
+
+    # Bucket i holds values up to MIN_MS * GROWTH ** i, so percentiles overstate by at most 8%
+    MIN_MS = 0.01
+    GROWTH = 1.08
+
+    def __init__(self):
+        self._buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value_ms: float):
+        index = 0
+        if value_ms > self.MIN_MS:
+            index = math.ceil(math.log(value_ms / self.MIN_MS) / math.log(self.GROWTH))
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of samples"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * fraction))
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                return min(self.MIN_MS * self.GROWTH ** index, self.max)
+        return self.max
+
+
+class QueryStatsEntry:
+    """Counters for one query fingerprint"""
+
+    def __init__(self, fingerprint: str, text: str):
+        self.fingerprint = fingerprint
+        self.text = text
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.rows = 0
+        self.bytes = 0
+        self.latency = LatencyHistogram()
+        self.first_seen = time.time()
+        self.last_seen = self.first_seen
+
+    def describe(self) -> Dict[str, Any]:
+        latency = self.latency
+        return {
+            "fingerprint": self.fingerprint,
+            "query": self.text,
+            "calls": self.calls,
+            "errors": self.errors,
+            "cacheHits": self.cache_hits,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "totalMs": round(latency.total, 1),
+            "meanMs": round(latency.total / latency.count, 2) if latency.count else 0.0,
+            "p50Ms": round(latency.percentile(0.50), 2),
+            "p95Ms": round(latency.percentile(0.95), 2),
+            "p99Ms": round(latency.percentile(0.99), 2),
+            "maxMs": round(latency.max, 2),
+            "firstSeen": self.first_seen,
+            "lastSeen": self.last_seen
+        }
+
+
+class QueryStats:
+    """Per-fingerprint query statistics, dropping the least recently seen beyond max_fingerprints"""
+
+    ORDER_FIELDS = ("totalMs", "calls", "meanMs", "p95Ms", "p99Ms", "maxMs", "errors", "rows", "bytes")
+
+    # Stored queries are shortened to this many characters
+    MAX_TEXT = 500
+
+    def __init__(self, max_fingerprints: int = 1000):
+        self.max_fingerprints = max_fingerprints
+        self._entries: "OrderedDict[str, QueryStatsEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+        self.since = time.time()
+
+    def record(self, fingerprint: str, text: str, elapsed_ms: float, rows: int = 0, size: int = 0,
+               error: bool = False, cached: bool = False):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                entry = QueryStatsEntry(fingerprint, text[:self.MAX_TEXT])
+                self._entries[fingerprint] = entry
+                while len(self._entries) > self.max_fingerprints:
+                    self._entries.popitem(last=False)
+                    self._evicted += 1
+            else:
+                self._entries.move_to_end(fingerprint)
+            entry.calls += 1
+            entry.last_seen = time.time()
+            entry.rows += rows
+            entry.bytes += size
+            if error:
+                entry.errors += 1
+            if cached:
+                # Cache hits say nothing about the database, so they are not timed
+                entry.cache_hits += 1
+            else:
+                entry.latency.record(elapsed_ms)
+
+    def top(self, order_by: str = "totalMs", limit: int = 10) -> Dict[str, Any]:
+        """The fingerprints with the highest value of one field"""
+        if order_by not in self.ORDER_FIELDS:
+            raise ValueError(f"orderBy must be one of: {', '.join(self.ORDER_FIELDS)}")
+        with self._lock:
+            described = [entry.describe() for entry in self._entries.values()]
+        described.sort(key=lambda entry: entry[order_by], reverse=True)
+        return {
+            "since": self.since,
+            "fingerprints": len(described),
+            "evicted": self._evicted,
+            "orderBy": order_by,
+            "queries": described[:limit] if limit else described
+        }
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._evicted = 0
+            self.since = time.time()
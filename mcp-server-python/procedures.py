@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+"""
+Stored Procedure Signatures for the MCP Database Server
+Reads a procedure's parameters from sys.parameters, the columns of its
+table-valued parameters from sys.table_types and its definition in one batch,
+caches the result, converts JSON arrays of rows into pyodbc table-valued
+parameter values and builds EXEC batches that capture OUTPUT parameters and
+the return code
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sql_analysis import significant_tokens
+
+
+# Three result sets: the parameters, the columns of every table type among them and
+# the definition, whose header says which parameters have defaults (sys.parameters
+# only knows that for CLR procedures). OBJECT_ID resolves the name the same way EXEC
+# does (default schema, then dbo).
+PROCEDURE_SIGNATURE_SQL = """
+    DECLARE @object_id int = OBJECT_ID(?);
+    SELECT
+        p.name AS parameter_name,
+        TYPE_NAME(p.user_type_id) AS data_type,
+        SCHEMA_NAME(t.schema_id) AS type_schema,
+        t.is_table_type,
+        p.is_output,
+        p.has_default_value,
+        p.max_length,
+        p.precision,
+        p.scale
+    FROM sys.parameters p
+    INNER JOIN sys.types t ON p.user_type_id = t.user_type_id
+    WHERE p.object_id = @object_id
+    ORDER BY p.parameter_id;
+    SELECT
+        p.name AS parameter_name,
+        c.name AS column_name,
+        TYPE_NAME(c.user_type_id) AS data_type
+    FROM sys.parameters p
+    INNER JOIN sys.table_types tt ON p.user_type_id = tt.user_type_id
+    INNER JOIN sys.columns c ON c.object_id = tt.type_table_object_id
+    WHERE p.object_id = @object_id
+    ORDER BY p.parameter_id, c.column_id;
+    SELECT OBJECT_DEFINITION(@object_id) AS definition;
+"""
+
+
+# First column of the SELECT that ends every EXEC batch, followed by the OUTPUT values
+RETURN_CODE_COLUMN = "__return_code"
+
+
+class ProcedureParameter(NamedTuple):
+    # Name including the leading @
+    name: str
+    data_type: str
+    type_schema: str
+    is_table_type: bool
+    is_output: bool
+    has_default: bool
+    # Bytes (-1 for max), precision and scale, as in sys.parameters
+    max_length: int = 0
+    precision: int = 0
+    scale: int = 0
+    # Column names of a table type, in column order
+    columns: Tuple[str, ...] = ()
+
+    @property
+    def declared_type(self) -> str:
+        """The type as written in a DECLARE, e.g. nvarchar(50) or decimal(18, 2)"""
+        data_type = self.data_type.lower()
+        if data_type in ("char", "varchar", "binary", "varbinary", "nchar", "nvarchar"):
+            if self.max_length == -1:
+                return f"{self.data_type}(max)"
+            # sys.parameters counts bytes, two per Unicode character
+            length = self.max_length // 2 if data_type.startswith("n") else self.max_length
+            return f"{self.data_type}({length})"
+        if data_type in ("decimal", "numeric"):
+            return f"{self.data_type}({self.precision}, {self.scale})"
+        if data_type in ("datetime2", "time", "datetimeoffset"):
+            return f"{self.data_type}({self.scale})"
+        return self.data_type
+
+
+class ProcedureSignature:
+    """The parameters of one stored procedure, looked up by name without regard to case or @"""
+
+    def __init__(self, procedure: str, parameters: List[ProcedureParameter]):
+        self.procedure = procedure
+        self.parameters = parameters
+        self._by_name = {parameter.name.lstrip("@").lower(): parameter for parameter in parameters}
+
+    @classmethod
+    def from_result_sets(cls, procedure: str, parameter_rows: List[Dict[str, Any]],
+                         column_rows: List[Dict[str, Any]], definition: str = None) -> "ProcedureSignature":
+        columns: Dict[str, List[str]] = {}
+        for row in column_rows:
+            columns.setdefault(row["parameter_name"], []).append(row["column_name"])
+        defaults = parameter_defaults(definition) if definition else set()
+        return cls(procedure, [
+            ProcedureParameter(
+                name=row["parameter_name"],
+                data_type=row["data_type"],
+                type_schema=row["type_schema"],
+                is_table_type=bool(row["is_table_type"]),
+                is_output=bool(row["is_output"]),
+                has_default=bool(row["has_default_value"]) or row["parameter_name"].lower() in defaults,
+                max_length=row["max_length"],
+                precision=row["precision"],
+                scale=row["scale"],
+                columns=tuple(columns.get(row["parameter_name"], ()))
+            )
+            for row in parameter_rows
+        ])
+
+    def get(self, name: str) -> Optional[ProcedureParameter]:
+        return self._by_name.get(name.lstrip("@").lower())
+
+    @property
+    def outputs(self) -> List[ProcedureParameter]:
+        return [parameter for parameter in self.parameters if parameter.is_output]
+
+
+def parameter_defaults(definition: str) -> Set[str]:
+    """Names (with @, lower case) of the parameters a CREATE PROCEDURE header gives a default"""
+    defaults = set()
+    depth = 0
+    started = False
+    current = None
+    for token in significant_tokens(definition):
+        word = token.text.lower() if token.kind == "word" else None
+        if not started:
+            # Parameters follow CREATE [OR ALTER] PROC[EDURE] name
+            started = word in ("proc", "procedure")
+            continue
+        if token.text == "(":
+            depth += 1
+        elif token.text == ")":
+            depth -= 1
+        elif depth == 0 and word in ("as", "with", "for"):
+            # The body, or WITH RECOMPILE / FOR REPLICATION before it
+            break
+        elif token.kind == "variable" and depth <= 1:
+            current = token.text.lower()
+        elif token.text == "=" and current is not None:
+            defaults.add(current)
+    return defaults
+
+
+def table_parameter_value(parameter: ProcedureParameter, rows: List[Any]) -> List[Any]:
+    """pyodbc TVP value for JSON rows: the type name and schema, then one tuple per row"""
+    columns = parameter.columns
+    value: List[Any] = [parameter.data_type, parameter.type_schema]
+    for number, row in enumerate(rows, start=1):
+        if isinstance(row, dict):
+            # Objects are matched to the table type's columns by name; missing columns are NULL
+            by_name = {key.lower(): item for key, item in row.items()}
+            unknown = set(by_name) - {column.lower() for column in columns}
+            if unknown:
+                raise ValueError(
+                    f"Row {number} of {parameter.name} has columns not in {parameter.data_type}: {', '.join(sorted(unknown))}"
+                )
+            value.append(tuple(by_name.get(column.lower()) for column in columns))
+        elif isinstance(row, (list, tuple)):
+            if len(row) != len(columns):
+                raise ValueError(
+                    f"Row {number} of {parameter.name} has {len(row)} values, {parameter.data_type} has {len(columns)} columns"
+                )
+            value.append(tuple(row))
+        elif len(columns) == 1:
+            # A plain list of IDs fills a single-column table type
+            value.append((row,))
+        else:
+            raise ValueError(f"Rows of {parameter.name} must be arrays or objects; {parameter.data_type} has {len(columns)} columns")
+    return value
+
+
+class ExecBatch(NamedTuple):
+    sql: str
+    params: List[Any]
+    # OUTPUT parameter names, in the order their values follow the return code
+    outputs: Tuple[str, ...]
+
+
+def build_exec_batch(procedure: str, signature: ProcedureSignature, parameters: Dict[str, Any] = None) -> ExecBatch:
+    """One batch that runs the procedure and then selects its return code and OUTPUT parameters"""
+    arguments = []
+    argument_values = []
+    output_values = {}
+    for key, value in (parameters or {}).items():
+        parameter = signature.get(key)
+        if parameter is not None and parameter.is_output:
+            # A passed value initializes an INPUT/OUTPUT parameter
+            output_values[parameter.name.lower()] = value
+            continue
+        if isinstance(value, (list, dict)):
+            # JSON arrays (and single objects) are rows for table-valued parameters
+            if parameter is None:
+                raise ValueError(f"{signature.procedure} has no parameter @{key.lstrip('@')}")
+            if not parameter.is_table_type:
+                raise ValueError(
+                    f"{parameter.name} is {parameter.data_type}, not a table type; pass a single value instead of an array"
+                )
+            rows = value if isinstance(value, list) else [value]
+            if not rows:
+                # An omitted TVP is an empty table
+                continue
+            value = table_parameter_value(parameter, rows)
+        arguments.append(f"@{key} = ?")
+        argument_values.append(value)
+
+    declarations = ["@__return_code int"]
+    declaration_values = []
+    selected = [f"@__return_code AS {RETURN_CODE_COLUMN}"]
+    # An omitted OUTPUT parameter with a default is left to the procedure; binding it
+    # would pass NULL in place of that default
+    outputs = [
+        parameter for parameter in signature.outputs
+        if parameter.name.lower() in output_values or not parameter.has_default
+    ]
+    for index, parameter in enumerate(outputs):
+        variable = f"@__output{index}"
+        if parameter.name.lower() in output_values:
+            declarations.append(f"{variable} {parameter.declared_type} = ?")
+            declaration_values.append(output_values[parameter.name.lower()])
+        else:
+            declarations.append(f"{variable} {parameter.declared_type}")
+        arguments.append(f"{parameter.name} = {variable} OUTPUT")
+        selected.append(variable)
+
+    exec_statement = f"EXEC @__return_code = {procedure}"
+    if arguments:
+        exec_statement += " " + ", ".join(arguments)
+    sql = f"DECLARE {', '.join(declarations)};\n{exec_statement};\nSELECT {', '.join(selected)};"
+    return ExecBatch(sql, declaration_values + argument_values, tuple(parameter.name for parameter in outputs))
+
+
+class SignatureCache:
+    """Procedure signatures by name, reloaded after a TTL so ALTER PROCEDURE is picked up"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, ProcedureSignature]] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, procedure: str, load: Callable[[str], ProcedureSignature]) -> ProcedureSignature:
+        """Return the cached signature, calling load(procedure) on a miss or an expired entry"""
+        key = procedure.lower()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+
+        # Loaded outside the lock; two concurrent misses both load and the last one wins
+        signature = load(procedure)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, signature)
+        return signature
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses
+            }
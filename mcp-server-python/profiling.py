@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+"""
+Query Profiling for the MCP Database Server
+Turns on SET STATISTICS IO/TIME (and optionally XML) for one call, collects the
+informational messages and showplan result sets the server sends back, and
+reduces them to a summary small enough to reason about
+"""
+
+import re
+import xml.etree.ElementTree as ElementTree
+from typing import Any, Dict, List, Optional
+
+
+# Column name of the result set SET STATISTICS XML adds after each statement
+SHOWPLAN_COLUMN = "Microsoft SQL Server 2005 XML Showplan"
+
+SHOWPLAN_NAMESPACE = "{http://schemas.microsoft.com/sqlserver/2004/07/showplan}"
+
+# Entries kept in each list of the summary
+SUMMARY_LIMIT = 5
+
+_IO_PATTERN = re.compile(
+    r"Table '(?P<table>[^']+)'\. Scan count (?P<scans>\d+), logical reads (?P<logical>\d+), "
+    r"physical reads (?P<physical>\d+)"
+    r"(?:.*?read-ahead reads (?P<read_ahead>\d+))?"
+    r"(?:.*?lob logical reads (?P<lob_logical>\d+))?"
+)
+_EXECUTION_TIME_PATTERN = re.compile(
+    r"SQL Server Execution Times:\s*CPU time = (?P<cpu>\d+) ms,\s*elapsed time = (?P<elapsed>\d+) ms"
+)
+_COMPILE_TIME_PATTERN = re.compile(
+    r"SQL Server parse and compile time:\s*CPU time = (?P<cpu>\d+) ms,\s*elapsed time = (?P<elapsed>\d+) ms"
+)
+
+
+def statistics_sql(include_plan: bool, on: bool) -> str:
+    """SET statements that turn profiling on or off for the connection"""
+    state = "ON" if on else "OFF"
+    sql = f"SET STATISTICS IO, TIME {state};"
+    if include_plan:
+        sql += f" SET STATISTICS XML {state};"
+    return sql
+
+
+class QueryProfile:
+    """Statistics messages and actual plans collected while one call reads its results"""
+
+    def __init__(self, include_plan: bool = False, nested: bool = False):
+        self.include_plan = include_plan
+        # A single EXEC reports its own time after its statements', and that time includes theirs
+        self.nested = nested
+        self.plans: List[str] = []
+        self._tables: Dict[str, Dict[str, int]] = {}
+        self._execution_times: List[Dict[str, int]] = []
+        self._compile_cpu = 0
+        self._compile_elapsed = 0
+
+    def collect_messages(self, cursor: Any):
+        """Parse the messages the driver attached to the cursor's current result"""
+        for message in getattr(cursor, "messages", None) or []:
+            text = message[1] if isinstance(message, (list, tuple)) else str(message)
+            for match in _IO_PATTERN.finditer(text):
+                table = self._tables.setdefault(match["table"], {
+                    "scans": 0, "logicalReads": 0, "physicalReads": 0, "readAheadReads": 0, "lobLogicalReads": 0
+                })
+                table["scans"] += int(match["scans"])
+                table["logicalReads"] += int(match["logical"])
+                table["physicalReads"] += int(match["physical"])
+                table["readAheadReads"] += int(match["read_ahead"] or 0)
+                table["lobLogicalReads"] += int(match["lob_logical"] or 0)
+            for match in _EXECUTION_TIME_PATTERN.finditer(text):
+                self._execution_times.append({"cpu": int(match["cpu"]), "elapsed": int(match["elapsed"])})
+            for match in _COMPILE_TIME_PATTERN.finditer(text):
+                self._compile_cpu += int(match["cpu"])
+                self._compile_elapsed += int(match["elapsed"])
+
+    @staticmethod
+    def is_plan(cursor: Any) -> bool:
+        return bool(cursor.description) and cursor.description[0][0] == SHOWPLAN_COLUMN
+
+    def collect_plan(self, cursor: Any):
+        """Read a showplan result set"""
+        for row in cursor.fetchall():
+            if row[0]:
+                self.plans.append(row[0])
+
+    def skip_plans(self, cursor: Any):
+        """Collect plans and messages until the cursor is on a result that is not a plan"""
+        self.collect_messages(cursor)
+        while self.is_plan(cursor):
+            self.collect_plan(cursor)
+            if not cursor.nextset():
+                break
+            self.collect_messages(cursor)
+
+    def drain(self, cursor: Any):
+        """Collect the plans and messages that follow the result the caller read"""
+        try:
+            while cursor.nextset():
+                self.collect_messages(cursor)
+                if self.is_plan(cursor):
+                    self.collect_plan(cursor)
+        except Exception:
+            # The rest was cancelled (a cap was hit) or the batch failed after its results
+            pass
+        self.collect_messages(cursor)
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals, the busiest tables and, with a plan, its most expensive operators"""
+        times = self._execution_times
+        if self.nested and times:
+            cpu = max(time["cpu"] for time in times)
+            elapsed = max(time["elapsed"] for time in times)
+        else:
+            cpu = sum(time["cpu"] for time in times)
+            elapsed = sum(time["elapsed"] for time in times)
+        tables = sorted(self._tables.items(), key=lambda item: item[1]["logicalReads"], reverse=True)
+
+        summary: Dict[str, Any] = {
+            "cpuMs": cpu,
+            "elapsedMs": elapsed,
+            "compileCpuMs": self._compile_cpu,
+            "compileElapsedMs": self._compile_elapsed,
+            "logicalReads": sum(table["logicalReads"] for table in self._tables.values()),
+            "physicalReads": sum(table["physicalReads"] for table in self._tables.values()),
+            "tables": [
+                {"table": name, **{key: value for key, value in counts.items() if value}}
+                for name, counts in tables[:SUMMARY_LIMIT]
+            ]
+        }
+        if len(tables) > SUMMARY_LIMIT:
+            summary["tablesOmitted"] = len(tables) - SUMMARY_LIMIT
+        if self.include_plan:
+            summary["plan"] = summarize_plans(self.plans)
+        return summary
+
+
+def _float(value: Optional[str]) -> float:
+    try:
+        return float(value) if value is not None else 0.0
+    except ValueError:
+        return 0.0
+
+
+def summarize_plans(plans: List[str]) -> Dict[str, Any]:
+    """Warnings, missing indexes and the costliest operators of actual execution plans"""
+    operators = []
+    warnings = set()
+    missing_indexes = []
+    statements = 0
+    for plan in plans:
+        try:
+            root = ElementTree.fromstring(plan)
+        except ElementTree.ParseError:
+            continue
+        statements += len(root.findall(f".//{SHOWPLAN_NAMESPACE}StmtSimple"))
+
+        for element in root.iter(f"{SHOWPLAN_NAMESPACE}Warnings"):
+            for warning in element:
+                warnings.add(warning.tag.replace(SHOWPLAN_NAMESPACE, ""))
+            for name, value in element.attrib.items():
+                if value in ("1", "true"):
+                    warnings.add(name)
+
+        for group in root.iter(f"{SHOWPLAN_NAMESPACE}MissingIndexGroup"):
+            for index in group.iter(f"{SHOWPLAN_NAMESPACE}MissingIndex"):
+                missing_indexes.append({
+                    "impact": _float(group.get("Impact")),
+                    "table": index.get("Table", "").strip("[]"),
+                    "columns": [
+                        column.get("Name", "").strip("[]")
+                        for column in index.iter(f"{SHOWPLAN_NAMESPACE}Column")
+                    ]
+                })
+
+        for operator in root.iter(f"{SHOWPLAN_NAMESPACE}RelOp"):
+            counters = operator.findall(f"{SHOWPLAN_NAMESPACE}RunTimeInformation/{SHOWPLAN_NAMESPACE}RunTimeCountersPerThread")
+            target = operator.find(f".//{SHOWPLAN_NAMESPACE}Object")
+            entry = {
+                "operator": operator.get("PhysicalOp"),
+                "object": ".".join(
+                    target.get(part).strip("[]") for part in ("Schema", "Table", "Index") if target.get(part)
+                ) if target is not None else None,
+                # The operator's own estimated cost, without its inputs
+                "estimatedCost": round(_float(operator.get("EstimateCPU")) + _float(operator.get("EstimateIO")), 4),
+                "estimatedRows": round(_float(operator.get("EstimateRows")), 1)
+            }
+            if counters:
+                entry["actualRows"] = sum(int(_float(counter.get("ActualRows"))) for counter in counters)
+            operators.append(entry)
+
+    operators.sort(key=lambda entry: entry["estimatedCost"], reverse=True)
+    missing_indexes.sort(key=lambda entry: entry["impact"], reverse=True)
+    return {
+        "statements": statements,
+        "warnings": sorted(warnings)[:SUMMARY_LIMIT * 2],
+        "missingIndexes": missing_indexes[:SUMMARY_LIMIT],
+        "costliestOperators": operators[:SUMMARY_LIMIT]
+    }
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""
+Query Result Cache for the MCP Database Server
+LRU cache of read-only query results, bounded by total size in bytes, with a
+TTL and invalidation by the tables a write statement touches
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set
+
+
+def copy_value(value: Any) -> Any:
+    """Copy the dicts and lists of a result; the scalars in it are immutable"""
+    if isinstance(value, dict):
+        return {key: copy_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_value(item) for item in value]
+    return value
+
+
+class CacheEntry:
+    """One cached result and the tables it was read from"""
+
+    def __init__(self, value: Any, size: int, tables: Set[str], ttl: float):
+        self.value = value
+        self.size = size
+        self.tables = tables
+        self.expires_at = time.monotonic() + ttl
+
+
+class QueryCache:
+    """Thread-safe LRU of query results, evicted by byte size and TTL"""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # Least recently used on the left
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        # Table name -> keys of the entries that read it
+        self._by_table: Dict[str, Set[Hashable]] = {}
+        self._bytes = 0
+        # Bumped by every invalidation so a read that overlapped a write is not cached
+        self.generation = 0
+        self._lock = threading.Lock()
+
+        # Counters reported by stats()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a copy of the cached value, or None on a miss or an expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove_locked(key)
+                self._expirations += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            value = entry.value
+        # Callers may change what they get back; the cached value must stay as it was read
+        return copy_value(value)
+
+    def put(self, key: Hashable, value: Any, size: int, tables: Set[str], generation: int):
+        """Cache a value read at the given generation, evicting LRU entries to stay under max_bytes"""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self.generation:
+                # A write went through while the value was being read
+                return
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = CacheEntry(copy_value(value), size, tables, self.ttl)
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove_locked(oldest)
+                self._evictions += 1
+
+    def _remove_locked(self, key: Hashable):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def invalidate_tables(self, tables: Iterable[str]) -> int:
+        """Drop every entry that read one of the tables"""
+        with self._lock:
+            self.generation += 1
+            keys = set()
+            for table in tables:
+                keys.update(self._by_table.get(table, ()))
+            for key in keys:
+                self._remove_locked(key)
+            self._invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> int:
+        """Drop every entry, e.g. after DDL or a stored procedure that may have written anything"""
+        with self._lock:
+            self.generation += 1
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+            self._invalidations += dropped
+            return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations
+            }
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+
+"""
+Resilience Helpers for the MCP Database Server
+Transient SQL Server error classification, retry with jittered backoff and a
+circuit breaker that fails fast while the database is unreachable
+"""
+
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from connection_pool import PoolTimeoutError
+
+try:
+    import pyodbc
+    DRIVER_ERRORS: Tuple[type, ...] = (pyodbc.Error,)
+except ImportError:
+    # Without the ODBC driver manager nothing can come from the driver
+    DRIVER_ERRORS = ()
+
+
+# SQLSTATE values worth retrying besides connection failures (class 08):
+# serialization failures / deadlocks and driver connection timeouts
+TRANSIENT_SQLSTATES = {"40001", "HYT01"}
+
+# SQL Server native error numbers that are transient: deadlock victim,
+# Azure SQL failover and throttling
+TRANSIENT_NATIVE_ERRORS = {
+    1205, 4221, 10928, 10929, 40143, 40197, 40501, 40540, 40613, 49918, 49919, 49920
+}
+
+# Native errors that mean the connection itself is gone (also transient)
+DISCONNECT_NATIVE_ERRORS = {233, 64, 10053, 10054, 10060}
+
+# Transient errors that say nothing about the backend being down
+CONTENTION_NATIVE_ERRORS = {1205}
+
+# Driver timeouts: login timeout / query timeout (HYT00) and connection timeout (HYT01)
+TIMEOUT_SQLSTATES = {"HYT00", "HYT01"}
+
+NATIVE_ERROR_PATTERN = re.compile(r"\((\d+)\)")
+
+
+def _error_chain(error: BaseException):
+    """Yield the error and the errors it was raised from"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def _driver_errors(error: BaseException):
+    """Yield the pyodbc errors in the error's chain"""
+    for item in _error_chain(error):
+        if DRIVER_ERRORS and isinstance(item, DRIVER_ERRORS):
+            yield item
+
+
+def get_sqlstate(error: BaseException) -> Optional[str]:
+    """Return the SQLSTATE of a pyodbc error (its first argument), if any"""
+    for item in _driver_errors(error):
+        args = item.args
+        if args and isinstance(args[0], str) and len(args[0]) == 5:
+            return args[0]
+    return None
+
+
+def get_native_errors(error: BaseException) -> set:
+    """Extract SQL Server native error numbers such as (1205) from pyodbc error messages"""
+    numbers = set()
+    for item in _driver_errors(error):
+        # args are (sqlstate, message); our own messages may quote an earlier error
+        for arg in item.args[1:]:
+            if isinstance(arg, str):
+                numbers.update(int(n) for n in NATIVE_ERROR_PATTERN.findall(arg))
+    return numbers
+
+
+def fails_fast(error: BaseException) -> bool:
+    """True for rejections raised before any SQL ran, which a retry would only repeat"""
+    return any(isinstance(item, (CircuitOpenError, PoolTimeoutError)) for item in _error_chain(error))
+
+
+def is_disconnect_error(error: BaseException) -> bool:
+    """True when the error means the connection is no longer usable"""
+    sqlstate = get_sqlstate(error)
+    if sqlstate and sqlstate.startswith("08"):
+        return True
+    return bool(get_native_errors(error) & DISCONNECT_NATIVE_ERRORS)
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """True when the same call is likely to succeed if tried again"""
+    if fails_fast(error):
+        return False
+    if is_disconnect_error(error):
+        return True
+    if get_sqlstate(error) in TRANSIENT_SQLSTATES:
+        return True
+    return bool(get_native_errors(error) & TRANSIENT_NATIVE_ERRORS)
+
+
+def is_outage_error(error: BaseException) -> bool:
+    """True when the error suggests the database itself is unreachable or unavailable"""
+    if is_disconnect_error(error):
+        return True
+    if get_sqlstate(error) in TIMEOUT_SQLSTATES:
+        return True
+    return bool(get_native_errors(error) & (TRANSIENT_NATIVE_ERRORS - CONTENTION_NATIVE_ERRORS))
+
+
+def backoff_delay(attempt: int, base_delay: float = 0.2, max_delay: float = 5.0) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (1-based)"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+
+
+def call_with_retry(func: Callable[[], Any], max_retries: int = 3, base_delay: float = 0.2,
+                    max_delay: float = 5.0, is_retryable: Callable[[BaseException], bool] = is_transient_error,
+                    on_retry: Callable[[int, BaseException], None] = None) -> Any:
+    """Call func, retrying retryable errors with jittered backoff"""
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_retries or fails_fast(e) or not is_retryable(e):
+                raise
+            attempt += 1
+            if on_retry:
+                on_retry(attempt, e)
+            time.sleep(backoff_delay(attempt, base_delay, max_delay))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the database while the circuit breaker is open"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker shared by every call against one database"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max_calls: int = 1,
+                 is_failure: Callable[[BaseException], bool] = is_outage_error):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._is_failure = is_failure
+
+        # closed | open | half_open
+        self._state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_calls = 0
+        self._lock = threading.Lock()
+
+        # Counters reported by stats()
+        self._times_opened = 0
+        self._rejected = 0
+        self._last_failure: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_locked()
+            return self._state
+
+    def _refresh_locked(self):
+        # An open circuit lets trial calls through once the reset timeout has passed
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = "half_open"
+            self._trial_calls = 0
+
+    def _open_locked(self):
+        self._state = "open"
+        self._opened_at = time.monotonic()
+        self._times_opened += 1
+
+    def before_call(self):
+        """Raise CircuitOpenError unless the call may go to the database"""
+        with self._lock:
+            self._refresh_locked()
+            if self._state == "closed":
+                return
+            if self._state == "half_open" and self._trial_calls < self.half_open_max_calls:
+                self._trial_calls += 1
+                return
+
+            self._rejected += 1
+            if self._state == "open":
+                retry_after = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            else:
+                # Trial calls are in flight; their outcome decides the state
+                retry_after = 1.0
+            raise CircuitOpenError(
+                f"Database unavailable: circuit breaker is {self._state.replace('_', '-')} after "
+                f"{self._consecutive_failures} consecutive failures (last error: {self._last_failure}). "
+                f"Failing fast; retry in {retry_after:.1f}s.",
+                retry_after
+            )
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive_failures = 0
+            if self._state == "half_open":
+                self._state = "closed"
+                self._trial_calls = 0
+
+    def record_failure(self, error: BaseException):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._last_failure = str(error)
+            if self._state == "half_open":
+                # The trial failed - back off for another full reset timeout
+                self._open_locked()
+            elif self._state == "closed" and self._consecutive_failures >= self.failure_threshold:
+                self._open_locked()
+
+    @contextmanager
+    def guard(self):
+        """Fail fast while open; otherwise run the block and record its outcome"""
+        self.before_call()
+        try:
+            yield
+        except Exception as e:
+            if self._is_failure(e):
+                self.record_failure(e)
+            else:
+                # The database answered, even if the statement failed
+                self.record_success()
+            raise
+        self.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh_locked()
+            retry_in = None
+            if self._state == "open":
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1)
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "retry_in_s": retry_in,
+                "times_opened": self._times_opened,
+                "rejected": self._rejected,
+                "last_failure": self._last_failure
+            }
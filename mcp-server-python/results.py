@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+"""
+Result Reading for the MCP Database Server
+Converts cursor rows to dictionaries while enforcing row and byte caps, and
+cancels the rest of the result on the server once a cap is reached
+"""
+
+import datetime
+import decimal
+from typing import Any, Dict, List, Optional
+
+
+# Rows requested from the driver per round trip while reading a result set
+FETCH_BATCH_SIZE = 500
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate size of a value once serialized to JSON, in bytes"""
+    if value is None:
+        return 4
+    if isinstance(value, bool):
+        return 5
+    if isinstance(value, (int, float, decimal.Decimal)):
+        return len(str(value))
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, (bytes, bytearray)):
+        return len(value) * 2 + 2
+    if isinstance(value, (datetime.date, datetime.time)):
+        return 28
+    return len(str(value)) + 2
+
+
+class ResultLimits:
+    """Row and byte budget shared by every result set of one call"""
+
+    def __init__(self, max_rows: Optional[int] = None, max_bytes: Optional[int] = None):
+        # None or 0 means no cap
+        self.max_rows = max_rows or None
+        self.max_bytes = max_bytes or None
+        self.rows = 0
+        self.bytes = 0
+        self.truncated_by: Optional[str] = None
+        self.rows_skipped = 0
+        # Set when the query itself was limited to max_rows + 1, so the server never
+        # says how many rows lay past the cap
+        self.pushed_down = False
+
+    @classmethod
+    def combine(cls, global_rows: Optional[int], global_bytes: Optional[int],
+                call_rows: Optional[int] = None, call_bytes: Optional[int] = None) -> "ResultLimits":
+        """Per-call caps may lower the global caps but never raise them"""
+        def tighter(limit: Optional[int], requested: Optional[int]) -> Optional[int]:
+            if not requested or requested < 0:
+                return limit or None
+            return min(limit, requested) if limit else requested
+
+        return cls(tighter(global_rows, call_rows), tighter(global_bytes, call_bytes))
+
+    @property
+    def truncated(self) -> bool:
+        return self.truncated_by is not None
+
+    def report(self) -> Dict[str, Any]:
+        """Fields added to a tool result"""
+        if not self.truncated:
+            return {"truncated": False}
+        return {
+            "truncated": True,
+            "truncatedBy": self.truncated_by,
+            "rowsFetched": self.rows,
+            "bytesFetched": self.bytes,
+            # A lower bound unless the driver reported the full row count; unknown
+            # when the query stopped at the cap itself
+            "rowsSkippedEstimate": None if self.pushed_down and self.truncated_by == "max_rows" else self.rows_skipped
+        }
+
+    def read_result_set(self, cursor: Any, columns: List[str]) -> List[Dict[str, Any]]:
+        """Read the cursor's current result set, stopping and cancelling when a cap is hit"""
+        # Braces, quotes, colon and comma around each column name
+        overhead = [len(column) + 4 for column in columns]
+        result_set = []
+        while True:
+            size = FETCH_BATCH_SIZE
+            if self.max_rows is not None:
+                # One row past the cap is enough to know the result was cut short
+                size = max(1, min(size, self.max_rows - self.rows + 1))
+            batch = cursor.fetchmany(size)
+            if not batch:
+                return result_set
+
+            for index, row in enumerate(batch):
+                row_bytes = 2 + sum(estimate_size(value) + extra for value, extra in zip(row, overhead))
+                if self.max_rows is not None and self.rows >= self.max_rows:
+                    self._stop(cursor, "max_rows", len(batch) - index, len(result_set))
+                    return result_set
+                if self.max_bytes is not None and self.bytes + row_bytes > self.max_bytes:
+                    self._stop(cursor, "max_bytes", len(batch) - index, len(result_set))
+                    return result_set
+
+                result_set.append(dict(zip(columns, row)))
+                self.rows += 1
+                self.bytes += row_bytes
+
+    def _stop(self, cursor: Any, reason: str, unread_in_batch: int, rows_in_set: int):
+        self.truncated_by = reason
+        self.rows_skipped = unread_in_batch
+        rowcount = getattr(cursor, "rowcount", -1)
+        if rowcount is not None and rowcount > rows_in_set:
+            self.rows_skipped = max(unread_in_batch, rowcount - rows_in_set)
+        # Stop the server from streaming rows nobody will read
+        try:
+            cursor.cancel()
+        except Exception:
+            pass
@@ -1,14 +1,42 @@
 #!/usr/bin/env python3
 
 import asyncio
+import contextvars
+import csv
+import functools
+import hashlib
+import hmac
 import json
 import os
 import sys
+import secrets
 import signal
-from typing import Any, Dict, List, Optional, Sequence
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 import pyodbc
 from dotenv import load_dotenv
 
+from admission import AdmissionController, PriorityClass, ServerBusyError, hold_slot_until
+from cancellation import CallCancelledError, CallScope
+from connection_pool import ConnectionPool, PagedCursor, PinnedSession
+from metrics import LoopLagMonitor, QueryStats
+from resilience import (
+    CircuitBreaker, CircuitOpenError, call_with_retry, is_disconnect_error
+)
+from profiling import QueryProfile, statistics_sql
+from procedures import (
+    PROCEDURE_SIGNATURE_SQL, RETURN_CODE_COLUMN, ProcedureSignature, SignatureCache, build_exec_batch
+)
+from query_cache import QueryCache
+from results import ResultLimits
+from sql_analysis import (
+    bind_parameters, changes_schema_or_runs_code, fingerprint_sql, is_read_only, limit_select, normalize_sql,
+    quote_name, quote_object_name, referenced_tables, variable_names
+)
+
 # Import MCP SDK
 from mcp.server.models import InitializationOptions
 import mcp.types as types
@@ -23,8 +51,8 @@ load_dotenv()
 def handle_exit_signal(sig, frame):
     print("\nShutdown signal received. Closing database connections...")
     try:
-        if hasattr(sys.modules[__name__], 'db_service'):
-            db_service.disconnect()
+        if hasattr(sys.modules[__name__], 'connections'):
+            connections.disconnect_all()
         print("Database disconnected. Shutting down server...")
     except Exception as e:
         print(f"Error during shutdown: {str(e)}")
@@ -37,112 +65,924 @@ signal.signal(signal.SIGINT, handle_exit_signal)  # Ctrl+C
 signal.signal(signal.SIGTERM, handle_exit_signal)  # Termination signal
 
 
+# Metadata collected while a tool call runs (retry counts, ...). It is returned
+# as a trailing {"metadata": ...} block after the tool result.
+call_metadata = contextvars.ContextVar("call_metadata", default=None)
+
+# Cursors opened by the current tool call, cancelled on client cancellation or timeoutMs
+current_call = contextvars.ContextVar("current_call", default=None)
+
+# Set while a retrying method runs so nested calls do not multiply retries
+_retry_active = contextvars.ContextVar("retry_active", default=False)
+
+
+def record_call_metadata(key: str, value: Any):
+    """Attach a value to the metadata of the current tool call"""
+    metadata = call_metadata.get()
+    if metadata is not None:
+        metadata[key] = value
+
+
+def retry_transient_errors(method: Callable[..., Any]) -> Callable[..., Any]:
+    """Retry an idempotent DatabaseService method when it fails with a transient error"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if _retry_active.get():
+            return method(self, *args, **kwargs)
+        
+        def on_retry(attempt: int, error: BaseException):
+            record_call_metadata("retries", attempt)
+            record_call_metadata("lastTransientError", str(error))
+        
+        token = _retry_active.set(True)
+        try:
+            return call_with_retry(
+                lambda: method(self, *args, **kwargs),
+                max_retries=self.retry_attempts,
+                base_delay=self.retry_base_delay,
+                max_delay=self.retry_max_delay,
+                on_retry=on_retry
+            )
+        finally:
+            _retry_active.reset(token)
+    
+    return wrapper
+
+
+# Table metadata statements, combined into single batches by describe_table and
+# get_related_tables. They read @schema and @table_name from TABLE_PARAMETERS_SQL.
+TABLE_PARAMETERS_SQL = "DECLARE @schema sysname = ?, @table_name sysname = ?;"
+
+TABLE_COLUMNS_SQL = """
+    SELECT 
+        COLUMN_NAME,
+        DATA_TYPE,
+        IS_NULLABLE,
+        COLUMN_DEFAULT,
+        CHARACTER_MAXIMUM_LENGTH,
+        NUMERIC_PRECISION,
+        NUMERIC_SCALE,
+        ORDINAL_POSITION
+    FROM INFORMATION_SCHEMA.COLUMNS 
+    WHERE TABLE_SCHEMA = @schema AND TABLE_NAME = @table_name
+    ORDER BY ORDINAL_POSITION
+"""
+
+TABLE_INDEXES_SQL = """
+    SELECT 
+        i.name AS index_name,
+        i.type_desc AS index_type,
+        i.is_unique,
+        i.is_primary_key,
+        c.name AS column_name
+    FROM sys.indexes i
+    JOIN sys.index_columns ic ON i.object_id = ic.object_id AND i.index_id = ic.index_id
+    JOIN sys.columns c ON ic.object_id = c.object_id AND ic.column_id = c.column_id
+    JOIN sys.tables t ON i.object_id = t.object_id
+    JOIN sys.schemas s ON t.schema_id = s.schema_id
+    WHERE s.name = @schema AND t.name = @table_name
+    ORDER BY i.name, ic.key_ordinal
+"""
+
+# Row counts come from sys.partitions (heap or clustered index) instead of a
+# COUNT(*) scan of every related table
+OUTGOING_FOREIGN_KEYS_SQL = """
+    SELECT 
+        OBJECT_SCHEMA_NAME(fk.referenced_object_id) AS referenced_schema,
+        OBJECT_NAME(fk.referenced_object_id) AS referenced_table,
+        COL_NAME(fkc.referenced_object_id, fkc.referenced_column_id) AS referenced_column,
+        COL_NAME(fkc.parent_object_id, fkc.parent_column_id) AS referencing_column,
+        fk.name AS foreign_key_name,
+        'Outgoing' AS relationship_type,
+        rc.row_count
+    FROM sys.foreign_keys fk
+    INNER JOIN sys.foreign_key_columns fkc ON fk.object_id = fkc.constraint_object_id
+    INNER JOIN sys.tables t ON fk.parent_object_id = t.object_id
+    INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
+    OUTER APPLY (
+        SELECT SUM(p.rows) AS row_count FROM sys.partitions p
+        WHERE p.object_id = fk.referenced_object_id AND p.index_id IN (0, 1)
+    ) rc
+    WHERE s.name = @schema AND t.name = @table_name
+"""
+
+INCOMING_FOREIGN_KEYS_SQL = """
+    SELECT 
+        OBJECT_SCHEMA_NAME(fk.parent_object_id) AS referencing_schema,
+        OBJECT_NAME(fk.parent_object_id) AS referencing_table,
+        COL_NAME(fkc.parent_object_id, fkc.parent_column_id) AS referencing_column,
+        COL_NAME(fkc.referenced_object_id, fkc.referenced_column_id) AS referenced_column,
+        fk.name AS foreign_key_name,
+        'Incoming' AS relationship_type,
+        rc.row_count
+    FROM sys.foreign_keys fk
+    INNER JOIN sys.foreign_key_columns fkc ON fk.object_id = fkc.constraint_object_id
+    INNER JOIN sys.tables t ON fk.referenced_object_id = t.object_id
+    INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
+    OUTER APPLY (
+        SELECT SUM(p.rows) AS row_count FROM sys.partitions p
+        WHERE p.object_id = fk.parent_object_id AND p.index_id IN (0, 1)
+    ) rc
+    WHERE s.name = @schema AND t.name = @table_name
+"""
+
+
 class DatabaseService:
-    def __init__(self):
-        self.connection = None
-        self.is_connected = False
+    def __init__(self, connection_factory: Callable[..., Any] = None):
+        # Connections are opened through this factory (pyodbc.connect by default)
+        self.connection_factory = connection_factory or pyodbc.connect
+        self.pool: Optional[ConnectionPool] = None
+        # Optional second pool opened with ApplicationIntent=ReadOnly
+        self.read_pool: Optional[ConnectionPool] = None
+        self.read_pool_error: Optional[str] = None
+        # Why the read path runs without DB_READ_ISOLATION_LEVEL, e.g. snapshot isolation is off
+        self.read_isolation_note: Optional[str] = None
+        self.server: Optional[str] = None
+        self.database: Optional[str] = None
+        
+        # Pool sizing and timeouts, configurable from .env
+        self.pool_min_size = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+        self.pool_max_size = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+        self.pool_checkout_timeout = float(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', '30'))
+        self.pool_idle_timeout = float(os.getenv('DB_POOL_IDLE_TIMEOUT', '300'))
+        
+        # Route metadata tools and SELECT-only statements to a readable secondary
+        self.read_intent_routing = os.getenv('DB_READ_INTENT_ROUTING', 'false').lower() in ('1', 'true', 'yes')
+        
+        # Sessions pin one primary connection so temp tables survive between calls
+        self.sessions: Dict[str, PinnedSession] = {}
+        self.sessions_lock = threading.Lock()
+        # begin_session calls that reserved a slot and are still acquiring their connection
+        self.sessions_starting = 0
+        self.session_idle_ttl = float(os.getenv('DB_SESSION_IDLE_TTL', '600'))
+        
+        # Result size caps for every tool that returns rows (0 = unlimited); calls may lower them
+        self.max_rows = int(os.getenv('DB_MAX_ROWS', '10000'))
+        self.max_bytes = int(os.getenv('DB_MAX_BYTES', str(5 * 1024 * 1024)))
+        # Rewrite a plain SELECT to TOP (max rows + 1) so the server never sends rows past the cap
+        self.limit_pushdown = os.getenv('DB_LIMIT_PUSHDOWN', 'true').lower() in ('1', 'true', 'yes')
+        
+        # Opt-in cache of read-only query results, invalidated by writes through this server
+        self.query_cache: Optional[QueryCache] = None
+        if os.getenv('DB_QUERY_CACHE', 'false').lower() in ('1', 'true', 'yes'):
+            self.query_cache = QueryCache(
+                max_bytes=int(os.getenv('DB_QUERY_CACHE_MAX_BYTES', str(32 * 1024 * 1024))),
+                ttl=float(os.getenv('DB_QUERY_CACHE_TTL', '60'))
+            )
+        
+        # Calls, errors, rows, bytes and latency per query fingerprint, reported by query_stats
+        self.query_stats = QueryStats(int(os.getenv('DB_QUERY_STATS_MAX_FINGERPRINTS', '1000')))
+        
+        # Stored procedure signatures, used to type table-valued parameters
+        self.procedure_signatures = SignatureCache(float(os.getenv('DB_PROCEDURE_SIGNATURE_TTL', '300')))
+        
+        # bulk_insert rows sent per executemany call, each chunk committed as one transaction
+        self.bulk_insert_batch_size = int(os.getenv('DB_BULK_INSERT_BATCH_SIZE', '1000'))
+        
+        # Paged execute_query results keep a live cursor (and its connection) between fetch_next calls
+        self.cursors: Dict[str, PagedCursor] = {}
+        self.cursors_lock = threading.Lock()
+        self.cursor_idle_ttl = float(os.getenv('DB_CURSOR_IDLE_TTL', '300'))
+        # Caps on open sessions and cursors, which between them leave one connection free
+        self.max_sessions, self.max_cursors = self.held_connection_limits(self.pool_max_size)
+        
+        # Session options applied once when each pooled connection is opened
+        # NOCOUNT ON hides the row counts rowsAffected is read from, so by default it only
+        # applies to the read path pool, whose calls report rows read instead
+        set_nocount = os.getenv('DB_SET_NOCOUNT', 'read').lower()
+        if set_nocount in ('1', 'true', 'yes'):
+            self.set_nocount = "all"
+        elif set_nocount in ('0', 'false', 'no'):
+            self.set_nocount = None
+        elif set_nocount == 'read':
+            self.set_nocount = "read"
+        else:
+            raise ValueError(f"Unsupported DB_SET_NOCOUNT: {set_nocount}")
+        self.set_arithabort = os.getenv('DB_SET_ARITHABORT', 'true').lower() in ('1', 'true', 'yes')
+        lock_timeout = os.getenv('DB_LOCK_TIMEOUT_MS', '').strip()
+        self.lock_timeout_ms = int(lock_timeout) if lock_timeout else None
+        # Isolation level for the metadata / read-only path: SNAPSHOT or READ UNCOMMITTED
+        self.read_isolation_level = os.getenv('DB_READ_ISOLATION_LEVEL', '').strip().upper().replace('_', ' ') or None
+        if self.read_isolation_level not in (None, "SNAPSHOT", "READ UNCOMMITTED", "READ COMMITTED"):
+            raise ValueError(f"Unsupported DB_READ_ISOLATION_LEVEL: {self.read_isolation_level}")
+        # The level the read path actually uses once connected
+        self.read_path_isolation = self.read_isolation_level
+        
+        # Idle connections are pre-pinged after this many seconds without use
+        self.ping_idle_after = float(os.getenv('DB_PING_IDLE_AFTER', '60'))
+        
+        # Retry and reconnect policy for transient errors (failover, deadlock, network blip)
+        self.retry_attempts = int(os.getenv('DB_RETRY_ATTEMPTS', '3'))
+        self.retry_base_delay = float(os.getenv('DB_RETRY_BASE_DELAY', '0.2'))
+        self.retry_max_delay = float(os.getenv('DB_RETRY_MAX_DELAY', '5'))
+        
+        # Circuit breaker: after repeated outage errors, fail fast instead of
+        # letting every call wait out its own connect or query timeout
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('DB_BREAKER_FAILURE_THRESHOLD', '5')),
+            reset_timeout=float(os.getenv('DB_BREAKER_RESET_TIMEOUT', '30')),
+            half_open_max_calls=int(os.getenv('DB_BREAKER_HALF_OPEN_MAX_CALLS', '1'))
+        )
+        
+        # Blocking database work runs here, never on the asyncio event loop.
+        # One worker per pooled connection, so a worker never waits on a checkout.
+        self.executor_workers = self.pool_max_size
+        self.executor = self._create_executor()
+        self.calls_in_flight = 0
+        
+        # Admission control in front of the executor: interactive metadata calls are
+        # served first, batch work is capped so it cannot take every worker
+        capacity = self.executor_workers
+        self.admission = AdmissionController(capacity, [
+            PriorityClass(
+                "interactive", 0,
+                int(os.getenv('DB_INTERACTIVE_MAX_CONCURRENCY', str(capacity))),
+                int(os.getenv('DB_INTERACTIVE_MAX_QUEUE', '100'))
+            ),
+            PriorityClass(
+                "standard", 1,
+                int(os.getenv('DB_STANDARD_MAX_CONCURRENCY', str(max(1, capacity - 1)))),
+                int(os.getenv('DB_STANDARD_MAX_QUEUE', '100'))
+            ),
+            PriorityClass(
+                "batch", 2,
+                int(os.getenv('DB_BATCH_MAX_CONCURRENCY', str(max(1, capacity // 2)))),
+                int(os.getenv('DB_BATCH_MAX_QUEUE', '50'))
+            )
+        ])
+    
+    @property
+    def is_connected(self) -> bool:
+        return self.pool is not None and not self.pool.closed
+    
+    @staticmethod
+    def held_connection_limits(pool_max_size: int) -> Tuple[int, int]:
+        """DB_MAX_SESSIONS and DB_MAX_CURSORS, which together must leave one pooled connection free"""
+        # Sessions and open cursors each hold a primary pool connection between calls; if
+        # they could take every connection, calls outside them would wait for a checkout
+        budget = max(0, pool_max_size - 1)
+        max_sessions = os.getenv('DB_MAX_SESSIONS', '').strip()
+        max_cursors = os.getenv('DB_MAX_CURSORS', '').strip()
+        if max_sessions and max_cursors:
+            sessions, cursors = int(max_sessions), int(max_cursors)
+        elif max_sessions:
+            sessions = int(max_sessions)
+            cursors = max(0, budget - sessions)
+        elif max_cursors:
+            cursors = int(max_cursors)
+            sessions = max(0, budget - cursors)
+        else:
+            # Split the budget, favouring sessions
+            cursors = budget // 2
+            sessions = budget - cursors
+        if sessions < 0 or cursors < 0:
+            raise ValueError("DB_MAX_SESSIONS and DB_MAX_CURSORS cannot be negative")
+        if sessions + cursors > budget:
+            raise ValueError(
+                f"DB_MAX_SESSIONS ({sessions}) plus DB_MAX_CURSORS ({cursors}) must be less than "
+                f"DB_POOL_MAX_SIZE ({pool_max_size}) so calls outside them still get a connection"
+            )
+        return sessions, cursors
+    
+    def _create_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.executor_workers, thread_name_prefix="db-worker")
     
     def connect(self, server: str, database: str, user: str = None, password: str = None) -> str:
         """Connect to SQL Server database"""
         try:
-            if self.is_connected and self.connection:
+            if self.is_connected:
                 self.disconnect()
+            if self.executor is None:
+                self.executor = self._create_executor()
             
-            # Build connection string
-            if user and password:
-                # SQL Server authentication
-                conn_str = (
-                    f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-                    f"SERVER={server};"
-                    f"DATABASE={database};"
-                    f"UID={user};"
-                    f"PWD={password};"
-                    f"Encrypt=yes;"
-                    f"TrustServerCertificate=yes;"
-                )
-            else:
-                # Windows authentication
-                conn_str = (
-                    f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-                    f"SERVER={server};"
-                    f"DATABASE={database};"
-                    f"Trusted_Connection=yes;"
-                    f"Encrypt=yes;"
-                    f"TrustServerCertificate=yes;"
+            primary_pool = self._create_pool(self._build_connection_string(server, database, user, password))
+            primary_pool.open()
+            
+            # SET TRANSACTION ISOLATION LEVEL SNAPSHOT succeeds, but every statement after it
+            # fails with error 3952 unless the database allows snapshot isolation
+            self.read_path_isolation = self.read_isolation_level
+            self.read_isolation_note = None
+            if self.read_isolation_level == "SNAPSHOT" and not self._snapshot_isolation_allowed(primary_pool):
+                self.read_path_isolation = None
+                self.read_isolation_note = (
+                    f"ALLOW_SNAPSHOT_ISOLATION is OFF for {database}, so read-only work ignores "
+                    f"DB_READ_ISOLATION_LEVEL=SNAPSHOT"
                 )
             
-            self.connection = pyodbc.connect(conn_str, timeout=30)
-            self.is_connected = True
+            # The read path pool is optional - fall back to the primary if it cannot open.
+            # It targets a readable secondary, or the primary with the read isolation level.
+            read_pool = None
+            self.read_pool_error = None
+            if self.read_intent_routing or self.read_path_isolation:
+                try:
+                    read_pool = self._create_pool(
+                        self._build_connection_string(server, database, user, password,
+                                                      read_only=self.read_intent_routing),
+                        read_path=True
+                    )
+                    read_pool.open()
+                except Exception as e:
+                    read_pool = None
+                    self.read_pool_error = str(e)
             
-            return f"Successfully connected to database {database} on server {server}"
+            self.pool = primary_pool
+            self.read_pool = read_pool
+            self.server = server
+            self.database = database
+            
+            message = f"Successfully connected to database {database} on server {server}"
+            if read_pool is not None and self.read_intent_routing:
+                message += " (read-only routing enabled)"
+            elif self.read_pool_error:
+                message += f" (read path pool unavailable: {self.read_pool_error})"
+            if self.read_isolation_note:
+                message += f" ({self.read_isolation_note})"
+            return message
         
         except Exception as e:
-            self.is_connected = False
+            self.pool = None
+            self.read_pool = None
             raise Exception(f"Failed to connect to database: {str(e)}")
     
+    @staticmethod
+    def _snapshot_isolation_allowed(pool: ConnectionPool) -> bool:
+        """Whether the connected database has ALLOW_SNAPSHOT_ISOLATION ON"""
+        try:
+            with pool.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT snapshot_isolation_state FROM sys.databases WHERE name = DB_NAME()")
+                row = cursor.fetchone()
+                cursor.close()
+        except Exception:
+            # Unknown - the primary pool at the default level is the safe choice
+            return False
+        # 1 = ON; 2 and 3 are the transitions to OFF and ON
+        return row is not None and row[0] == 1
+    
+    @staticmethod
+    def _build_connection_string(server: str, database: str, user: str = None, password: str = None,
+                                 read_only: bool = False) -> str:
+        """Build the ODBC connection string"""
+        if user and password:
+            # SQL Server authentication
+            conn_str = (
+                f"DRIVER={{ODBC Driver 17 for SQL Server}};"
+                f"SERVER={server};"
+                f"DATABASE={database};"
+                f"UID={user};"
+                f"PWD={password};"
+                f"Encrypt=yes;"
+                f"TrustServerCertificate=yes;"
+            )
+        else:
+            # Windows authentication
+            conn_str = (
+                f"DRIVER={{ODBC Driver 17 for SQL Server}};"
+                f"SERVER={server};"
+                f"DATABASE={database};"
+                f"Trusted_Connection=yes;"
+                f"Encrypt=yes;"
+                f"TrustServerCertificate=yes;"
+            )
+        
+        if read_only:
+            # Lets an Availability Group listener route the session to a readable secondary
+            conn_str += "ApplicationIntent=ReadOnly;"
+        return conn_str
+    
+    def _create_pool(self, conn_str: str, read_path: bool = False) -> ConnectionPool:
+        """Create a connection pool for one connection string"""
+        return ConnectionPool(
+            functools.partial(self._open_connection, conn_str, read_path),
+            min_size=self.pool_min_size,
+            max_size=self.pool_max_size,
+            checkout_timeout=self.pool_checkout_timeout,
+            idle_timeout=self.pool_idle_timeout,
+            is_disconnect=is_disconnect_error
+        )
+    
+    def session_options_sql(self, read_path: bool = False) -> str:
+        """SET statements applied to every new pooled connection"""
+        statements = []
+        if self.set_nocount == "all" or (self.set_nocount == "read" and read_path):
+            # Suppresses DONE_IN_PROC row count messages
+            statements.append("SET NOCOUNT ON;")
+        if self.set_arithabort:
+            statements.append("SET ARITHABORT ON;")
+        if self.lock_timeout_ms is not None:
+            statements.append(f"SET LOCK_TIMEOUT {int(self.lock_timeout_ms)};")
+        if read_path and self.read_path_isolation:
+            # Metadata and SELECT-only work should not queue behind long writers
+            statements.append(f"SET TRANSACTION ISOLATION LEVEL {self.read_path_isolation};")
+        return " ".join(statements)
+    
+    def _open_connection(self, conn_str: str, read_path: bool = False):
+        """Open one pooled connection"""
+        def connect():
+            # Pooled connections autocommit so a checkout never hands over an open transaction
+            connection = self.connection_factory(conn_str, timeout=30, autocommit=True)
+            
+            # Apply the session option profile once, in a single round trip
+            options_sql = self.session_options_sql(read_path)
+            if options_sql:
+                try:
+                    cursor = connection.cursor()
+                    cursor.execute(options_sql)
+                    cursor.close()
+                except Exception:
+                    connection.close()
+                    raise
+            return connection
+        
+        # The first connect fails fast; reconnects after a dropped connection back off and
+        # retry, unless a retrying method is already around this checkout
+        if self.pool is None or _retry_active.get():
+            return connect()
+        return call_with_retry(
+            connect,
+            max_retries=self.retry_attempts,
+            base_delay=self.retry_base_delay,
+            max_delay=self.retry_max_delay
+        )
+    
     def disconnect(self) -> str:
         """Disconnect from database"""
         try:
-            if self.connection:
-                self.connection.close()
-                self.connection = None
-            self.is_connected = False
+            self.end_all_sessions()
+            self.close_all_cursors()
+            if self.pool:
+                self.pool.close()
+                self.pool = None
+            if self.read_pool:
+                self.read_pool.close()
+                self.read_pool = None
+            if self.executor is not None:
+                # Running calls finish on their own; idle worker threads exit now
+                self.executor.shutdown(wait=False)
+                self.executor = None
             return "Successfully disconnected from database"
         except Exception as e:
             raise Exception(f"Failed to disconnect from database: {str(e)}")
     
+    def check_health(self) -> Dict[str, Any]:
+        """Pre-ping idle connections, evict stale ones and refill pools to their minimum size"""
+        report = {"expired_sessions": self.expire_sessions(), "expired_cursors": self.expire_cursors()}
+        
+        for label, pool in (("pool", self.pool), ("read_pool", self.read_pool)):
+            if pool is None or pool.closed:
+                continue
+            evicted = pool.evict_idle()
+            failed_pings = pool.ping_idle(self.ping_idle_after)
+            try:
+                opened = pool.fill_to_min()
+                error = None
+            except Exception as e:
+                opened = 0
+                error = str(e)
+            report[label] = {"evicted": evicted, "failed_pings": failed_pings, "opened": opened, "error": error}
+        
+        return report
+    
     def ensure_connected(self):
         """Ensure database is connected"""
-        if not self.is_connected or not self.connection:
+        if not self.is_connected:
             raise Exception("Database is not connected. Please connect first.")
     
-    def execute_query(self, query: str, parameters: Dict[str, Any] = None) -> Dict[str, Any]:
+    def _pool_for(self, read_only: bool) -> ConnectionPool:
+        """Pick the read-only secondary pool for read-intent work when one is open"""
+        if read_only and self.read_pool is not None and not self.read_pool.closed:
+            record_call_metadata("route", "read-only" if self.read_intent_routing else "read-isolation")
+            return self.read_pool
+        return self.pool
+    
+    def begin_session(self, idle_ttl: float = None) -> Dict[str, Any]:
+        """Pin a pooled connection to a new session ID"""
+        self.ensure_connected()
+        self.expire_sessions()
+        
+        # Reserve the slot before acquiring, so concurrent calls cannot all pass the check
+        with self.sessions_lock:
+            if len(self.sessions) + self.sessions_starting >= self.max_sessions:
+                raise Exception(
+                    f"Too many open sessions ({self.max_sessions}). End an existing session with end_session first."
+                )
+            self.sessions_starting += 1
+        
+        try:
+            with self._backend_guard():
+                pooled = self.pool.acquire()
+        except Exception:
+            with self.sessions_lock:
+                self.sessions_starting -= 1
+            raise
+        session = PinnedSession(secrets.token_hex(8), pooled, idle_ttl or self.session_idle_ttl)
+        with self.sessions_lock:
+            self.sessions_starting -= 1
+            self.sessions[session.session_id] = session
+        return session.describe()
+    
+    def end_session(self, session_id: str) -> str:
+        """Release a session's pinned connection"""
+        with self.sessions_lock:
+            session = self.sessions.pop(session_id, None)
+        if session is None:
+            raise Exception(f"Unknown or expired session '{session_id}'")
+        
+        self._close_session(session)
+        return f"Session {session_id} ended"
+    
+    def _close_session(self, session: PinnedSession):
+        # Temp tables and SET options stay on the connection, so never hand it to another caller
+        with session.lock:
+            if self.pool is not None:
+                self.pool.release(session.pooled, discard=True)
+            else:
+                session.pooled.close()
+    
+    def expire_sessions(self) -> int:
+        """End sessions that have been idle longer than their TTL"""
+        now = time.monotonic()
+        with self.sessions_lock:
+            expired = [session for session in self.sessions.values() if session.expired(now)]
+            for session in expired:
+                del self.sessions[session.session_id]
+        
+        for session in expired:
+            self._close_session(session)
+        return len(expired)
+    
+    def end_all_sessions(self):
+        with self.sessions_lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        
+        for session in sessions:
+            self._close_session(session)
+    
+    @contextmanager
+    def _session_connection(self, session_id: str):
+        """Yield the connection pinned to a session"""
+        self.expire_sessions()
+        with self.sessions_lock:
+            session = self.sessions.get(session_id)
+        if session is None:
+            raise Exception(f"Unknown or expired session '{session_id}'. Start a new one with begin_session.")
+        
+        with session.lock:
+            session.touch()
+            try:
+                yield session.pooled.connection
+            except Exception as e:
+                if is_disconnect_error(e):
+                    # The pinned connection is gone, and its temp tables with it
+                    session.pooled.mark_broken(e)
+                    with self.sessions_lock:
+                        self.sessions.pop(session_id, None)
+                    self.pool.release(session.pooled)
+                    self.pool.discard_idle(time.monotonic())
+                    raise Exception(f"Session '{session_id}' lost its connection: {str(e)}")
+                raise
+            finally:
+                session.last_used_at = time.monotonic()
+    
+    @contextmanager
+    def _backend_guard(self):
+        """Fail fast while the circuit breaker is open, otherwise feed it the call's outcome"""
+        try:
+            with self.breaker.guard():
+                yield
+        except CircuitOpenError as e:
+            record_call_metadata("circuit", self.breaker.state)
+            record_call_metadata("retryAfterMs", int(e.retry_after * 1000))
+            raise
+    
+    @contextmanager
+    def _checkout(self, read_only: bool = False, session_id: str = None):
+        """Yield a connection: the session's pinned one, or one from the routed pool"""
+        with self._backend_guard():
+            if session_id:
+                with self._session_connection(session_id) as connection:
+                    try:
+                        yield connection
+                    finally:
+                        self._forget_cursors(connection)
+            else:
+                with self._pool_for(read_only).connection() as connection:
+                    try:
+                        yield connection
+                    finally:
+                        self._forget_cursors(connection)
+    
+    @staticmethod
+    def _open_cursor(connection):
+        """Open a cursor that the current tool call can cancel"""
+        cursor = connection.cursor()
+        scope = current_call.get()
+        if scope is not None:
+            try:
+                scope.track(connection, cursor)
+            except CallCancelledError:
+                cursor.close()
+                raise
+        return cursor
+    
+    @staticmethod
+    def _forget_cursors(connection):
+        """Stop cancelling cursors of a connection that is going back to the pool"""
+        scope = current_call.get()
+        if scope is not None:
+            scope.forget(connection)
+    
+    def result_limits(self, max_rows: int = None, max_bytes: int = None) -> ResultLimits:
+        """Row and byte caps for one call: the global caps, optionally lowered by the caller"""
+        return ResultLimits.combine(self.max_rows, self.max_bytes, max_rows, max_bytes)
+    
+    def execute_query(self, query: str, parameters: Dict[str, Any] = None, read_only: bool = None,
+                      session_id: str = None, page_size: int = None, max_rows: int = None,
+                      max_bytes: int = None, profile: bool = False, include_plan: bool = False) -> Dict[str, Any]:
         """Execute a SQL query"""
         self.ensure_connected()
+        started_at = time.perf_counter()
+        
+        # Classify the statement unless the caller already knows its intent
+        if read_only is None:
+            read_only = is_read_only(query)
+        
+        if page_size:
+            if profile:
+                raise ValueError("profile cannot be combined with pageSize")
+            if max_rows is not None or max_bytes is not None:
+                # Each page is bounded by its size; a cap across pages would silently stop short
+                raise ValueError("maxRows and maxBytes cannot be combined with pageSize")
+            try:
+                page = self._execute_paged(query, parameters, read_only, session_id, page_size)
+            except Exception:
+                self._record_query_stats(query, started_at, error=True)
+                raise
+            self._record_query_stats(query, started_at, rows=len(page["recordset"]))
+            return page
         
+        limits = self.result_limits(max_rows, max_bytes)
+        query_profile = QueryProfile(include_plan) if profile else None
+        
+        # Session statements may depend on temp tables, so only sessionless reads are cached;
+        # a profiled query always runs
+        cache_key = None
+        if self.query_cache is not None and read_only and not session_id and query_profile is None:
+            cache_key = (
+                normalize_sql(query),
+                json.dumps(parameters or {}, sort_keys=True, default=str),
+                limits.max_rows,
+                limits.max_bytes
+            )
+            cached = self.query_cache.get(cache_key)
+            if cached is not None:
+                record_call_metadata("cache", "hit")
+                self._record_query_stats(query, started_at, rows=len(cached["recordset"]), cached=True)
+                return cached
+            generation = self.query_cache.generation
+        
+        original_query = query
+        query, pushed_top = self._push_down_limit(query, limits)
         try:
-            cursor = self.connection.cursor()
-            
-            if parameters:
-                # Convert parameters to a list in the order they appear in the query
-                param_values = []
-                for key, value in parameters.items():
-                    # Replace named parameters with ? placeholders
-                    query = query.replace(f"@{key}", "?")
-                    param_values.append(value)
+            with self._checkout(read_only, session_id) as connection:
+                cursor = self._open_cursor(connection)
+                if query_profile is not None:
+                    cursor.execute(statistics_sql(include_plan, on=True))
                 
-                cursor.execute(query, param_values)
-            else:
-                cursor.execute(query)
-            
-            # Get column names
-            columns = [column[0] for column in cursor.description] if cursor.description else []
-            
-            # Fetch all rows
-            rows = cursor.fetchall()
-            
-            # Convert to list of dictionaries
-            result_set = []
-            for row in rows:
-                row_dict = {}
-                for i, value in enumerate(row):
-                    row_dict[columns[i]] = value
-                result_set.append(row_dict)
-            
-            # Get rows affected
-            rows_affected = cursor.rowcount if cursor.rowcount > 0 else len(result_set)
-            
-            cursor.close()
+                try:
+                    if parameters:
+                        # Bind @name references to ? placeholders in the order they appear
+                        query, param_values = bind_parameters(query, parameters)
+                        cursor.execute(query, param_values)
+                    else:
+                        cursor.execute(query)
+                    
+                    if query_profile is not None:
+                        # Plans of statements that ran before the first result
+                        query_profile.skip_plans(cursor)
+                    
+                    # Get column names
+                    columns = [column[0] for column in cursor.description] if cursor.description else []
+                    
+                    # Read rows as dictionaries, stopping at the row and byte caps
+                    result_set = limits.read_result_set(cursor, columns) if cursor.description else []
+                    
+                    # Get rows affected
+                    if limits.truncated:
+                        rows_affected = len(result_set)
+                    else:
+                        rows_affected = cursor.rowcount if cursor.rowcount > 0 else len(result_set)
+                    
+                    if query_profile is not None and not limits.truncated:
+                        # Statistics messages arrive after the rows they describe
+                        query_profile.drain(cursor)
+                    
+                    cursor.close()
+                finally:
+                    if query_profile is not None:
+                        self._end_profile(connection, cursor, include_plan)
             
-            return {
+            result = {
                 "recordset": result_set,
                 "columns": columns,
-                "rowsAffected": rows_affected
+                "rowsAffected": rows_affected,
+                **limits.report()
             }
+            if pushed_top is not None:
+                result["limitPushdown"] = {"top": pushed_top}
+            if query_profile is not None:
+                result["profile"] = query_profile.summary()
+                if include_plan:
+                    result["plans"] = query_profile.plans
+            if cache_key is not None:
+                self.query_cache.put(cache_key, result, limits.bytes + len(cache_key[0]),
+                                     referenced_tables(query), generation)
+            self._record_query_stats(original_query, started_at, rows=len(result_set), size=limits.bytes)
+            return result
             
+        except Exception as e:
+            self._record_query_stats(original_query, started_at, error=True)
+            raise Exception(f"Failed to execute query: {str(e)}")
+        finally:
+            if not read_only:
+                self.invalidate_cache(query)
+    
+    def _push_down_limit(self, query: str, limits: ResultLimits):
+        """The query rewritten to SELECT TOP (max rows + 1) when that is safe, and the TOP it got"""
+        if not self.limit_pushdown or limits.max_rows is None:
+            return query, None
+        # One row past the cap is how the reader knows the result was truncated
+        top = limits.max_rows + 1
+        limited = limit_select(query, top)
+        if limited is None:
+            return query, None
+        limits.pushed_down = True
+        return limited, top
+    
+    def _record_query_stats(self, query: str, started_at: float, rows: int = 0, size: int = 0,
+                            error: bool = False, cached: bool = False):
+        """Add one call to the statistics of the query's fingerprint"""
+        fingerprint, text = fingerprint_sql(query)
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        self.query_stats.record(fingerprint, text, elapsed_ms, rows, size, error, cached)
+    
+    @staticmethod
+    def _end_profile(connection: Any, cursor: Any, include_plan: bool):
+        """Turn statistics off again before the connection goes back to the pool"""
+        try:
+            # Discards any results left on the profiled cursor
+            cursor.close()
+        except Exception:
+            pass
+        reset = connection.cursor()
+        reset.execute(statistics_sql(include_plan, on=False))
+        reset.close()
+    
+    def invalidate_cache(self, query: str = None):
+        """Drop cached results a write may have changed (all of them when the write is opaque)"""
+        if self.query_cache is None:
+            return
+        if query is None or changes_schema_or_runs_code(query):
+            self.query_cache.clear()
+            return
+        tables = referenced_tables(query)
+        if tables:
+            self.query_cache.invalidate_tables(tables)
+        else:
+            self.query_cache.clear()
+    
+    def _execute_paged(self, query: str, parameters: Dict[str, Any], read_only: bool, session_id: str,
+                       page_size: int) -> Dict[str, Any]:
+        """Execute a query and return its first page, keeping the cursor open for fetch_next"""
+        if session_id:
+            # A pinned connection cannot run other statements while a result set is pending
+            raise Exception("pageSize cannot be combined with sessionId")
+        if page_size < 1:
+            raise ValueError("pageSize must be at least 1")
+        
+        self.expire_cursors()
+        with self.cursors_lock:
+            if len(self.cursors) >= self.max_cursors:
+                raise Exception(
+                    f"Too many open cursors ({self.max_cursors}). Read them to the end or call close_cursor first."
+                )
+        
+        pool = self._pool_for(read_only)
+        try:
+            with self._backend_guard():
+                pooled = pool.acquire()
+                try:
+                    cursor = self._open_cursor(pooled.connection)
+                    if parameters:
+                        query, param_values = bind_parameters(query, parameters)
+                        cursor.execute(query, param_values)
+                    else:
+                        cursor.execute(query)
+                except Exception as e:
+                    if is_disconnect_error(e):
+                        pooled.mark_broken(e)
+                        pool.discard_idle(time.monotonic())
+                    pool.release(pooled)
+                    raise
+                finally:
+                    # From here on each page read is tracked by the call that reads it
+                    self._forget_cursors(pooled.connection)
         except Exception as e:
             raise Exception(f"Failed to execute query: {str(e)}")
+        finally:
+            if not read_only:
+                self.invalidate_cache(query)
+        
+        if cursor.description is None:
+            # Nothing to page through
+            rows_affected = cursor.rowcount
+            cursor.close()
+            pool.release(pooled)
+            return {"recordset": [], "columns": [], "rowsAffected": rows_affected, "hasMore": False,
+                    "continuationToken": None}
+        
+        columns = [column[0] for column in cursor.description]
+        paged = PagedCursor(secrets.token_urlsafe(16), pool, pooled, cursor, columns, page_size, self.cursor_idle_ttl)
+        with self.cursors_lock:
+            self.cursors[paged.token] = paged
+        return self._read_page(paged, page_size)
+    
+    def _read_page(self, paged: PagedCursor, page_size: int) -> Dict[str, Any]:
+        """Fetch one page from an open cursor, closing it once the result set is exhausted"""
+        scope = current_call.get()
+        with paged.lock:
+            try:
+                if scope is not None:
+                    scope.track(paged.pooled.connection, paged.cursor)
+                try:
+                    rows = paged.fetch_page(page_size)
+                finally:
+                    if scope is not None:
+                        scope.forget(cursor=paged.cursor)
+            except Exception as e:
+                if is_disconnect_error(e):
+                    paged.pooled.mark_broken(e)
+                    paged.pool.discard_idle(time.monotonic())
+                with self.cursors_lock:
+                    self.cursors.pop(paged.token, None)
+                paged.close()
+                raise Exception(f"Failed to fetch the next page: {str(e)}")
+            
+            if paged.exhausted:
+                with self.cursors_lock:
+                    self.cursors.pop(paged.token, None)
+                paged.close()
+        
+        return {
+            "recordset": [dict(zip(paged.columns, row)) for row in rows],
+            "columns": paged.columns,
+            "page": paged.pages,
+            "rowsFetched": paged.rows_fetched,
+            "hasMore": not paged.exhausted,
+            "continuationToken": None if paged.exhausted else paged.token
+        }
+    
+    def fetch_next(self, token: str, page_size: int = None) -> Dict[str, Any]:
+        """Return the next page of a paged execute_query result"""
+        self.expire_cursors()
+        with self.cursors_lock:
+            paged = self.cursors.get(token)
+        if paged is None:
+            raise Exception("Unknown or expired continuation token. Run the query again.")
+        return self._read_page(paged, page_size or paged.page_size)
+    
+    def close_cursor(self, token: str) -> str:
+        """Discard the rest of a paged result and release its connection"""
+        with self.cursors_lock:
+            paged = self.cursors.pop(token, None)
+        if paged is None:
+            raise Exception("Unknown or expired continuation token")
+        with paged.lock:
+            paged.close()
+        return "Cursor closed"
+    
+    def expire_cursors(self) -> int:
+        """Close cursors that have been idle longer than their TTL"""
+        now = time.monotonic()
+        with self.cursors_lock:
+            expired = [paged for paged in self.cursors.values() if paged.expired(now)]
+            for paged in expired:
+                del self.cursors[paged.token]
+        
+        for paged in expired:
+            paged.close()
+        return len(expired)
+    
+    def close_all_cursors(self):
+        with self.cursors_lock:
+            cursors = list(self.cursors.values())
+            self.cursors.clear()
+        
+        for paged in cursors:
+            paged.close()
     
+    @retry_transient_errors
     def list_tables(self, schema: str = "dbo") -> List[Dict[str, Any]]:
         """List all tables in the database"""
         query = """
@@ -155,52 +995,81 @@ class DatabaseService:
             ORDER BY TABLE_NAME
         """
         
-        result = self.execute_query(query, {"schema": schema})
+        result = self.execute_query(query, {"schema": schema}, read_only=True)
+        return self._metadata_rows(result)
+    
+    @staticmethod
+    def _metadata_rows(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """The rows of a metadata query, noting in the call metadata when a cap cut the list short"""
+        if result.get("truncated"):
+            record_call_metadata("truncated", True)
+            record_call_metadata("truncatedBy", result["truncatedBy"])
+            record_call_metadata("rowsFetched", result["rowsFetched"])
         return result["recordset"]
     
-    def describe_table(self, table_name: str, schema: str = "dbo") -> Dict[str, Any]:
-        """Get detailed information about a table"""
-        columns_query = """
-            SELECT 
-                COLUMN_NAME,
-                DATA_TYPE,
-                IS_NULLABLE,
-                COLUMN_DEFAULT,
-                CHARACTER_MAXIMUM_LENGTH,
-                NUMERIC_PRECISION,
-                NUMERIC_SCALE,
-                ORDINAL_POSITION
-            FROM INFORMATION_SCHEMA.COLUMNS 
-            WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ?
-            ORDER BY ORDINAL_POSITION
-        """
+    def execute_result_sets(self, query: str, param_values: List[Any] = None) -> List[List[Dict[str, Any]]]:
+        """Run a read-only multi-statement batch in one round trip and return every result set"""
+        self.ensure_connected()
         
-        indexes_query = """
-            SELECT 
-                i.name AS index_name,
-                i.type_desc AS index_type,
-                i.is_unique,
-                i.is_primary_key,
-                c.name AS column_name
-            FROM sys.indexes i
-            JOIN sys.index_columns ic ON i.object_id = ic.object_id AND i.index_id = ic.index_id
-            JOIN sys.columns c ON ic.object_id = c.object_id AND ic.column_id = c.column_id
-            JOIN sys.tables t ON i.object_id = t.object_id
-            JOIN sys.schemas s ON t.schema_id = s.schema_id
-            WHERE s.name = ? AND t.name = ?
-            ORDER BY i.name, ic.key_ordinal
-        """
+        cache_key = None
+        if self.query_cache is not None:
+            cache_key = ("result_sets", normalize_sql(query), json.dumps(param_values or [], default=str))
+            cached = self.query_cache.get(cache_key)
+            if cached is not None:
+                record_call_metadata("cache", "hit")
+                return cached
+            generation = self.query_cache.generation
+        
+        limits = self.result_limits()
+        try:
+            with self._checkout(read_only=True) as connection:
+                cursor = self._open_cursor(connection)
+                cursor.execute(query, param_values or [])
+                
+                result_sets = []
+                while True:
+                    # Row count messages from DECLARE or SET statements have no description
+                    if cursor.description:
+                        columns = [column[0] for column in cursor.description]
+                        result_sets.append(limits.read_result_set(cursor, columns))
+                        if limits.truncated:
+                            record_call_metadata("truncated", True)
+                            record_call_metadata("truncatedBy", limits.truncated_by)
+                            break
+                    if not cursor.nextset():
+                        break
+                
+                cursor.close()
+        except Exception as e:
+            raise Exception(f"Failed to execute batch: {str(e)}")
         
-        columns = self.execute_query(columns_query, {"schema": schema, "table_name": table_name})
-        indexes = self.execute_query(indexes_query, {"schema": schema, "table_name": table_name})
+        if cache_key is not None and not limits.truncated:
+            self.query_cache.put(cache_key, result_sets, limits.bytes + len(cache_key[1]),
+                                 referenced_tables(query), generation)
+        return result_sets
+    
+    @retry_transient_errors
+    def describe_table(self, table_name: str, schema: str = "dbo") -> Dict[str, Any]:
+        """Get detailed information about a table"""
+        # Columns and indexes come back as two result sets of one batch
+        batch = f"{TABLE_PARAMETERS_SQL}\n{TABLE_COLUMNS_SQL};\n{TABLE_INDEXES_SQL};"
+        columns, indexes = self._result_sets_or_empty(
+            self.execute_result_sets(batch, [schema, table_name]), 2
+        )
         
         return {
             "table": f"{schema}.{table_name}",
-            "columns": columns["recordset"],
-            "indexes": indexes["recordset"]
+            "columns": columns,
+            "indexes": indexes
         }
+    
+    @staticmethod
+    def _result_sets_or_empty(result_sets: List[List[Dict[str, Any]]], count: int) -> List[List[Dict[str, Any]]]:
+        """Pad a truncated batch result so every expected result set is present"""
+        return result_sets[:count] + [[] for _ in range(count - len(result_sets))]
         
-    def generate_query_from_template(self, template_file: str, parameters: Dict[str, Any] = None) -> Dict[str, Any]:
+    def generate_query_from_template(self, template_file: str, parameters: Dict[str, Any] = None,
+                                     max_rows: int = None, max_bytes: int = None) -> Dict[str, Any]:
         """Generate a SQL query from a template file with parameter substitution"""
         self.ensure_connected()
         
@@ -248,19 +1117,19 @@ class DatabaseService:
             param_values = {}
             
             if parameters:
-                # Replace named parameters in the template
+                # Only bind parameters the template actually references
+                referenced = variable_names(final_sql)
                 for key, value in parameters.items():
-                    param_placeholder = f"@{key}"
-                    if param_placeholder in final_sql:
+                    if key.lstrip("@").lower() in referenced:
                         # For the generated SQL, keep the parameter as is
                         param_values[key] = value
             
             # Execute the query with parameters if needed
             result = None
             if param_values:
-                result = self.execute_query(final_sql, param_values)
+                result = self.execute_query(final_sql, param_values, max_rows=max_rows, max_bytes=max_bytes)
             else:
-                result = self.execute_query(final_sql)
+                result = self.execute_query(final_sql, max_rows=max_rows, max_bytes=max_bytes)
             
             # Return the template SQL, final SQL (after replacements), and the query results
             return {
@@ -279,85 +1148,46 @@ class DatabaseService:
         except Exception as e:
             raise Exception(f"Failed to generate query from template: {str(e)}")
     
+    @retry_transient_errors
     def get_related_tables(self, table_name: str, schema: str = "dbo") -> Dict[str, Any]:
         """Get a table and all related tables through foreign key relationships"""
         self.ensure_connected()
         
         try:
-            # Get the main table information
-            table_info = self.describe_table(table_name, schema)
-            
-            # Find tables that this table references (outgoing foreign keys)
-            outgoing_fk_query = """
-            SELECT 
-                OBJECT_SCHEMA_NAME(fk.referenced_object_id) AS referenced_schema,
-                OBJECT_NAME(fk.referenced_object_id) AS referenced_table,
-                COL_NAME(fkc.referenced_object_id, fkc.referenced_column_id) AS referenced_column,
-                COL_NAME(fkc.parent_object_id, fkc.parent_column_id) AS referencing_column,
-                fk.name AS foreign_key_name,
-                'Outgoing' AS relationship_type
-            FROM sys.foreign_keys fk
-            INNER JOIN sys.foreign_key_columns fkc ON fk.object_id = fkc.constraint_object_id
-            INNER JOIN sys.tables t ON fk.parent_object_id = t.object_id
-            INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
-            WHERE s.name = ? AND t.name = ?
-            """
-            
-            # Find tables that reference this table (incoming foreign keys)
-            incoming_fk_query = """
-            SELECT 
-                OBJECT_SCHEMA_NAME(fk.parent_object_id) AS referencing_schema,
-                OBJECT_NAME(fk.parent_object_id) AS referencing_table,
-                COL_NAME(fkc.parent_object_id, fkc.parent_column_id) AS referencing_column,
-                COL_NAME(fkc.referenced_object_id, fkc.referenced_column_id) AS referenced_column,
-                fk.name AS foreign_key_name,
-                'Incoming' AS relationship_type
-            FROM sys.foreign_keys fk
-            INNER JOIN sys.foreign_key_columns fkc ON fk.object_id = fkc.constraint_object_id
-            INNER JOIN sys.tables t ON fk.referenced_object_id = t.object_id
-            INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
-            WHERE s.name = ? AND t.name = ?
-            """
-            
-            outgoing_relations = self.execute_query(outgoing_fk_query, {"schema": schema, "table_name": table_name})
-            incoming_relations = self.execute_query(incoming_fk_query, {"schema": schema, "table_name": table_name})
+            # Foreign keys in both directions, with the row count of each related table,
+            # come back as two result sets of one batch
+            batch = f"{TABLE_PARAMETERS_SQL}\n{OUTGOING_FOREIGN_KEYS_SQL};\n{INCOMING_FOREIGN_KEYS_SQL};"
+            outgoing_relations, incoming_relations = self._result_sets_or_empty(
+                self.execute_result_sets(batch, [schema, table_name]), 2
+            )
             
             # Summary of related tables
             related_tables = []
             
             # Process outgoing relationships
-            for relation in outgoing_relations["recordset"]:
+            for relation in outgoing_relations:
                 related_tables.append({
                     "schema": relation["referenced_schema"],
                     "table": relation["referenced_table"],
                     "relationship": "Parent",
                     "foreign_key": relation["foreign_key_name"],
                     "local_column": relation["referencing_column"],
-                    "remote_column": relation["referenced_column"]
+                    "remote_column": relation["referenced_column"],
+                    "row_count": self._row_count_or_unknown(relation["row_count"])
                 })
             
             # Process incoming relationships
-            for relation in incoming_relations["recordset"]:
+            for relation in incoming_relations:
                 related_tables.append({
                     "schema": relation["referencing_schema"],
                     "table": relation["referencing_table"],
                     "relationship": "Child",
                     "foreign_key": relation["foreign_key_name"],
                     "local_column": relation["referenced_column"],
-                    "remote_column": relation["referencing_column"]
+                    "remote_column": relation["referencing_column"],
+                    "row_count": self._row_count_or_unknown(relation["row_count"])
                 })
             
-            # Get summary information for each related table
-            for related_table in related_tables:
-                # Get row count for the table
-                count_query = f"SELECT COUNT(*) AS row_count FROM {related_table['schema']}.{related_table['table']}"
-                try:
-                    count_result = self.execute_query(count_query)
-                    row_count = count_result["recordset"][0]["row_count"] if count_result["recordset"] else 0
-                    related_table["row_count"] = row_count
-                except:
-                    related_table["row_count"] = "Unknown"
-            
             return {
                 "table": f"{schema}.{table_name}",
                 "related_tables": related_tables
@@ -366,6 +1196,12 @@ class DatabaseService:
         except Exception as e:
             raise Exception(f"Failed to get related tables: {str(e)}")
     
+    @staticmethod
+    def _row_count_or_unknown(row_count: Any) -> Any:
+        # NULL when the related table is not visible to the login
+        return "Unknown" if row_count is None else row_count
+    
+    @retry_transient_errors
     def list_stored_procedures(self, schema: str = "dbo", procedure_name_pattern: str = None) -> List[Dict[str, Any]]:
         """List stored procedures with optional name pattern filtering"""
         if procedure_name_pattern:
@@ -382,7 +1218,7 @@ class DatabaseService:
                   AND ROUTINE_NAME LIKE ?
                 ORDER BY ROUTINE_NAME
             """
-            result = self.execute_query(query, {"schema": schema, "pattern": f"%{procedure_name_pattern}%"})
+            result = self.execute_query(query, {"schema": schema, "pattern": f"%{procedure_name_pattern}%"}, read_only=True)
         else:
             query = """
                 SELECT top 10
@@ -395,10 +1231,11 @@ class DatabaseService:
                 WHERE ROUTINE_SCHEMA = ? AND ROUTINE_TYPE = 'PROCEDURE'
                 ORDER BY ROUTINE_NAME
             """
-            result = self.execute_query(query, {"schema": schema})
+            result = self.execute_query(query, {"schema": schema}, read_only=True)
         
-        return result["recordset"]
+        return self._metadata_rows(result)
     
+    @retry_transient_errors
     def get_procedure_details(self, procedure_name: str, schema: str = "dbo") -> Dict[str, Any]:
         """Get details about a stored procedure including parameters and return columns"""
         self.ensure_connected()
@@ -423,7 +1260,7 @@ class DatabaseService:
             ORDER BY p.parameter_id
             """
             
-            parameters_result = self.execute_query(params_query, {"schema": schema, "proc_name": procedure_name})
+            parameters_result = self.execute_query(params_query, {"schema": schema, "proc_name": procedure_name}, read_only=True)
             
             # Get procedure definition to analyze
             def_query = """
@@ -434,51 +1271,58 @@ class DatabaseService:
             WHERE s.name = ? AND p.name = ?
             """
             
-            definition_result = self.execute_query(def_query, {"schema": schema, "proc_name": procedure_name})
+            definition_result = self.execute_query(def_query, {"schema": schema, "proc_name": procedure_name}, read_only=True)
             procedure_definition = definition_result["recordset"][0]["definition"] if definition_result["recordset"] else ""
             
             # Try to determine return columns by executing the procedure with NULL parameters
             return_columns = []
+            sampled = False
             try:
                 # Build minimal execution with NULL params
-                cursor = self.connection.cursor()
+                with self._checkout() as connection:
+                    cursor = self._open_cursor(connection)
                 
-                # Get all parameters
-                param_names = [p["parameter_name"].replace("@", "") for p in parameters_result["recordset"]]
-                param_list = []
-                param_values = []
+                    # Get all parameters
+                    param_names = [p["parameter_name"].replace("@", "") for p in parameters_result["recordset"]]
+                    param_list = []
+                    param_values = []
                 
-                for param in param_names:
-                    param_list.append(f"@{param} = ?")
-                    param_values.append(None)  # Pass NULL for all parameters
+                    for param in param_names:
+                        param_list.append(f"@{param} = ?")
+                        param_values.append(None)  # Pass NULL for all parameters
                 
-                if param_list:
-                    exec_statement = f"EXEC {schema}.{procedure_name} {', '.join(param_list)}"
-                    cursor.execute(exec_statement, param_values)
-                else:
-                    cursor.execute(f"EXEC {schema}.{procedure_name}")
+                    sampled = True
+                    if param_list:
+                        exec_statement = f"EXEC {schema}.{procedure_name} {', '.join(param_list)}"
+                        cursor.execute(exec_statement, param_values)
+                    else:
+                        cursor.execute(f"EXEC {schema}.{procedure_name}")
                 
-                # Get column names if available
-                if cursor.description:
-                    for col in cursor.description:
-                        return_columns.append({
-                            "name": col[0],
-                            "type_code": col[1],
-                            "display_size": col[2],
-                            "internal_size": col[3],
-                            "precision": col[4],
-                            "scale": col[5],
-                            "nullable": col[6]
-                        })
+                    # Get column names if available
+                    if cursor.description:
+                        for col in cursor.description:
+                            return_columns.append({
+                                "name": col[0],
+                                "type_code": col[1],
+                                "display_size": col[2],
+                                "internal_size": col[3],
+                                "precision": col[4],
+                                "scale": col[5],
+                                "nullable": col[6]
+                            })
                         
-                cursor.close()
+                    cursor.close()
             except Exception as e:
                 # It's okay if this fails, we tried our best to get the return columns
                 return_columns.append({"note": f"Could not determine return columns: {str(e)}"})
+            finally:
+                if sampled:
+                    # The sample run may have written anything, like execute_stored_procedure
+                    self.invalidate_cache()
             
             return {
                 "procedure_name": f"{schema}.{procedure_name}",
-                "parameters": parameters_result["recordset"],
+                "parameters": self._metadata_rows(parameters_result),
                 "return_columns": return_columns,
                 "has_definition": bool(procedure_definition)
             }
@@ -486,82 +1330,796 @@ class DatabaseService:
         except Exception as e:
             raise Exception(f"Failed to get procedure details: {str(e)}")
     
-    def execute_stored_procedure(self, procedure_name: str, parameters: Dict[str, Any] = None) -> Dict[str, Any]:
+    def execute_stored_procedure(self, procedure_name: str, parameters: Dict[str, Any] = None,
+                                 session_id: str = None, max_rows: int = None,
+                                 max_bytes: int = None, profile: bool = False,
+                                 include_plan: bool = False) -> Dict[str, Any]:
         """Execute a stored procedure"""
         self.ensure_connected()
+        limits = self.result_limits(max_rows, max_bytes)
+        # The EXEC's own time already includes the statements inside the procedure
+        query_profile = QueryProfile(include_plan, nested=True) if profile else None
+        started_at = time.perf_counter()
         
         try:
-            cursor = self.connection.cursor()
+            # Build the EXEC batch before checking out a connection, since the
+            # procedure's signature may need a metadata lookup
+            batch = build_exec_batch(procedure_name, self.procedure_signature(procedure_name), parameters)
             
-            # Build the EXEC statement
-            if parameters:
-                param_list = []
-                param_values = []
-                for key, value in parameters.items():
-                    param_list.append(f"@{key} = ?")
-                    param_values.append(value)
+            with self._checkout(session_id=session_id) as connection:
+                cursor = self._open_cursor(connection)
+                if query_profile is not None:
+                    cursor.execute(statistics_sql(include_plan, on=True))
                 
-                exec_statement = f"EXEC {procedure_name} {', '.join(param_list)}"
-                cursor.execute(exec_statement, param_values)
-            else:
-                cursor.execute(f"EXEC {procedure_name}")
-            
-            # Get all result sets
-            result_sets = []
-            while True:
                 try:
-                    # Get column names
-                    columns = [column[0] for column in cursor.description] if cursor.description else []
-                    
-                    # Fetch all rows
-                    rows = cursor.fetchall()
+                    cursor.execute(batch.sql, batch.params)
                     
-                    # Convert to list of dictionaries
-                    result_set = []
-                    for row in rows:
-                        row_dict = {}
-                        for i, value in enumerate(row):
-                            row_dict[columns[i]] = value
-                        result_set.append(row_dict)
+                    # Get all result sets
+                    result_sets = []
+                    captured = None
+                    while True:
+                        try:
+                            if query_profile is not None:
+                                query_profile.collect_messages(cursor)
+                            
+                            # Row counts from statements inside the procedure have no columns
+                            if query_profile is not None and query_profile.is_plan(cursor):
+                                query_profile.collect_plan(cursor)
+                            elif cursor.description:
+                                # Get column names
+                                columns = [column[0] for column in cursor.description]
+                                
+                                if columns[0] == RETURN_CODE_COLUMN:
+                                    # The batch's closing SELECT of the return code and OUTPUT values
+                                    captured = cursor.fetchone()
+                                else:
+                                    # Read rows as dictionaries, stopping at the row and byte caps
+                                    result_set = limits.read_result_set(cursor, columns)
+                                    
+                                    result_sets.append({
+                                        "columns": columns,
+                                        "data": result_set
+                                    })
+                                    
+                                    # The rest of the results were cancelled once a cap was hit,
+                                    # including the return code and OUTPUT values
+                                    if limits.truncated:
+                                        break
+                            
+                            # Try to get next result set
+                            if not cursor.nextset():
+                                if query_profile is not None:
+                                    query_profile.collect_messages(cursor)
+                                break
+                            
+                        except Exception:
+                            break
                     
-                    result_sets.append({
-                        "columns": columns,
-                        "data": result_set
-                    })
-                    
-                    # Try to get next result set
-                    if not cursor.nextset():
-                        break
-                        
-                except Exception:
-                    break
-            
-            cursor.close()
+                    cursor.close()
+                finally:
+                    if query_profile is not None:
+                        self._end_profile(connection, cursor, include_plan)
             
-            return {
+            result = {
                 "recordsets": result_sets,
                 "recordset": result_sets[0]["data"] if result_sets else [],
-                "rowsAffected": len(result_sets[0]["data"]) if result_sets else 0
+                "rowsAffected": len(result_sets[0]["data"]) if result_sets else 0,
+                "returnCode": captured[0] if captured else None,
+                "outputParameters": dict(zip(batch.outputs, captured[1:])) if captured else {},
+                **limits.report()
             }
+            if query_profile is not None:
+                result["profile"] = query_profile.summary()
+                if include_plan:
+                    result["plans"] = query_profile.plans
+            # Every call of a procedure shares one fingerprint, whatever its parameters
+            self._record_query_stats(f"EXEC {procedure_name}", started_at,
+                                     rows=sum(len(result_set["data"]) for result_set in result_sets), size=limits.bytes)
+            return result
             
         except Exception as e:
+            self._record_query_stats(f"EXEC {procedure_name}", started_at, error=True)
             raise Exception(f"Failed to execute stored procedure: {str(e)}")
+        finally:
+            # A procedure may write to any table
+            self.invalidate_cache()
+    
+    def procedure_signature(self, procedure_name: str) -> ProcedureSignature:
+        """Parameters of a stored procedure, from the signature cache or one metadata batch"""
+        def load(name: str) -> ProcedureSignature:
+            parameter_rows, column_rows, definition_rows = self._result_sets_or_empty(
+                self.execute_result_sets(PROCEDURE_SIGNATURE_SQL, [name]), 3
+            )
+            definition = definition_rows[0]["definition"] if definition_rows else None
+            return ProcedureSignature.from_result_sets(name, parameter_rows, column_rows, definition)
+        
+        return self.procedure_signatures.get(procedure_name, load)
+    
+    def list_databases(self, pattern: str = "%") -> List[str]:
+        """Names of online databases matching a LIKE pattern that this login can open"""
+        query = """
+            SELECT name
+            FROM sys.databases
+            WHERE name LIKE ? AND state_desc = 'ONLINE' AND HAS_DBACCESS(name) = 1
+            ORDER BY name
+        """
+        result = self.execute_query(query, {"pattern": pattern}, read_only=True)
+        return [row["name"] for row in result["recordset"]]
+    
+    def bulk_insert(self, table_name: str, columns: List[str] = None, rows: List[Any] = None,
+                    csv_path: str = None, batch_size: int = None, session_id: str = None) -> Dict[str, Any]:
+        """Insert many rows with fast_executemany, committing one transaction per chunk"""
+        self.ensure_connected()
+        
+        if (rows is None) == (csv_path is None):
+            raise ValueError("Provide either 'rows' or 'csvPath'")
+        batch_size = batch_size or self.bulk_insert_batch_size
+        if batch_size < 1:
+            raise ValueError("batchSize must be at least 1")
+        
+        insert_sql = None
+        inserted = 0
+        chunks = 0
+        csv_file = None
+        started_at = time.perf_counter()
+        try:
+            if csv_path is not None:
+                csv_file = open(csv_path, newline="", encoding="utf-8-sig")
+                columns, source = self._csv_rows(csv.reader(csv_file), columns)
+            else:
+                columns, source = self._json_rows(rows, columns)
+            
+            insert_sql = (
+                f"INSERT INTO {quote_object_name(table_name)} ({', '.join(quote_name(column) for column in columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})"
+            )
+            
+            with self._checkout(session_id=session_id) as connection:
+                cursor = self._open_cursor(connection)
+                if session_id:
+                    # Committing per chunk would also commit (or roll back) the session's own work
+                    cursor.execute("SELECT @@TRANCOUNT")
+                    if cursor.fetchone()[0] > 0:
+                        cursor.close()
+                        raise ValueError(
+                            f"session '{session_id}' has an open transaction; commit or roll it back before bulk_insert"
+                        )
+                # Sends each chunk as one parameter array instead of a round trip per row
+                cursor.fast_executemany = True
+                connection.autocommit = False
+                completed = False
+                chunk_source = self._chunks(source, batch_size)
+                try:
+                    while True:
+                        try:
+                            chunk = next(chunk_source, None)
+                        except Exception as e:
+                            # A bad CSV line is only found when its chunk is read; earlier chunks stay committed
+                            raise Exception(
+                                f"reading chunk {chunks + 1} failed, {inserted} rows were committed before it: {str(e)}"
+                            ) from e
+                        if chunk is None:
+                            break
+                        scope = current_call.get()
+                        if scope is not None and scope.cancelled:
+                            raise CallCancelledError(f"{scope.name} was cancelled ({scope.cancel_reason})")
+                        try:
+                            cursor.executemany(insert_sql, chunk)
+                            connection.commit()
+                        except Exception as e:
+                            try:
+                                connection.rollback()
+                            except Exception:
+                                # The connection is likely gone; the chunk error says why
+                                pass
+                            raise Exception(
+                                f"chunk {chunks + 1} was rolled back, {inserted} rows were committed before it: {str(e)}"
+                            ) from e
+                        inserted += len(chunk)
+                        chunks += 1
+                    completed = True
+                finally:
+                    cursor.close()
+                    try:
+                        connection.autocommit = True
+                    except Exception:
+                        # Surface a failed reset only when it would not hide the error that ended the insert
+                        if completed:
+                            raise
+            
+            elapsed = time.perf_counter() - started_at
+            return {
+                "table": table_name,
+                "columns": columns,
+                "rowsInserted": inserted,
+                "chunks": chunks,
+                "batchSize": batch_size,
+                "elapsedMs": round(elapsed * 1000, 1),
+                "rowsPerSecond": round(inserted / elapsed, 1) if elapsed > 0 else None
+            }
+        
+        except Exception as e:
+            raise Exception(f"Failed to bulk insert into {table_name}: {str(e)}") from e
+        finally:
+            if csv_file is not None:
+                csv_file.close()
+            if insert_sql is not None and inserted:
+                self.invalidate_cache(insert_sql)
+    
+    @staticmethod
+    def _json_rows(rows: List[Any], columns: List[str] = None):
+        """Column list and row tuples from JSON rows given as arrays or objects"""
+        if not rows:
+            raise ValueError("'rows' is empty")
+        # Every row is checked before the first chunk is committed
+        if isinstance(rows[0], dict):
+            for number, row in enumerate(rows, start=1):
+                if not isinstance(row, dict):
+                    raise ValueError(f"Row {number} is not an object like row 1")
+            # Objects are matched to columns by key; the first object names them by default
+            columns = columns or list(rows[0].keys())
+            return columns, (tuple(row.get(column) for column in columns) for row in rows)
+        if not columns:
+            raise ValueError("'columns' is required when rows are arrays")
+        for number, row in enumerate(rows, start=1):
+            if not isinstance(row, (list, tuple)):
+                raise ValueError(f"Row {number} is not an array like row 1")
+            if len(row) != len(columns):
+                raise ValueError(f"Row {number} has {len(row)} values, expected {len(columns)}")
+        return columns, (tuple(row) for row in rows)
+    
+    @staticmethod
+    def _csv_rows(reader: Any, columns: List[str] = None):
+        """Column list and row tuples from a CSV reader whose first line is a header"""
+        header = next(reader, None)
+        if not header:
+            raise ValueError("The CSV file has no header row")
+        # A column list picks and orders CSV columns by header name
+        lookup = {name.strip().lower(): index for index, name in enumerate(header)}
+        columns = columns or [name.strip() for name in header]
+        missing = [column for column in columns if column.lower() not in lookup]
+        if missing:
+            raise ValueError(f"Columns not in the CSV header: {', '.join(missing)}")
+        indexes = [lookup[column.lower()] for column in columns]
+        
+        def as_tuples():
+            for row in reader:
+                if not row:
+                    continue
+                # Empty CSV fields load as NULL
+                yield tuple((row[index] if index < len(row) else "") or None for index in indexes)
+        
+        return columns, as_tuples()
+    
+    @staticmethod
+    def _chunks(source: Any, size: int):
+        chunk = []
+        for row in source:
+            chunk.append(row)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def execute_in_database(self, database: str, query: str) -> Dict[str, Any]:
+        """Execute a SQL query in the context of another database on the same server"""
+        self.ensure_connected()
+        
+        # [db].sys.sp_executesql runs the batch in that database without a USE,
+        # so the pooled connection keeps its own database context
+        quoted_database = quote_name(database)
+        limits = self.result_limits()
+        read_only = is_read_only(query)
+        query, pushed_top = self._push_down_limit(query, limits)
+        try:
+            with self._checkout(read_only) as connection:
+                cursor = self._open_cursor(connection)
+                cursor.execute(f"EXEC {quoted_database}.sys.sp_executesql ?", query)
+                
+                columns = [column[0] for column in cursor.description] if cursor.description else []
+                result_set = limits.read_result_set(cursor, columns) if cursor.description else []
+                if limits.truncated:
+                    rows_affected = len(result_set)
+                else:
+                    rows_affected = cursor.rowcount if cursor.rowcount > 0 else len(result_set)
+                
+                cursor.close()
+            
+            result = {
+                "recordset": result_set,
+                "columns": columns,
+                "rowsAffected": rows_affected,
+                **limits.report()
+            }
+            if pushed_top is not None:
+                result["limitPushdown"] = {"top": pushed_top}
+            return result
+        
+        except Exception as e:
+            raise Exception(f"Failed to execute query in {database}: {str(e)}")
+        finally:
+            if not read_only:
+                self.invalidate_cache(query)
+
+
+class ConnectionRegistry:
+    """Keeps one DatabaseService (and connection pool) alive per server, database and login"""
+    
+    def __init__(self):
+        self.services: Dict[str, DatabaseService] = {}
+        # Digest of the password each SQL login handle was opened with
+        self.credentials: Dict[str, bytes] = {}
+        self.default_handle: Optional[str] = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_handle(server: str, database: str, user: str = None) -> str:
+        """Build the connection handle for a server, database and login"""
+        if user:
+            return f"{user}@{server}/{database}"
+        return f"{server}/{database}"
+    
+    def connect(self, server: str, database: str, user: str = None, password: str = None) -> str:
+        """Open (or reuse) the pool for this server, database and login and return its handle"""
+        sql_login = bool(user and password)
+        handle = self.make_handle(server, database, user if sql_login else None)
+        credential = hashlib.sha256(password.encode("utf-8")).digest() if sql_login else b""
+        
+        with self._lock:
+            service = self.services.get(handle)
+            same_credential = hmac.compare_digest(self.credentials.get(handle, b""), credential)
+        
+        # Reuse the live pool instead of paying for a new handshake, but only for the
+        # password it was opened with; any other password has to log in on its own
+        if service is None or not service.is_connected or not same_credential:
+            service = DatabaseService()
+            service.connect(server, database, user, password)
+            replaced = None
+            with self._lock:
+                current = self.services.get(handle)
+                if (current is not None and current.is_connected
+                        and hmac.compare_digest(self.credentials.get(handle, b""), credential)):
+                    # Another call connected the same handle meanwhile - keep theirs
+                    replaced = service
+                else:
+                    # A pool that is down, or one opened with another password
+                    replaced = current
+                    self.services[handle] = service
+                    self.credentials[handle] = credential
+            if replaced is not None:
+                replaced.disconnect()
+        
+        self.default_handle = handle
+        return handle
+    
+    def get(self, handle: str = None) -> DatabaseService:
+        """Resolve a connection handle, defaulting to the most recent connection"""
+        handle = handle or self.default_handle
+        if not handle:
+            raise Exception("Database is not connected. Please connect first.")
+        
+        with self._lock:
+            service = self.services.get(handle)
+        if service is None:
+            raise Exception(f"Unknown connection '{handle}'. Use list_connections to see open connections.")
+        return service
+    
+    def disconnect(self, handle: str = None) -> str:
+        """Close one connection's pool and forget its handle"""
+        handle = handle or self.default_handle
+        with self._lock:
+            service = self.services.pop(handle, None) if handle else None
+            self.credentials.pop(handle, None)
+            if handle == self.default_handle:
+                self.default_handle = next(iter(self.services), None)
+        
+        if service is None:
+            return "Successfully disconnected from database"
+        return service.disconnect()
+    
+    def disconnect_all(self):
+        """Close every open pool"""
+        with self._lock:
+            services = list(self.services.values())
+            self.services.clear()
+            self.credentials.clear()
+            self.default_handle = None
+        
+        for service in services:
+            service.disconnect()
+    
+    def list_connections(self) -> List[Dict[str, Any]]:
+        """Describe every registered connection"""
+        with self._lock:
+            items = list(self.services.items())
+        
+        return [
+            {
+                "connection": handle,
+                "server": service.server,
+                "database": service.database,
+                "connected": service.is_connected,
+                "read_only_routing": service.read_pool is not None and service.read_intent_routing,
+                "default": handle == self.default_handle
+            }
+            for handle, service in items
+        ]
+
+
+# Initialize the connection registry
+connections = ConnectionRegistry()
+
+# Create the MCP server
+server = Server("database-mcp-server")
+
+# Optional argument accepted by every database tool
+CONNECTION_ARGUMENT = {
+    "type": "string",
+    "description": "Connection handle returned by connect_database (optional, defaults to the most recent connection)"
+}
+
+# Default priority class per tool; execute_query and execute_stored_procedure accept a 'priority' override
+TOOL_PRIORITIES = {
+    "list_tables": "interactive",
+    "describe_table": "interactive",
+    "get_related_tables": "interactive",
+    "list_stored_procedures": "interactive",
+    "get_procedure_details": "interactive",
+    "end_session": "interactive",
+    "fetch_next": "interactive",
+    "close_cursor": "interactive",
+    "execute_query": "standard",
+    "generate_query_from_template": "standard",
+    "begin_session": "standard",
+    "execute_stored_procedure": "batch",
+    "bulk_insert": "batch"
+}
+
+PRIORITY_ARGUMENT = {
+    "type": "string",
+    "enum": ["interactive", "standard", "batch"],
+    "description": "Scheduling priority for this call (optional). Interactive work is served first; batch work is capped so it cannot starve other calls"
+}
+
+TIMEOUT_ARGUMENT = {
+    "type": "integer",
+    "description": "Cancel the SQL statement on the server if the call takes longer than this many milliseconds (optional)"
+}
+
+PROFILE_ARGUMENTS = {
+    "profile": {
+        "type": "boolean",
+        "description": "Run with SET STATISTICS IO, TIME ON and return a summary of CPU time, elapsed time and reads per table (optional)"
+    },
+    "includePlan": {
+        "type": "boolean",
+        "description": "With profile, also capture the actual execution plan: summarized in the result and attached as an XML resource (optional)"
+    }
+}
+
+# Tool results are JSON text, followed by any captured execution plans
+ToolContent = Union[types.TextContent, types.EmbeddedResource]
+
+# Event loop responsiveness, reported by the server_diagnostics tool
+loop_lag_monitor = LoopLagMonitor()
+
+# Used to report how quickly the server became responsive
+SERVER_STARTED_AT = time.monotonic()
+
+# Default timeoutMs for tool calls without one (0 = no timeout)
+CALL_TIMEOUT_MS = int(os.getenv('DB_CALL_TIMEOUT_MS', '0'))
+
+# Seconds between background connection health checks
+HEALTH_CHECK_INTERVAL = float(os.getenv('DB_HEALTH_CHECK_INTERVAL', '30'))
+last_health_check: Dict[str, Any] = {}
+
+# Optional JSON file that query statistics are saved to every interval
+QUERY_STATS_SNAPSHOT_PATH = os.getenv('DB_QUERY_STATS_SNAPSHOT_PATH', '').strip() or None
+QUERY_STATS_SNAPSHOT_INTERVAL = float(os.getenv('DB_QUERY_STATS_SNAPSHOT_INTERVAL', '300'))
+
+
+async def run_database_call(service: DatabaseService, func: Callable[..., Any], *args) -> Any:
+    """Run a blocking DatabaseService call on that service's database executor"""
+    loop = asyncio.get_running_loop()
+    # Carry the caller's context variables into the worker thread
+    context = contextvars.copy_context()
+    future = loop.run_in_executor(service.executor, functools.partial(context.run, func, *args))
+    service.calls_in_flight += 1
+    
+    def finished(_):
+        service.calls_in_flight -= 1
+    
+    future.add_done_callback(finished)
+    # A timed-out or cancelled caller stops waiting, but the worker keeps its connection
+    # (and its admission slot) until the statement has actually stopped on the server
+    hold_slot_until(future)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        future.add_done_callback(report_abandoned_call)
+        raise
+
+
+def report_abandoned_call(future: asyncio.Future):
+    """Log how a database call ended after its caller stopped waiting"""
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        print(f"Abandoned database call ended with: {str(error)}", file=sys.stderr)
+
+
+# Databases queried at once by fan_out_query unless the call asks for fewer
+FAN_OUT_MAX_PARALLEL = int(os.getenv('DB_FAN_OUT_MAX_PARALLEL', '8'))
+
+
+async def fan_out_query(service: DatabaseService, query: str, databases: List[str] = None,
+                        database_pattern: str = None, max_parallel: int = None,
+                        priority: str = "batch") -> Dict[str, Any]:
+    """Run one query against many databases on the same server with bounded parallelism"""
+    started_at = time.perf_counter()
+    if not databases:
+        if not database_pattern:
+            raise ValueError("Provide either 'databases' or 'databasePattern'")
+        async with service.admission.admit("interactive"):
+            databases = await run_database_call(service, service.list_databases, database_pattern)
+    
+    # Never ask for more connections than the pool can hand out
+    limit = max(1, min(max_parallel or FAN_OUT_MAX_PARALLEL, service.pool_max_size))
+    semaphore = asyncio.Semaphore(limit)
+    
+    async def run_one(database: str) -> Dict[str, Any]:
+        entry: Dict[str, Any] = {"database": database}
+        async with semaphore:
+            call_started_at = time.perf_counter()
+            try:
+                # Each database is admitted on its own, so a sweep cannot crowd out interactive calls
+                async with service.admission.admit(priority) as waited:
+                    entry["queuedMs"] = round(waited * 1000, 1)
+                    result = await run_database_call(service, service.execute_in_database, database, query)
+                entry.update(result)
+                entry["error"] = None
+            except Exception as e:
+                entry["error"] = str(e)
+            entry["elapsedMs"] = round((time.perf_counter() - call_started_at) * 1000, 1)
+        return entry
+    
+    results = await asyncio.gather(*(run_one(database) for database in databases))
+    failed = sum(1 for entry in results if entry["error"])
+    return {
+        "databases": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "maxParallel": limit,
+        "elapsedMs": round((time.perf_counter() - started_at) * 1000, 1),
+        "results": results
+    }
+
+
+# Batch items run at once by execute_batch unless the call asks for fewer
+EXECUTE_BATCH_MAX_PARALLEL = int(os.getenv('DB_EXECUTE_BATCH_MAX_PARALLEL', '8'))
+
+
+async def execute_batch(service: DatabaseService, items: List[Dict[str, Any]], max_parallel: int = None,
+                        fail_fast: bool = False, priority: str = "standard") -> Dict[str, Any]:
+    """Run many independent queries in parallel and return their results in order"""
+    if not items:
+        raise ValueError("Provide at least one item in 'items'")
+    started_at = time.perf_counter()
+    limit = max(1, min(max_parallel or EXECUTE_BATCH_MAX_PARALLEL, service.pool_max_size))
+    semaphore = asyncio.Semaphore(limit)
+    parent = current_call.get() or CallScope("execute_batch")
+    scopes = [parent.child(f"execute_batch item {index}") for index in range(len(items))]
+    failed = asyncio.Event()
+    
+    async def run_item(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        entry: Dict[str, Any] = {"index": index}
+        async with semaphore:
+            if fail_fast and failed.is_set():
+                entry["status"] = "skipped"
+                return entry
+            # Each item cancels only its own statement, unless the whole call is cancelled
+            current_call.set(scopes[index])
+            item_started_at = time.perf_counter()
+            try:
+                async with service.admission.admit(priority) as waited:
+                    entry["queuedMs"] = round(waited * 1000, 1)
+                    result = await run_database_call(
+                        service, service.execute_query, item.get("query"), item.get("parameters") or {}
+                    )
+                entry["status"] = "ok"
+                entry["result"] = result
+            except Exception as e:
+                entry["status"] = "cancelled" if scopes[index].cancelled else "error"
+                entry["error"] = str(e)
+                if fail_fast and not failed.is_set():
+                    failed.set()
+                    # Stop the items still running; unstarted items are skipped
+                    others = [scope for other, scope in enumerate(scopes) if other != index]
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(
+                        None, lambda: [scope.cancel(f"item {index} failed") for scope in others]
+                    )
+            entry["elapsedMs"] = round((time.perf_counter() - item_started_at) * 1000, 1)
+        return entry
+    
+    results = await asyncio.gather(*(run_item(index, item) for index, item in enumerate(items)))
+    counts = {status: sum(1 for entry in results if entry["status"] == status)
+              for status in ("ok", "error", "cancelled", "skipped")}
+    return {
+        "items": len(results),
+        "succeeded": counts["ok"],
+        "failed": counts["error"],
+        "cancelled": counts["cancelled"],
+        "skipped": counts["skipped"],
+        "maxParallel": limit,
+        "elapsedMs": round((time.perf_counter() - started_at) * 1000, 1),
+        "results": results
+    }
+
+
+class AutoConnect:
+    """Connects to the .env database in the background so initialize is answered at once"""
+    
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.handle: Optional[str] = None
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.elapsed: Optional[float] = None
+        self.wait_timeout = float(os.getenv('DB_STARTUP_WAIT_TIMEOUT', '45'))
+        self.first_tools_list_at: Optional[float] = None
+    
+    def start(self, server_name: str, database_name: str):
+        self.handle = ConnectionRegistry.make_handle(server_name, database_name)
+        self.started_at = time.monotonic()
+        self.task = asyncio.get_running_loop().create_task(self._connect(server_name, database_name))
+    
+    async def _connect(self, server_name: str, database_name: str):
+        # stdout carries the MCP protocol once the server is running, so log to stderr
+        print(f"Auto-connecting to database {database_name} on {server_name}...", file=sys.stderr)
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, connections.connect, server_name, database_name)
+            print("Connected to database successfully", file=sys.stderr)
+        except Exception as e:
+            self.error = str(e)
+            print(f"Warning: Auto-connect failed: {str(e)}", file=sys.stderr)
+            print("You'll need to connect manually using connect_database tool", file=sys.stderr)
+        finally:
+            self.elapsed = time.monotonic() - self.started_at
+    
+    @property
+    def pending(self) -> bool:
+        return self.task is not None and not self.task.done()
+    
+    async def wait(self, handle: Optional[str]):
+        """Wait for the auto-connect when a tool call needs its connection"""
+        if not self.pending or handle not in (None, self.handle):
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self.task), timeout=self.wait_timeout)
+        except asyncio.TimeoutError:
+            waited = time.monotonic() - self.started_at
+            raise Exception(
+                f"The database connection to {self.handle} is still being established "
+                f"({waited:.0f}s so far). Try again shortly or call connect_database."
+            )
+    
+    def status(self) -> Dict[str, Any]:
+        if self.task is None:
+            state = "disabled"
+        elif self.pending:
+            state = "connecting"
+        else:
+            state = "failed" if self.error else "connected"
+        
+        return {
+            "auto_connect": state,
+            "connection": self.handle,
+            "error": self.error,
+            "auto_connect_ms": round(self.elapsed * 1000, 1) if self.elapsed is not None else None,
+            "first_tools_list_ms": round((self.first_tools_list_at - SERVER_STARTED_AT) * 1000, 1)
+            if self.first_tools_list_at is not None else None
+        }
+
+
+auto_connect = AutoConnect()
+
+
+async def resolve_service(handle: Optional[str]) -> DatabaseService:
+    """Look up a connection, waiting for the startup auto-connect if it is still running"""
+    await auto_connect.wait(handle)
+    if handle in (None, auto_connect.handle) and auto_connect.error and not connections.default_handle:
+        raise Exception(f"Auto-connect failed: {auto_connect.error}. Use connect_database to connect manually.")
+    return connections.get(handle)
+
+
+async def run_health_checks():
+    """Background task: keep every pool warm and free of connections the server killed"""
+    while True:
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+        for handle, service in list(connections.services.items()):
+            if not service.is_connected:
+                continue
+            try:
+                report = await run_database_call(service, service.check_health)
+            except Exception as e:
+                report = {"error": str(e)}
+            last_health_check[handle] = report
+
+
+def write_query_stats_snapshot(path: str):
+    """Save every connection's query statistics to a JSON file, replacing it atomically"""
+    snapshot = {
+        "taken_at": time.time(),
+        "databases": {
+            handle: service.query_stats.top(limit=0) for handle, service in list(connections.services.items())
+        }
+    }
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as f:
+        json.dump(snapshot, f, indent=2, default=str)
+    os.replace(temporary_path, path)
+
+
+async def run_query_stats_snapshots():
+    """Background task: save query statistics to DB_QUERY_STATS_SNAPSHOT_PATH"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(QUERY_STATS_SNAPSHOT_INTERVAL)
+        try:
+            await loop.run_in_executor(None, write_query_stats_snapshot, QUERY_STATS_SNAPSHOT_PATH)
+        except Exception as e:
+            print(f"Warning: could not write query stats snapshot: {str(e)}", file=sys.stderr)
+
+
+def get_diagnostics() -> Dict[str, Any]:
+    """Collect server health metrics"""
+    databases = {}
+    for handle, service in list(connections.services.items()):
+        databases[handle] = {
+            "connected": service.is_connected,
+            "pool": service.pool.stats() if service.pool else None,
+            "read_pool": service.read_pool.stats() if service.read_pool else None,
+            "read_pool_error": service.read_pool_error,
+            "read_isolation_note": service.read_isolation_note,
+            "session_options": {
+                "primary": service.session_options_sql(),
+                "read_path": service.session_options_sql(read_path=True) if service.read_pool else None
+            },
+            "sessions": [session.describe() for session in list(service.sessions.values())],
+            "open_cursors": [paged.describe() for paged in list(service.cursors.values())],
+            "executor": {
+                "max_workers": service.executor_workers,
+                "calls_in_flight": service.calls_in_flight
+            },
+            "admission": service.admission.stats(),
+            "circuit_breaker": service.breaker.stats(),
+            "query_cache": service.query_cache.stats() if service.query_cache else None,
+            "procedure_signatures": service.procedure_signatures.stats()
+        }
+    
+    return {
+        "event_loop_lag": loop_lag_monitor.snapshot(),
+        "startup": auto_connect.status(),
+        "last_health_check": last_health_check,
+        "default_connection": connections.default_handle,
+        "databases": databases
+    }
 
 
-# Initialize the database service
-db_service = DatabaseService()
-
-# Create the MCP server
-server = Server("database-mcp-server")
-
-
 @server.list_tools()
 async def handle_list_tools() -> List[types.Tool]:
     """List available tools"""
+    if auto_connect.first_tools_list_at is None:
+        auto_connect.first_tools_list_at = time.monotonic()
+    
     return [
         types.Tool(
             name="connect_database",
-            description="Connect to the SQL Server database",
+            description="Connect to a SQL Server database and return its connection handle. Connections stay open side by side; pass the handle as 'connection' to other tools to choose the database.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -591,6 +2149,7 @@ async def handle_list_tools() -> List[types.Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "connection": CONNECTION_ARGUMENT,
                     "query": {
                         "type": "string",
                         "description": "SQL query to execute"
@@ -599,17 +2158,71 @@ async def handle_list_tools() -> List[types.Tool]:
                         "type": "object",
                         "description": "Parameters for parameterized queries",
                         "additionalProperties": True
-                    }
+                    },
+                    "sessionId": {
+                        "type": "string",
+                        "description": "Session ID from begin_session; runs on the session's pinned connection so temp tables persist between calls (optional)"
+                    },
+                    "pageSize": {
+                        "type": "integer",
+                        "description": "Return results in pages of this many rows (optional). The response includes a continuationToken for fetch_next while more rows remain"
+                    },
+                    "maxRows": {
+                        "type": "integer",
+                        "description": "Stop after this many rows (optional, cannot exceed DB_MAX_ROWS or be combined with pageSize)"
+                    },
+                    "maxBytes": {
+                        "type": "integer",
+                        "description": "Stop once the result reaches about this many bytes (optional, cannot exceed DB_MAX_BYTES or be combined with pageSize)"
+                    },
+                    "timeoutMs": TIMEOUT_ARGUMENT,
+                    **PROFILE_ARGUMENTS,
+                    "priority": PRIORITY_ARGUMENT
                 },
                 "required": ["query"]
             }
         ),
+        types.Tool(
+            name="fetch_next",
+            description="Fetch the next page of a paged execute_query result using its continuationToken",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "connection": CONNECTION_ARGUMENT,
+                    "continuationToken": {
+                        "type": "string",
+                        "description": "continuationToken from execute_query or a previous fetch_next"
+                    },
+                    "pageSize": {
+                        "type": "integer",
+                        "description": "Rows to return (optional, defaults to the pageSize of the original query)"
+                    }
+                },
+                "required": ["continuationToken"]
+            }
+        ),
+        types.Tool(
+            name="close_cursor",
+            description="Stop reading a paged execute_query result and release its connection",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "connection": CONNECTION_ARGUMENT,
+                    "continuationToken": {
+                        "type": "string",
+                        "description": "continuationToken of the result to discard"
+                    }
+                },
+                "required": ["continuationToken"]
+            }
+        ),
         types.Tool(
             name="list_tables",
             description="List all tables in the database. Use this when asked to show or list tables.",
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "connection": CONNECTION_ARGUMENT,
                     "schema": {
                         "type": "string",
                         "description": "Schema name (optional, defaults to dbo)"
@@ -623,6 +2236,7 @@ async def handle_list_tools() -> List[types.Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "connection": CONNECTION_ARGUMENT,
                     "tableName": {
                         "type": "string",
                         "description": "Name of the table to describe"
@@ -641,6 +2255,7 @@ async def handle_list_tools() -> List[types.Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "connection": CONNECTION_ARGUMENT,
                     "tableName": {
                         "type": "string",
                         "description": "Name of the table to get relationships for"
@@ -659,6 +2274,7 @@ async def handle_list_tools() -> List[types.Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "connection": CONNECTION_ARGUMENT,
                     "schema": {
                         "type": "string",
                         "description": "Schema name (optional, defaults to dbo)"
@@ -676,15 +2292,31 @@ async def handle_list_tools() -> List[types.Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "connection": CONNECTION_ARGUMENT,
                     "procedureName": {
                         "type": "string",
                         "description": "Name of the stored procedure to execute"
                     },
                     "parameters": {
                         "type": "object",
-                        "description": "Parameters for the stored procedure",
+                        "description": "Parameters for the stored procedure. Pass a table-valued parameter as an array of rows (arrays or objects keyed by column), or a plain array of values for a single-column table type",
                         "additionalProperties": True
-                    }
+                    },
+                    "sessionId": {
+                        "type": "string",
+                        "description": "Session ID from begin_session; runs on the session's pinned connection so temp tables persist between calls (optional)"
+                    },
+                    "maxRows": {
+                        "type": "integer",
+                        "description": "Stop after this many rows (optional, cannot exceed DB_MAX_ROWS)"
+                    },
+                    "maxBytes": {
+                        "type": "integer",
+                        "description": "Stop once the result reaches about this many bytes (optional, cannot exceed DB_MAX_BYTES)"
+                    },
+                    "timeoutMs": TIMEOUT_ARGUMENT,
+                    **PROFILE_ARGUMENTS,
+                    "priority": PRIORITY_ARGUMENT
                 },
                 "required": ["procedureName"]
             }
@@ -695,6 +2327,7 @@ async def handle_list_tools() -> List[types.Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "connection": CONNECTION_ARGUMENT,
                     "procedureName": {
                         "type": "string",
                         "description": "Name of the stored procedure to get details for"
@@ -713,6 +2346,7 @@ async def handle_list_tools() -> List[types.Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "connection": CONNECTION_ARGUMENT,
                     "templateFile": {
                         "type": "string",
                         "description": "Name of the SQL template file (e.g., 'query.sql', 'template.sql'). Templates are looked for in the 'templates' folder first, then in the working directory."
@@ -721,14 +2355,202 @@ async def handle_list_tools() -> List[types.Tool]:
                         "type": "object",
                         "description": "Parameters to substitute in the template (format: @paramName in SQL)",
                         "additionalProperties": True
-                    }
+                    },
+                    "maxRows": {
+                        "type": "integer",
+                        "description": "Stop after this many rows (optional, cannot exceed DB_MAX_ROWS)"
+                    },
+                    "maxBytes": {
+                        "type": "integer",
+                        "description": "Stop once the result reaches about this many bytes (optional, cannot exceed DB_MAX_BYTES)"
+                    },
+                    "timeoutMs": TIMEOUT_ARGUMENT
                 },
                 "required": ["templateFile"]
             }
         ),
         types.Tool(
             name="disconnect_database",
-            description="Disconnect from the database",
+            description="Disconnect from a database and close its connection pool",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "connection": CONNECTION_ARGUMENT
+                }
+            }
+        ),
+        types.Tool(
+            name="begin_session",
+            description="Pin a pooled connection to a new session and return its sessionId. Pass the sessionId to execute_query or execute_stored_procedure to keep #temp tables and intermediate results on the server between calls. End it with end_session.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "connection": CONNECTION_ARGUMENT,
+                    "idleTtlSeconds": {
+                        "type": "number",
+                        "description": "End the session automatically after this many idle seconds (optional, defaults to DB_SESSION_IDLE_TTL)"
+                    }
+                }
+            }
+        ),
+        types.Tool(
+            name="end_session",
+            description="End a session started with begin_session and release its connection",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "connection": CONNECTION_ARGUMENT,
+                    "sessionId": {
+                        "type": "string",
+                        "description": "Session ID returned by begin_session"
+                    }
+                },
+                "required": ["sessionId"]
+            }
+        ),
+        types.Tool(
+            name="list_connections",
+            description="List open database connections and their handles",
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
+        ),
+        types.Tool(
+            name="bulk_insert",
+            description="Insert many rows into a table in chunks with fast_executemany, one transaction per chunk. Rows come from a JSON array or a local CSV file with a header row.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "connection": CONNECTION_ARGUMENT,
+                    "tableName": {
+                        "type": "string",
+                        "description": "Target table, optionally schema-qualified (e.g. UT.TEST_PARAM_DATA); defaults to the dbo schema"
+                    },
+                    "columns": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Columns to insert, in row order (required for array rows; defaults to the keys of the first object or the CSV header)"
+                    },
+                    "rows": {
+                        "type": "array",
+                        "description": "Rows as arrays of values or as objects keyed by column name",
+                        "items": {}
+                    },
+                    "csvPath": {
+                        "type": "string",
+                        "description": "Path to a CSV file on the server machine to load instead of rows; empty fields load as NULL"
+                    },
+                    "batchSize": {
+                        "type": "integer",
+                        "description": "Rows per chunk and transaction (optional, defaults to DB_BULK_INSERT_BATCH_SIZE)"
+                    },
+                    "sessionId": {
+                        "type": "string",
+                        "description": "Session ID from begin_session, e.g. to load a temp table (optional)"
+                    },
+                    "timeoutMs": TIMEOUT_ARGUMENT,
+                    "priority": PRIORITY_ARGUMENT
+                },
+                "required": ["tableName"]
+            }
+        ),
+        types.Tool(
+            name="execute_batch",
+            description="Run several independent SQL queries in one call. Items run in parallel on pooled connections and results come back in order, each with its own timing and error.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "connection": CONNECTION_ARGUMENT,
+                    "items": {
+                        "type": "array",
+                        "description": "Queries to run",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "query": {
+                                    "type": "string",
+                                    "description": "SQL query to execute"
+                                },
+                                "parameters": {
+                                    "type": "object",
+                                    "description": "Parameters for the query",
+                                    "additionalProperties": True
+                                }
+                            },
+                            "required": ["query"]
+                        }
+                    },
+                    "failFast": {
+                        "type": "boolean",
+                        "description": "Stop the batch at the first error: running items are cancelled and the rest skipped (optional, defaults to false)"
+                    },
+                    "maxParallel": {
+                        "type": "integer",
+                        "description": "Maximum items run at once (optional, defaults to DB_EXECUTE_BATCH_MAX_PARALLEL)"
+                    },
+                    "timeoutMs": TIMEOUT_ARGUMENT,
+                    "priority": PRIORITY_ARGUMENT
+                },
+                "required": ["items"]
+            }
+        ),
+        types.Tool(
+            name="fan_out_query",
+            description="Run the same SQL query against many databases on the connected server at once (e.g. every Ahs_Bit_Red_QA_* database). Results are tagged by database, with per-database timing and errors.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "connection": CONNECTION_ARGUMENT,
+                    "query": {
+                        "type": "string",
+                        "description": "SQL query to run in each database"
+                    },
+                    "databases": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Database names to query (optional if databasePattern is given)"
+                    },
+                    "databasePattern": {
+                        "type": "string",
+                        "description": "LIKE pattern over sys.databases, e.g. 'Ahs_Bit_Red_QA_%' (optional if databases is given)"
+                    },
+                    "maxParallel": {
+                        "type": "integer",
+                        "description": "Maximum databases queried at once (optional, defaults to DB_FAN_OUT_MAX_PARALLEL)"
+                    },
+                    "timeoutMs": TIMEOUT_ARGUMENT,
+                    "priority": PRIORITY_ARGUMENT
+                },
+                "required": ["query"]
+            }
+        ),
+        types.Tool(
+            name="query_stats",
+            description="Show which kinds of queries are expensive: calls, errors, rows, bytes and p50/p95/p99 latency per query fingerprint (the SQL with literal values replaced by ?)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "connection": CONNECTION_ARGUMENT,
+                    "orderBy": {
+                        "type": "string",
+                        "enum": list(QueryStats.ORDER_FIELDS),
+                        "description": "Field to rank fingerprints by (optional, defaults to totalMs)"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Number of fingerprints to return, 0 for all (optional, defaults to 10)"
+                    },
+                    "reset": {
+                        "type": "boolean",
+                        "description": "Clear the statistics after returning them (optional)"
+                    }
+                }
+            }
+        ),
+        types.Tool(
+            name="server_diagnostics",
+            description="Show server health metrics: event loop lag, connection pool usage, circuit breaker state and database calls in flight",
             inputSchema={
                 "type": "object",
                 "properties": {}
@@ -738,8 +2560,51 @@ async def handle_list_tools() -> List[types.Tool]:
 
 
 @server.call_tool()
-async def handle_call_tool(name: str, arguments: dict) -> List[types.TextContent]:
+async def handle_call_tool(name: str, arguments: dict) -> List[ToolContent]:
     """Handle tool calls"""
+    arguments = arguments or {}
+    metadata: Dict[str, Any] = {}
+    scope = CallScope(name)
+    token = call_metadata.set(metadata)
+    scope_token = current_call.set(scope)
+    timeout_ms = arguments.get("timeoutMs") or CALL_TIMEOUT_MS
+    loop = asyncio.get_running_loop()
+    try:
+        if timeout_ms:
+            content = await asyncio.wait_for(dispatch_tool_call(name, arguments), timeout_ms / 1000)
+        else:
+            content = await dispatch_tool_call(name, arguments)
+    except asyncio.TimeoutError:
+        # Stop the statement on the server; the worker then returns its connection to the pool
+        cancelled = await loop.run_in_executor(None, scope.cancel, f"timed out after {timeout_ms} ms")
+        metadata["cancelledStatements"] = cancelled
+        content = [types.TextContent(
+            type="text",
+            text=f"Error: {name} timed out after {timeout_ms} ms and its SQL statement was cancelled"
+        )]
+    except asyncio.CancelledError:
+        # The client sent notifications/cancelled. This task is already cancelled, so any
+        # await here would be interrupted; cursor.cancel() only sends an attention signal
+        # and returns, so the statements are stopped inline before re-raising
+        try:
+            cancelled = scope.cancel("cancelled by the client")
+            metadata["cancelledStatements"] = cancelled
+            print(f"{name} cancelled by the client; {cancelled} statement(s) stopped", file=sys.stderr)
+        except Exception as e:
+            print(f"Warning: could not cancel {name}: {str(e)}", file=sys.stderr)
+        raise
+    finally:
+        current_call.reset(scope_token)
+        call_metadata.reset(token)
+    
+    # Report how the call was served (retries, ...) after the result itself
+    if metadata:
+        content.append(types.TextContent(type="text", text=json.dumps({"metadata": metadata}, default=str)))
+    return content
+
+
+async def dispatch_tool_call(name: str, arguments: dict) -> List[ToolContent]:
+    """Run a tool and format its result"""
     try:
         if name == "connect_database":
             server_name = arguments.get("server")
@@ -747,91 +2612,236 @@ async def handle_call_tool(name: str, arguments: dict) -> List[types.TextContent
             user = arguments.get("user")
             password = arguments.get("password")
             
-            result = db_service.connect(server_name, database, user, password)
+            # Opening a pool can take the full login timeout - keep it off the event loop
+            loop = asyncio.get_running_loop()
+            handle = await loop.run_in_executor(
+                None, functools.partial(connections.connect, server_name, database, user, password)
+            )
+            result = f"Successfully connected to database {database} on server {server_name} (connection: {handle})"
+            
+            service = connections.get(handle)
+            if service.read_pool is not None and service.read_intent_routing:
+                result += ". Read-only work is routed to a readable secondary (ApplicationIntent=ReadOnly)"
+            elif service.read_pool_error:
+                result += f". Read path pool unavailable: {service.read_pool_error}"
+            if service.read_isolation_note:
+                result += f". {service.read_isolation_note}"
+                if service.read_pool is None:
+                    result += " and runs on the primary pool"
             return [types.TextContent(type="text", text=result)]
         
-        elif name == "execute_query":
-            query = arguments.get("query")
-            parameters = arguments.get("parameters", {})
-            
-            result = db_service.execute_query(query, parameters)
+        elif name == "list_connections":
+            result = connections.list_connections()
             return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
         
-        elif name == "list_tables":
-            schema = arguments.get("schema", "dbo")
-            
-            result = db_service.list_tables(schema)
-            return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+        elif name == "disconnect_database":
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, connections.disconnect, arguments.get("connection"))
+            return [types.TextContent(type="text", text=result)]
         
-        elif name == "describe_table":
-            table_name = arguments.get("tableName")
-            schema = arguments.get("schema", "dbo")
-            
-            result = db_service.describe_table(table_name, schema)
-            return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
-            
-        elif name == "get_related_tables":
-            table_name = arguments.get("tableName")
-            schema = arguments.get("schema", "dbo")
-            
-            result = db_service.get_related_tables(table_name, schema)
+        elif name == "server_diagnostics":
+            result = get_diagnostics()
             return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
         
-        elif name == "list_stored_procedures":
-            schema = arguments.get("schema", "dbo")
-            procedure_name_pattern = arguments.get("procedureNamePattern")
-            
-            result = db_service.list_stored_procedures(schema, procedure_name_pattern)
-            return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+        # Every other tool works against one connection from the registry
+        service = await resolve_service(arguments.get("connection"))
         
-        elif name == "execute_stored_procedure":
-            procedure_name = arguments.get("procedureName")
-            parameters = arguments.get("parameters", {})
-            
-            result = db_service.execute_stored_procedure(procedure_name, parameters)
+        if name == "fan_out_query":
+            # Admitted per database inside the sweep, not as one call
+            result = await fan_out_query(
+                service,
+                arguments.get("query"),
+                arguments.get("databases"),
+                arguments.get("databasePattern"),
+                arguments.get("maxParallel"),
+                arguments.get("priority") or "batch"
+            )
             return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
         
-        elif name == "get_procedure_details":
-            procedure_name = arguments.get("procedureName")
-            schema = arguments.get("schema", "dbo")
-            
-            result = db_service.get_procedure_details(procedure_name, schema)
-            return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
-            
-        elif name == "generate_query_from_template":
-            template_file = arguments.get("templateFile")
-            parameters = arguments.get("parameters", {})
-            
-            result = db_service.generate_query_from_template(template_file, parameters)
+        if name == "query_stats":
+            # In-memory counters, so there is nothing to admit
+            result = service.query_stats.top(arguments.get("orderBy") or "totalMs", arguments.get("limit", 10))
+            if arguments.get("reset"):
+                service.query_stats.reset()
             return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
         
-        elif name == "disconnect_database":
-            result = db_service.disconnect()
-            return [types.TextContent(type="text", text=result)]
+        if name == "execute_batch":
+            # Admitted per item, so a batch holds no slot while it waits for its items
+            result = await execute_batch(
+                service,
+                arguments.get("items") or [],
+                arguments.get("maxParallel"),
+                bool(arguments.get("failFast", False)),
+                arguments.get("priority") or "standard"
+            )
+            return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
         
-        else:
-            raise ValueError(f"Unknown tool: {name}")
+        priority = arguments.get("priority") or TOOL_PRIORITIES.get(name, "standard")
+        async with service.admission.admit(priority) as waited:
+            if waited >= 0.001:
+                record_call_metadata("queuedMs", round(waited * 1000, 1))
+            return await call_database_tool(service, name, arguments)
     
+    except ServerBusyError as e:
+        record_call_metadata("retryAfterMs", e.retry_after_ms)
+        return [types.TextContent(type="text", text=f"Error: {str(e)}")]
     except Exception as e:
         return [types.TextContent(type="text", text=f"Error: {str(e)}")]
 
 
+def result_content(result: Dict[str, Any]) -> List[ToolContent]:
+    """A tool result as JSON text, with each captured execution plan as a separate XML resource"""
+    plans = result.pop("plans", None) or []
+    content: List[ToolContent] = [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+    token = secrets.token_hex(4)
+    for index, plan in enumerate(plans, start=1):
+        content.append(types.EmbeddedResource(
+            type="resource",
+            resource=types.TextResourceContents(uri=f"showplan://{token}/{index}.sqlplan", mimeType="application/xml", text=plan)
+        ))
+    return content
+
+
+async def call_database_tool(service: DatabaseService, name: str, arguments: dict) -> List[ToolContent]:
+    """Run a tool against one database connection"""
+    if name == "execute_query":
+        query = arguments.get("query")
+        parameters = arguments.get("parameters", {})
+        session_id = arguments.get("sessionId")
+        page_size = arguments.get("pageSize")
+        max_rows = arguments.get("maxRows")
+        max_bytes = arguments.get("maxBytes")
+        profile = bool(arguments.get("profile", False))
+        include_plan = profile and bool(arguments.get("includePlan", False))
+        
+        result = await run_database_call(
+            service, service.execute_query, query, parameters, None, session_id, page_size, max_rows, max_bytes,
+            profile, include_plan
+        )
+        return result_content(result)
+    
+    elif name == "fetch_next":
+        token = arguments.get("continuationToken")
+        page_size = arguments.get("pageSize")
+        
+        result = await run_database_call(service, service.fetch_next, token, page_size)
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+    
+    elif name == "close_cursor":
+        token = arguments.get("continuationToken")
+        
+        result = await run_database_call(service, service.close_cursor, token)
+        return [types.TextContent(type="text", text=result)]
+    
+    elif name == "list_tables":
+        schema = arguments.get("schema", "dbo")
+        
+        result = await run_database_call(service, service.list_tables, schema)
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+    
+    elif name == "describe_table":
+        table_name = arguments.get("tableName")
+        schema = arguments.get("schema", "dbo")
+        
+        result = await run_database_call(service, service.describe_table, table_name, schema)
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+        
+    elif name == "get_related_tables":
+        table_name = arguments.get("tableName")
+        schema = arguments.get("schema", "dbo")
+        
+        result = await run_database_call(service, service.get_related_tables, table_name, schema)
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+    
+    elif name == "list_stored_procedures":
+        schema = arguments.get("schema", "dbo")
+        procedure_name_pattern = arguments.get("procedureNamePattern")
+        
+        result = await run_database_call(service, service.list_stored_procedures, schema, procedure_name_pattern)
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+    
+    elif name == "execute_stored_procedure":
+        procedure_name = arguments.get("procedureName")
+        parameters = arguments.get("parameters", {})
+        session_id = arguments.get("sessionId")
+        max_rows = arguments.get("maxRows")
+        max_bytes = arguments.get("maxBytes")
+        profile = bool(arguments.get("profile", False))
+        include_plan = profile and bool(arguments.get("includePlan", False))
+        
+        result = await run_database_call(
+            service, service.execute_stored_procedure, procedure_name, parameters, session_id, max_rows, max_bytes,
+            profile, include_plan
+        )
+        return result_content(result)
+    
+    elif name == "get_procedure_details":
+        procedure_name = arguments.get("procedureName")
+        schema = arguments.get("schema", "dbo")
+        
+        result = await run_database_call(service, service.get_procedure_details, procedure_name, schema)
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+        
+    elif name == "generate_query_from_template":
+        template_file = arguments.get("templateFile")
+        parameters = arguments.get("parameters", {})
+        max_rows = arguments.get("maxRows")
+        max_bytes = arguments.get("maxBytes")
+        
+        result = await run_database_call(
+            service, service.generate_query_from_template, template_file, parameters, max_rows, max_bytes
+        )
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+    
+    elif name == "bulk_insert":
+        table_name = arguments.get("tableName")
+        columns = arguments.get("columns")
+        rows = arguments.get("rows")
+        csv_path = arguments.get("csvPath")
+        batch_size = arguments.get("batchSize")
+        session_id = arguments.get("sessionId")
+        
+        result = await run_database_call(
+            service, service.bulk_insert, table_name, columns, rows, csv_path, batch_size, session_id
+        )
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+    
+    elif name == "begin_session":
+        idle_ttl = arguments.get("idleTtlSeconds")
+        
+        result = await run_database_call(service, service.begin_session, idle_ttl)
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+    
+    elif name == "end_session":
+        session_id = arguments.get("sessionId")
+        
+        result = await run_database_call(service, service.end_session, session_id)
+        return [types.TextContent(type="text", text=result)]
+    
+    else:
+        raise ValueError(f"Unknown tool: {name}")
+
+
 async def main():
     print("Starting MCP Database Server...")
     print("Press Ctrl+C to stop the server")
     
-    # Auto-connect to database using settings from .env
-    try:
-        server_name = os.getenv('DB_SERVER')
-        database_name = os.getenv('DB_NAME')
-        
-        if server_name and database_name:
-            print(f"Auto-connecting to database {database_name} on {server_name}...")
-            db_service.connect(server_name, database_name)
-            print("Connected to database successfully")
-    except Exception as e:
-        print(f"Warning: Auto-connect failed: {str(e)}")
-        print("You'll need to connect manually using connect_database tool")
+    # Fail at startup rather than on the first connect_database call
+    DatabaseService.held_connection_limits(int(os.getenv('DB_POOL_MAX_SIZE', '10')))
+    
+    # Auto-connect to database using settings from .env, in the background so the
+    # initialize handshake is answered even while the database is slow or unreachable
+    server_name = os.getenv('DB_SERVER')
+    database_name = os.getenv('DB_NAME')
+    if server_name and database_name:
+        auto_connect.start(server_name, database_name)
+    
+    # Sample event loop lag and check pooled connections for the lifetime of the server
+    loop_lag_monitor.start()
+    health_check_task = asyncio.get_running_loop().create_task(run_health_checks())
+    snapshot_task = None
+    if QUERY_STATS_SNAPSHOT_PATH:
+        snapshot_task = asyncio.get_running_loop().create_task(run_query_stats_snapshots())
     
     # Run the server using stdin/stdout streams
     try:
@@ -850,11 +2860,16 @@ async def main():
             )
     except KeyboardInterrupt:
         print("\nServer interrupted. Shutting down...")
-        db_service.disconnect()
+        connections.disconnect_all()
         print("Server stopped.")
     except Exception as e:
         print(f"Server error: {str(e)}")
-        db_service.disconnect()
+        connections.disconnect_all()
+    finally:
+        health_check_task.cancel()
+        if snapshot_task is not None:
+            snapshot_task.cancel()
+        loop_lag_monitor.stop()
 
 
 if __name__ == "__main__":
@@ -862,9 +2877,9 @@ if __name__ == "__main__":
         asyncio.run(main())
     except KeyboardInterrupt:
         print("\nServer stopped by user")
-        if hasattr(sys.modules[__name__], 'db_service'):
-            db_service.disconnect()
+        if hasattr(sys.modules[__name__], 'connections'):
+            connections.disconnect_all()
     except Exception as e:
         print(f"Fatal error: {str(e)}")
-        if hasattr(sys.modules[__name__], 'db_service'):
-            db_service.disconnect()
\ No newline at end of file
+        if hasattr(sys.modules[__name__], 'connections'):
+            connections.disconnect_all()
\ No newline at end of file
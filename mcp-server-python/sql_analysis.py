@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+
+"""
+Lightweight T-SQL Analysis for the MCP Database Server
+Tokenizes SQL text (skipping string literals, comments and quoted names),
+classifies statements so read-only work can be routed away from the primary,
+compiles named @parameters to positional ? placeholders, finds the tables a
+statement references and fingerprints queries for per-query statistics
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    start: int
+
+
+_TOKEN_PATTERN = re.compile(r"""
+      (?P<ws>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+    | (?P<string>[Nn]?'(?:[^']|'')*(?:'|\Z))
+    | (?P<quoted>\[(?:[^\]]|\]\])*(?:\]|\Z)|"(?:[^"]|"")*(?:"|\Z))
+    | (?P<sysvar>@@\w+)
+    | (?P<variable>@[\w$#@]+)
+    | (?P<number>0[xX][0-9a-fA-F]*|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<word>(?:[^\W\d]|\#)[\w$#@]*)
+    | (?P<punct>.)
+""", re.VERBOSE | re.DOTALL)
+
+
+def tokenize(sql: str) -> List[Token]:
+    """Split T-SQL text into tokens, including whitespace and comments"""
+    return [Token(match.lastgroup, match.group(), match.start()) for match in _TOKEN_PATTERN.finditer(sql)]
+
+
+def significant_tokens(sql: str) -> List[Token]:
+    """Tokens without whitespace and comments"""
+    return [token for token in tokenize(sql) if token.kind not in ("ws", "comment")]
+
+
+# Keywords that make a batch unsafe for a read-only replica
+WRITE_KEYWORDS = {
+    "insert", "update", "delete", "merge", "into", "create", "alter", "drop", "truncate",
+    "exec", "execute", "grant", "revoke", "deny", "bulk", "backup", "restore", "dbcc",
+    "use", "begin", "commit", "rollback", "save", "kill", "reconfigure", "shutdown",
+    "updatetext", "writetext", "openrowset", "opendatasource",
+    # Locking hints ask for write locks even inside a SELECT
+    "updlock", "xlock", "holdlock", "tablockx"
+}
+
+# Keywords a read-only batch may start with
+READ_START_KEYWORDS = {"select", "with", "declare", "set"}
+
+
+def is_read_only(sql: str) -> bool:
+    """True when the batch only reads data (SELECT / CTE, optionally with local variables)"""
+    tokens = significant_tokens(sql)
+    words = [token for token in tokens if token.kind == "word"]
+    if not words:
+        return False
+
+    # A batch that starts with a bare name is an implicit EXEC
+    first = tokens[0]
+    if first.kind != "word" or first.text.lower() not in READ_START_KEYWORDS:
+        return False
+
+    has_select = False
+    for index, token in enumerate(tokens):
+        if token.kind != "word":
+            continue
+        word = token.text.lower()
+        if word in WRITE_KEYWORDS:
+            return False
+        if word == "select":
+            has_select = True
+        elif word == "set":
+            # SET @variable = ... is fine; SET options change the pooled session
+            following = tokens[index + 1] if index + 1 < len(tokens) else None
+            if following is None or following.kind != "variable":
+                return False
+        elif word.startswith("#"):
+            # Temp tables live on the primary session that created them
+            return False
+
+    return has_select
+
+
+
+# Top-level keywords that make a TOP on the outer SELECT unsafe or redundant
+UNLIMITABLE_KEYWORDS = {"union", "except", "intersect", "top", "offset", "for"}
+
+
+@lru_cache(maxsize=512)
+def limit_select(sql: str, limit: int) -> Optional[str]:
+    """Add TOP (limit) to a batch that is one top-level SELECT without TOP or OFFSET, else None"""
+    tokens = significant_tokens(sql)
+    if not tokens or tokens[0].kind != "word" or tokens[0].text.lower() not in ("select", "with"):
+        return None
+
+    depth = 0
+    select = None
+    for index, token in enumerate(tokens):
+        if token.text == "(":
+            depth += 1
+        elif token.text == ")":
+            depth -= 1
+        elif token.text == ";":
+            # A second statement; only a trailing semicolon is allowed
+            if depth == 0 and index != len(tokens) - 1:
+                return None
+        elif token.kind == "word":
+            word = token.text.lower()
+            if word in WRITE_KEYWORDS:
+                return None
+            if depth == 0 and word in UNLIMITABLE_KEYWORDS:
+                return None
+            if depth == 0 and word == "select":
+                # CTE and subquery SELECTs are in parentheses, so this is another statement
+                if select is not None:
+                    return None
+                select = index
+    if select is None:
+        return None
+
+    # TOP goes after DISTINCT or ALL
+    position = select + 1
+    while (position < len(tokens) and tokens[position].kind == "word"
+           and tokens[position].text.lower() in ("distinct", "all")):
+        position += 1
+    if position >= len(tokens):
+        return None
+    # SELECT @x = ... assigns variables and returns no rows
+    if tokens[position].kind == "variable" and position + 1 < len(tokens) and tokens[position + 1].text == "=":
+        return None
+
+    insert_at = tokens[position - 1].start + len(tokens[position - 1].text)
+    return f"{sql[:insert_at]} TOP ({limit}){sql[insert_at:]}"
+
+
+# Statements that change schema or run code we cannot see into
+SCHEMA_OR_CODE_KEYWORDS = {"create", "alter", "drop", "truncate", "exec", "execute", "use", "dbcc", "restore"}
+
+# Keywords followed by a table name
+TABLE_CONTEXT_KEYWORDS = {"from", "join", "into", "update", "table", "merge", "using", "insert", "delete"}
+
+# Keywords that end a table name or alias
+CLAUSE_KEYWORDS = TABLE_CONTEXT_KEYWORDS | {
+    "select", "set", "where", "on", "with", "values", "default", "output", "group", "order",
+    "having", "union", "except", "intersect", "inner", "left", "right", "full", "cross", "outer",
+    "apply", "pivot", "unpivot", "option", "when", "then", "top"
+}
+
+
+@lru_cache(maxsize=512)
+def normalize_sql(sql: str) -> str:
+    """Canonical form of a batch: no comments, single spaces, keywords and names lower-cased"""
+    parts = []
+    for token in significant_tokens(sql):
+        if token.kind in ("word", "variable", "sysvar"):
+            parts.append(token.text.lower())
+        else:
+            parts.append(token.text)
+    return " ".join(parts)
+
+
+@lru_cache(maxsize=1024)
+def fingerprint_sql(sql: str) -> Tuple[str, str]:
+    """Short id and text shared by queries that differ only in literal values"""
+    parts: List[str] = []
+    for token in significant_tokens(sql):
+        if token.kind in ("string", "number"):
+            # Lists of literals collapse too: IN (1, 2, 3) and IN (4) match
+            if len(parts) >= 2 and parts[-1] == "," and parts[-2] == "?":
+                parts.pop()
+                continue
+            parts.append("?")
+        elif token.kind in ("word", "variable", "sysvar"):
+            parts.append(token.text.lower())
+        else:
+            parts.append(token.text)
+    text = " ".join(parts)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16], text
+
+
+def _unquote(name: str) -> str:
+    if name[:1] == "[" and name[-1:] == "]":
+        return name[1:-1].replace("]]", "]")
+    if name[:1] == '"' and name[-1:] == '"':
+        return name[1:-1].replace('""', '"')
+    return name
+
+
+@lru_cache(maxsize=512)
+def referenced_tables(sql: str) -> FrozenSet[str]:
+    """Lower-case names (without schema) of the tables and views a batch reads or writes"""
+    tokens = significant_tokens(sql)
+    tables = set()
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        index += 1
+        if token.kind != "word" or token.text.lower() not in TABLE_CONTEXT_KEYWORDS:
+            continue
+
+        # Read comma-separated names: FROM a, b JOIN ...
+        while index < len(tokens) and tokens[index].kind in ("word", "quoted"):
+            if tokens[index].kind == "word" and tokens[index].text.lower() in CLAUSE_KEYWORDS:
+                break
+            # Multi-part name: server.database.schema.table
+            name = tokens[index].text
+            index += 1
+            while (index + 1 < len(tokens) and tokens[index].text == "."
+                   and tokens[index + 1].kind in ("word", "quoted")):
+                name = tokens[index + 1].text
+                index += 2
+            # Table-valued functions are kept too; extra names only widen invalidation
+            tables.add(_unquote(name).lower())
+
+            # Skip an optional alias, then continue after a comma
+            if index < len(tokens) and tokens[index].kind == "word" and tokens[index].text.lower() == "as":
+                index += 1
+            if (index < len(tokens) and tokens[index].kind in ("word", "quoted")
+                    and tokens[index].text.lower() not in CLAUSE_KEYWORDS):
+                index += 1
+            if index < len(tokens) and tokens[index].text == ",":
+                index += 1
+                continue
+            break
+    return frozenset(tables)
+
+
+def changes_schema_or_runs_code(sql: str) -> bool:
+    """True when a batch runs DDL or EXEC, so its effects cannot be traced to tables"""
+    return any(
+        token.kind == "word" and token.text.lower() in SCHEMA_OR_CODE_KEYWORDS
+        for token in significant_tokens(sql)
+    )
+
+
+def quote_name(name: str) -> str:
+    """Bracket-quote one identifier, like QUOTENAME"""
+    return "[" + name.replace("]", "]]") + "]"
+
+
+def quote_object_name(name: str, default_schema: str = "dbo") -> str:
+    """Quote a possibly multi-part object name such as UT.TEST_PARAM_DATA or [dbo].[My Table]"""
+    tokens = significant_tokens(name)
+    parts = []
+    for position, token in enumerate(tokens):
+        if position % 2 == 1:
+            if token.text != ".":
+                raise ValueError(f"Invalid object name: {name}")
+        elif token.kind in ("word", "quoted"):
+            parts.append(_unquote(token.text))
+        else:
+            raise ValueError(f"Invalid object name: {name}")
+    if not parts or len(tokens) % 2 == 0 or len(parts) > 4:
+        raise ValueError(f"Invalid object name: {name}")
+    if len(parts) == 1 and not parts[0].startswith("#"):
+        parts.insert(0, default_schema)
+    return ".".join(quote_name(part) for part in parts)
+
+
+class CompiledQuery(NamedTuple):
+    # SQL text with ? placeholders
+    sql: str
+    # Parameter name (lower case, without @) bound to each placeholder, in order
+    slots: Tuple[str, ...]
+
+
+def variable_names(sql: str) -> Set[str]:
+    """Lower-case names of the @variables referenced outside strings and comments"""
+    return {token.text[1:].lower() for token in tokenize(sql) if token.kind == "variable"}
+
+
+@lru_cache(maxsize=512)
+def compile_named_parameters(sql: str, names: FrozenSet[str]) -> CompiledQuery:
+    """Replace @name references to the given parameters with ? placeholders
+
+    Names are matched case-insensitively, as whole variable tokens, outside string
+    literals, comments and quoted identifiers. @@ system variables and variables that
+    are not parameters (e.g. DECLAREd locals) are left alone.
+    """
+    parts = []
+    slots = []
+    position = 0
+    for token in tokenize(sql):
+        if token.kind != "variable":
+            continue
+        name = token.text[1:].lower()
+        if name in names:
+            parts.append(sql[position:token.start])
+            parts.append("?")
+            slots.append(name)
+            position = token.start + len(token.text)
+    parts.append(sql[position:])
+    return CompiledQuery("".join(parts), tuple(slots))
+
+
+def bind_parameters(sql: str, parameters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Compile named parameters and return the SQL with the positional values to pass"""
+    values = {key.lstrip("@").lower(): value for key, value in parameters.items()}
+    compiled = compile_named_parameters(sql, frozenset(values))
+    if not compiled.slots:
+        # No @name references: the SQL already uses ? placeholders in parameter order
+        return sql, list(values.values())
+
+    unused = set(values) - set(compiled.slots)
+    if unused:
+        raise ValueError(f"Parameters not referenced in the query: {', '.join(sorted(unused))}")
+    return compiled.sql, [values[name] for name in compiled.slots]
+
@@ -323,25 +323,16 @@ class StoredProcedureExplorer:
                 # Get column names
                 columns = [column[0] for column in cursor.description]
                 
-                # Fetch rows (limited to 1000 for safety)
-                rows = []
-                count = 0
+                # Fetch rows (limited to 1000 for safety), plus one to learn whether more exist
                 max_rows = 1000
+                fetched = cursor.fetchmany(max_rows + 1)
+                has_more = len(fetched) > max_rows
+                rows = [[str(value) if value is not None else None for value in row] for row in fetched[:max_rows]]
+                count = len(rows)
                 
-                for row in cursor:
-                    if count >= max_rows:
-                        break
-                    rows.append([str(value) if value is not None else None for value in row])
-                    count += 1
-                
-                has_more = False
-                try:
-                    # Check if there are more rows
-                    more = cursor.fetchone()
-                    if more:
-                        has_more = True
-                except:
-                    pass
+                if has_more:
+                    # Stop the server from streaming rows that will never be read
+                    cursor.cancel()
                 
                 duration = time.time() - start_time
                 
@@ -376,6 +367,11 @@ class StoredProcedureExplorer:
                 "duration_seconds": duration,
                 "message": f"Error executing procedure: {str(e)}"
             }
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
     
     async def analyze_um_activity_log_procedures(self) -> str:
         """Specifically analyze the UM Activity Log Referrals procedures in your workspace"""
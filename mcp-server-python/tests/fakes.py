@@ -0,0 +1,128 @@
+"""
+Scriptable stand-ins for pyodbc connections and cursors
+Each statement is answered by a handler(sql, params) returning a list of
+(columns, rows) result sets; columns is None for a statement without rows
+"""
+
+import threading
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+ResultSet = Tuple[Optional[Sequence[str]], List[tuple]]
+
+
+def no_rows(sql: str, params: List[Any]) -> List[ResultSet]:
+    return []
+
+
+class FakeCursor:
+    def __init__(self, connection: "FakeConnection"):
+        self.connection = connection
+        self.result_sets: List[ResultSet] = []
+        self.index = 0
+        self.position = 0
+        self.description = None
+        self.rowcount = -1
+        self.messages = []
+        self.fast_executemany = False
+        self.cancelled = False
+        self.closed = False
+
+    def _load(self):
+        if self.index < len(self.result_sets):
+            columns, rows = self.result_sets[self.index]
+            self.description = [(c, str, None, None, None, None, True) for c in columns] if columns is not None else None
+            self.rowcount = len(rows) if columns is None else -1
+            self.position = 0
+        else:
+            self.description = None
+
+    def execute(self, sql: str, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        self.connection.statements.append((sql, list(params)))
+        self.result_sets = self.connection.handler(sql, list(params)) or []
+        self.index = 0
+        self._load()
+        return self
+
+    def executemany(self, sql: str, rows):
+        rows = list(rows)
+        self.connection.statements.append((sql, rows))
+        self.connection.handler(sql, rows)
+        self.rowcount = len(rows)
+
+    def fetchmany(self, size: int = 1) -> List[tuple]:
+        if self.description is None:
+            raise Exception("No results.  Previous SQL was not a query.")
+        rows = self.result_sets[self.index][1][self.position:self.position + size]
+        self.position += len(rows)
+        return rows
+
+    def fetchall(self) -> List[tuple]:
+        return self.fetchmany(1 << 30)
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def nextset(self):
+        self.index += 1
+        self._load()
+        return True if self.index < len(self.result_sets) else None
+
+    def cancel(self):
+        self.cancelled = True
+        self.connection.cancelled.set()
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, handler: Callable[[str, List[Any]], List[ResultSet]], cancelled: threading.Event = None):
+        self.handler = handler
+        self.statements: List[Tuple[str, List[Any]]] = []
+        # Set by cursor.cancel(), so a handler can block until its statement is cancelled
+        self.cancelled = cancelled or threading.Event()
+        self.closed = False
+        self.autocommit = True
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self) -> FakeCursor:
+        if self.closed:
+            raise Exception("Attempt to use a closed connection.")
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeDriver:
+    """connection_factory for DatabaseService that records every connection it opens"""
+
+    def __init__(self, handler: Callable[[str, List[Any]], List[ResultSet]] = no_rows):
+        self.handler = handler
+        self.connections: List[FakeConnection] = []
+        self.attempts = 0
+        self.error: Optional[Exception] = None
+        self.cancelled = threading.Event()
+
+    def __call__(self, conn_str: str, timeout: int = None, autocommit: bool = False) -> FakeConnection:
+        self.attempts += 1
+        if self.error is not None:
+            raise self.error
+        # Connections answer through the driver, so tests can swap the handler at any time
+        connection = FakeConnection(lambda sql, params: self.handler(sql, params), self.cancelled)
+        connection.autocommit = autocommit
+        self.connections.append(connection)
+        return connection
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, PriorityClass, ServerBusyError, hold_slot_until
+
+
+def controller(capacity=1, max_queue=2):
+    return AdmissionController(capacity, [
+        PriorityClass("interactive", 0, max_concurrency=capacity, max_queue=max_queue),
+        PriorityClass("batch", 1, max_concurrency=capacity, max_queue=max_queue),
+    ])
+
+
+def test_admits_up_to_capacity_then_queues_by_priority():
+    async def scenario():
+        admission = controller()
+        order = []
+        release = asyncio.Event()
+
+        async def call(priority, name):
+            async with admission.admit(priority):
+                order.append(name)
+                if name == "first":
+                    await release.wait()
+
+        first = asyncio.create_task(call("batch", "first"))
+        await asyncio.sleep(0)
+        queued = [asyncio.create_task(call("batch", "batch")), asyncio.create_task(call("interactive", "interactive"))]
+        await asyncio.sleep(0)
+        assert admission.stats()["running"] == 1
+        assert admission.classes["batch"].stats()["queued"] == 1
+        release.set()
+        await asyncio.gather(first, *queued)
+        return order, admission.stats()["running"]
+
+    order, running = asyncio.run(scenario())
+    assert order == ["first", "interactive", "batch"]
+    assert running == 0
+
+
+def test_rejects_when_the_queue_is_full():
+    async def scenario():
+        admission = controller(max_queue=0)
+        async with admission.admit("batch"):
+            with pytest.raises(ServerBusyError) as busy:
+                async with admission.admit("batch"):
+                    pass
+        return busy.value, admission.classes["batch"].shed
+
+    busy, shed = asyncio.run(scenario())
+    assert busy.retry_after_ms >= 50
+    assert shed == 1
+
+
+def test_unknown_priority_is_an_error():
+    async def scenario():
+        async with controller().admit("urgent"):
+            pass
+
+    with pytest.raises(ValueError, match="Unknown priority"):
+        asyncio.run(scenario())
+
+
+def test_slot_is_held_until_abandoned_work_finishes():
+    async def scenario():
+        admission = controller()
+        loop = asyncio.get_running_loop()
+        work = loop.create_future()
+
+        async def call():
+            async with admission.admit("interactive"):
+                hold_slot_until(work)
+                await asyncio.shield(work)
+
+        task = asyncio.create_task(call())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        held = admission.stats()["running"]
+        work.set_result(None)
+        await asyncio.sleep(0)
+        return held, admission.stats()["running"]
+
+    assert asyncio.run(scenario()) == (1, 0)
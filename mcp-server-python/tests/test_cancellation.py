@@ -0,0 +1,67 @@
+import pytest
+
+from cancellation import CallCancelledError, CallScope
+
+
+class Cursor:
+    def __init__(self, fails=False):
+        self.fails = fails
+        self.cancelled = False
+
+    def cancel(self):
+        if self.fails:
+            raise Exception("Attempt to use a closed cursor.")
+        self.cancelled = True
+
+
+def test_cancel_stops_every_tracked_cursor():
+    scope = CallScope("execute_query")
+    first, second = Cursor(), Cursor()
+    scope.track("conn", first)
+    scope.track("conn", second)
+    assert scope.cancel("timed out after 100 ms") == 2
+    assert first.cancelled and second.cancelled
+    assert scope.cancelled
+    assert scope.cancel_reason == "timed out after 100 ms"
+
+
+def test_forgotten_cursors_are_left_alone():
+    scope = CallScope("execute_query")
+    kept, released, other = Cursor(), Cursor(), Cursor()
+    scope.track("a", kept)
+    scope.track("b", released)
+    scope.track("a", other)
+    scope.forget(connection="b")
+    scope.forget(cursor=other)
+    assert scope.cancel("cancelled by the client") == 1
+    assert kept.cancelled and not released.cancelled and not other.cancelled
+
+
+def test_closed_cursors_do_not_count():
+    scope = CallScope("execute_query")
+    scope.track("conn", Cursor(fails=True))
+    assert scope.cancel("cancelled by the client") == 0
+
+
+def test_no_new_statements_once_cancelled():
+    scope = CallScope("bulk_insert")
+    scope.cancel("cancelled by the client")
+    with pytest.raises(CallCancelledError, match="bulk_insert was cancelled"):
+        scope.track("conn", Cursor())
+
+
+def test_first_reason_is_kept():
+    scope = CallScope("execute_query")
+    scope.cancel("timed out after 100 ms")
+    scope.cancel("cancelled by the client")
+    assert scope.cancel_reason == "timed out after 100 ms"
+
+
+def test_children_are_cancelled_with_the_call():
+    scope = CallScope("execute_batch")
+    item = scope.child("execute_batch[0]")
+    cursor = Cursor()
+    item.track("conn", cursor)
+    assert scope.cancel("cancelled by the client") == 1
+    assert cursor.cancelled and item.cancelled
+    assert scope.child("execute_batch[1]").cancelled
@@ -0,0 +1,154 @@
+import threading
+import time
+
+import pytest
+
+from connection_pool import ConnectionPool, PoolTimeoutError
+from fakes import FakeConnection, no_rows
+
+
+class Opener:
+    """connect callable for ConnectionPool that records what it opened"""
+
+    def __init__(self, handler=no_rows):
+        self.handler = handler
+        self.opened = []
+
+    def __call__(self):
+        connection = FakeConnection(self.handler)
+        self.opened.append(connection)
+        return connection
+
+
+def select_one(sql, params):
+    return [(["one"], [(1,)])]
+
+
+def failing(sql, params):
+    raise Exception("Communication link failure")
+
+
+def test_opens_min_size_up_front():
+    opener = Opener()
+    pool = ConnectionPool(opener, min_size=2, max_size=4)
+    pool.open()
+    assert len(opener.opened) == 2
+    assert pool.stats()["idle"] == 2
+
+
+def test_reuses_the_most_recently_returned_connection():
+    opener = Opener()
+    pool = ConnectionPool(opener, min_size=0, max_size=2)
+    first = pool.acquire()
+    second = pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    assert pool.acquire() is second
+    assert len(opener.opened) == 2
+    assert pool.stats()["checkouts"] == 3
+
+
+def test_checkout_times_out_when_the_pool_is_exhausted():
+    pool = ConnectionPool(Opener(), min_size=0, max_size=1)
+    pool.acquire()
+    with pytest.raises(PoolTimeoutError, match="1 of 1 in use"):
+        pool.acquire(timeout=0.01)
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_waiting_checkout_gets_the_released_connection():
+    pool = ConnectionPool(Opener(), min_size=0, max_size=1)
+    held = pool.acquire()
+    threading.Timer(0.05, pool.release, [held]).start()
+    assert pool.acquire(timeout=5) is held
+    assert pool.stats()["waits"] == 1
+
+
+def test_broken_and_discarded_connections_are_closed():
+    pool = ConnectionPool(Opener(), min_size=0, max_size=2)
+    broken, unwanted = pool.acquire(), pool.acquire()
+    broken.mark_broken(Exception("link failure"))
+    pool.release(broken)
+    pool.release(unwanted, discard=True)
+    assert broken.connection.closed and unwanted.connection.closed
+    assert pool.stats()["size"] == 0
+    assert pool.stats()["discarded"] == 2
+
+
+def test_failed_connect_frees_its_slot():
+    def refuse():
+        raise Exception("Login timeout expired")
+
+    pool = ConnectionPool(refuse, min_size=0, max_size=1)
+    with pytest.raises(Exception, match="Login timeout"):
+        pool.acquire()
+    assert pool.stats()["size"] == 0
+
+
+def test_evicts_idle_connections_down_to_min_size():
+    pool = ConnectionPool(Opener(), min_size=1, max_size=3, idle_timeout=60)
+    held = [pool.acquire() for _ in range(3)]
+    for pooled in held:
+        pool.release(pooled)
+    for pooled in held:
+        pooled.last_used_at -= 61
+    assert pool.evict_idle() == 2
+    assert pool.stats()["size"] == 1
+
+
+def test_discard_idle_drops_connections_opened_before_a_point_in_time():
+    pool = ConnectionPool(Opener(), min_size=2, max_size=3)
+    pool.open()
+    cutoff = time.monotonic()
+    fresh = pool.acquire(), pool.acquire(), pool.acquire()
+    pool.release(fresh[2])
+    assert pool.discard_idle(cutoff) == 0
+    pool.release(fresh[0])
+    assert pool.discard_idle(cutoff) == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_ping_measures_latency_and_flags_dead_connections():
+    pool = ConnectionPool(Opener(select_one), min_size=0, max_size=1)
+    pooled = pool.acquire()
+    assert pool.ping(pooled) >= 0
+    pooled.connection.handler = failing
+    with pytest.raises(Exception):
+        pool.ping(pooled)
+    assert not pooled.healthy
+    assert pool.stats()["ping"]["count"] == 2
+    assert pool.stats()["ping"]["failures"] == 1
+
+
+def test_ping_idle_discards_dead_connections():
+    opener = Opener(select_one)
+    pool = ConnectionPool(opener, min_size=2, max_size=2)
+    pool.open()
+    opener.opened[0].handler = failing
+    assert pool.ping_idle(idle_after=0) == 1
+    assert pool.stats()["idle"] == 1
+    assert opener.opened[0].closed
+
+
+def test_connection_block_checks_the_connection_after_a_disconnect():
+    pool = ConnectionPool(Opener(), min_size=2, max_size=2,
+                          is_disconnect=lambda error: "link failure" in str(error))
+    pool.open()
+    with pytest.raises(Exception):
+        with pool.connection():
+            raise Exception("Communication link failure")
+    # The dead connection and the idle ones opened before it are gone
+    assert pool.stats()["size"] == 0
+
+
+def test_close_waits_for_checked_out_connections():
+    pool = ConnectionPool(Opener(), min_size=1, max_size=2)
+    pool.open()
+    held = pool.acquire()
+    pool.acquire()
+    pool.close()
+    assert not held.connection.closed
+    pool.release(held)
+    assert held.connection.closed
+    with pytest.raises(Exception, match="closed"):
+        pool.acquire()
@@ -0,0 +1,296 @@
+import asyncio
+import time
+
+import pytest
+
+# Skipped where pyodbc or the ODBC driver manager it loads is not installed
+pyodbc = pytest.importorskip("pyodbc", exc_type=ImportError)
+
+import server
+from fakes import FakeDriver
+
+
+@pytest.fixture
+def driver():
+    return FakeDriver()
+
+
+@pytest.fixture
+def service(driver):
+    service = server.DatabaseService(driver)
+    service.retry_base_delay = 0
+    service.connect("localhost", "app")
+    yield service
+    service.disconnect()
+
+
+class TestRetries:
+    def test_reconnects_are_retried_by_the_outer_layer_only(self, service, driver):
+        service.pool.discard_idle(time.time() + 1)
+        driver.error = pyodbc.OperationalError("08S01", "Communication link failure (10054)")
+        attempts = driver.attempts
+        with pytest.raises(Exception, match="Communication link failure"):
+            service.list_tables()
+        assert driver.attempts - attempts == service.retry_attempts + 1
+
+    def test_reconnects_outside_a_retrying_method_back_off_and_retry(self, service, driver):
+        service.pool.discard_idle(time.time() + 1)
+        driver.error = pyodbc.OperationalError("08S01", "Communication link failure (10054)")
+        attempts = driver.attempts
+        with pytest.raises(Exception):
+            service.execute_query("UPDATE t SET a = 1")
+        assert driver.attempts - attempts == service.retry_attempts + 1
+
+
+def numbers(count):
+    """Handler answering every SELECT with the numbers 1..count"""
+    def handler(sql, params):
+        if sql.lstrip().upper().startswith("SELECT"):
+            return [(["n"], [(n,) for n in range(1, count + 1)])]
+        return []
+    return handler
+
+
+class TestPaging:
+    def test_pages_through_a_result_and_releases_the_connection(self, service, driver):
+        driver.handler = numbers(5)
+        page = service.execute_query("SELECT n FROM t", page_size=2)
+        assert [row["n"] for row in page["recordset"]] == [1, 2]
+        assert page["hasMore"]
+        token = page["continuationToken"]
+        assert service.pool.stats()["in_use"] == 1
+
+        page = service.fetch_next(token)
+        assert [row["n"] for row in page["recordset"]] == [3, 4]
+        page = service.fetch_next(token, 10)
+        assert [row["n"] for row in page["recordset"]] == [5]
+        assert not page["hasMore"]
+        assert page["continuationToken"] is None
+        assert page["rowsFetched"] == 5
+        assert service.pool.stats()["in_use"] == 0
+        with pytest.raises(Exception, match="Unknown or expired"):
+            service.fetch_next(token)
+
+    def test_statement_without_rows_is_not_kept_open(self, service, driver):
+        page = service.execute_query("UPDATE t SET a = 1", page_size=2)
+        assert page["continuationToken"] is None
+        assert service.cursors == {}
+
+    def test_idle_cursors_expire(self, service, driver):
+        driver.handler = numbers(5)
+        token = service.execute_query("SELECT n FROM t", page_size=2)["continuationToken"]
+        service.cursors[token].last_used_at -= service.cursor_idle_ttl + 1
+        assert service.expire_cursors() == 1
+        assert service.pool.stats()["in_use"] == 0
+        with pytest.raises(Exception, match="Unknown or expired"):
+            service.fetch_next(token)
+
+    def test_open_cursors_are_capped(self, service, driver):
+        driver.handler = numbers(5)
+        service.max_cursors = 1
+        service.execute_query("SELECT n FROM t", page_size=2)
+        with pytest.raises(Exception, match="Too many open cursors"):
+            service.execute_query("SELECT n FROM t", page_size=2)
+
+    @pytest.mark.parametrize("caps", [{"max_rows": 3}, {"max_bytes": 100}])
+    def test_rejects_result_caps(self, service, caps):
+        with pytest.raises(ValueError, match="cannot be combined with pageSize"):
+            service.execute_query("SELECT n FROM t", page_size=2, **caps)
+
+
+class TestBulkInsert:
+    def inserts(self, driver):
+        return [rows for connection in driver.connections for sql, rows in connection.statements
+                if sql.startswith("INSERT")]
+
+    def test_commits_one_transaction_per_chunk(self, service, driver):
+        result = service.bulk_insert("dbo.t", ["a", "b"], [[1, 2], [3, 4], [5, 6]], batch_size=2)
+        assert (result["rowsInserted"], result["chunks"]) == (3, 2)
+        assert self.inserts(driver) == [[(1, 2), (3, 4)], [(5, 6)]]
+        assert sum(connection.commits for connection in driver.connections) == 2
+        assert all(connection.autocommit for connection in driver.connections)
+
+    def test_objects_are_matched_to_columns_by_key(self, service, driver):
+        service.bulk_insert("dbo.t", rows=[{"a": 1, "b": 2}, {"b": 4}])
+        assert self.inserts(driver) == [[(1, 2), (None, 4)]]
+
+    @pytest.mark.parametrize("rows", [[[1, 2], [3, 4], [5]], [[1, 2], [3, 4], 5], [{"a": 1}, [2]]])
+    def test_bad_json_rows_fail_before_anything_is_committed(self, service, driver, rows):
+        with pytest.raises(Exception, match="Row 3|Row 2"):
+            service.bulk_insert("dbo.t", ["a", "b"], rows, batch_size=1)
+        assert self.inserts(driver) == []
+
+    def test_csv_loads_empty_fields_as_null(self, service, driver, tmp_path):
+        path = tmp_path / "rows.csv"
+        path.write_text("A,b\n1,\n3,4\n", encoding="utf-8")
+        service.bulk_insert("dbo.t", ["b", "a"], csv_path=str(path))
+        assert self.inserts(driver) == [[(None, "1"), ("4", "3")]]
+
+    def test_bad_csv_line_reports_the_committed_rows(self, service, driver, tmp_path):
+        path = tmp_path / "rows.csv"
+        # Far enough in that the bad byte is decoded after the first chunks are sent
+        path.write_bytes(b"a\n" + b"1\n" * 20000 + b"\xff\n")
+        with pytest.raises(Exception, match=r"reading chunk \d+ failed, \d+ rows were committed") as failed:
+            service.bulk_insert("dbo.t", csv_path=str(path), batch_size=1000)
+        committed = sum(len(rows) for rows in self.inserts(driver))
+        assert committed > 0
+        assert f"{committed} rows were committed" in str(failed.value)
+
+    def test_failed_chunk_is_rolled_back(self, service, driver):
+        def handler(sql, params):
+            if sql.startswith("INSERT") and params == [(3,)]:
+                raise pyodbc.IntegrityError("23000", "Violation of PRIMARY KEY constraint")
+            return []
+        driver.handler = handler
+        with pytest.raises(Exception, match="chunk 2 was rolled back, 2 rows were committed before it"):
+            service.bulk_insert("dbo.t", ["a"], [[1], [2], [3]], batch_size=2)
+        assert sum(connection.rollbacks for connection in driver.connections) == 1
+
+
+class TestClientCancellation:
+    def test_running_statement_is_cancelled_before_the_task_ends(self, monkeypatch, driver, capsys):
+        def handler(sql, params):
+            if "slow" in sql:
+                # Runs until cursor.cancel(), then fails the way the driver does
+                driver.cancelled.wait(5)
+                raise pyodbc.OperationalError("HY008", "Operation canceled")
+            return []
+        driver.handler = handler
+        monkeypatch.setattr(server.pyodbc, "connect", driver)
+        monkeypatch.setattr(server, "connections", server.ConnectionRegistry())
+
+        async def scenario():
+            await server.handle_call_tool("connect_database", {"server": "localhost", "database": "app"})
+            task = asyncio.create_task(server.handle_call_tool("execute_query", {"query": "EXEC dbo.slow"}))
+            while not any("slow" in sql for connection in driver.connections for sql, _ in connection.statements):
+                await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.sleep(0)
+            # A second cancellation must not cut the cleanup short
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return driver.cancelled.is_set()
+
+        try:
+            assert asyncio.run(scenario())
+        finally:
+            server.connections.disconnect_all()
+        assert "execute_query cancelled by the client; 1 statement(s) stopped" in capsys.readouterr().err
+
+
+class TestResultSets:
+    def test_truncation_is_flagged_in_the_call_metadata(self, service, driver):
+        driver.handler = lambda sql, params: [(["a"], [(1,), (2,), (3,)]), (["b"], [(4,)])]
+        service.max_rows = 2
+        metadata = {}
+        token = server.call_metadata.set(metadata)
+        try:
+            result_sets = service.execute_result_sets("SELECT a FROM t; SELECT b FROM u")
+        finally:
+            server.call_metadata.reset(token)
+        assert result_sets == [[{"a": 1}, {"a": 2}]]
+        assert metadata == {"truncated": True, "truncatedBy": "max_rows"}
+
+
+class TestSessions:
+    def test_session_statements_share_one_connection_until_it_ends(self, service, driver):
+        session_id = service.begin_session()["sessionId"]
+        connection = service.sessions[session_id].pooled.connection
+        service.execute_query("SELECT 1 AS a INTO #Actual", session_id=session_id)
+        service.execute_query("SELECT a FROM #Actual", session_id=session_id)
+        assert len([sql for sql, _ in connection.statements if "#Actual" in sql]) == 2
+        service.end_session(session_id)
+        # Its temp tables must never reach another caller
+        assert connection.closed
+        with pytest.raises(Exception, match="Unknown or expired session"):
+            service.execute_query("SELECT a FROM #Actual", session_id=session_id)
+
+    def test_open_sessions_are_capped(self, service):
+        for _ in range(service.max_sessions):
+            service.begin_session()
+        with pytest.raises(Exception, match="Too many open sessions"):
+            service.begin_session()
+
+    def test_idle_sessions_expire(self, service):
+        session_id = service.begin_session(idle_ttl=60)["sessionId"]
+        service.sessions[session_id].last_used_at -= 61
+        assert service.expire_sessions() == 1
+        assert service.sessions == {}
+
+
+class TestHeldConnectionLimits:
+    def test_defaults_split_the_spare_connections(self, monkeypatch):
+        monkeypatch.delenv("DB_MAX_SESSIONS", raising=False)
+        monkeypatch.delenv("DB_MAX_CURSORS", raising=False)
+        assert server.DatabaseService.held_connection_limits(10) == (5, 4)
+        assert server.DatabaseService.held_connection_limits(1) == (0, 0)
+
+    def test_one_setting_takes_the_rest_from_the_other(self, monkeypatch):
+        monkeypatch.setenv("DB_MAX_SESSIONS", "7")
+        monkeypatch.delenv("DB_MAX_CURSORS", raising=False)
+        assert server.DatabaseService.held_connection_limits(10) == (7, 2)
+
+    def test_rejects_limits_that_could_take_every_connection(self, monkeypatch):
+        monkeypatch.setenv("DB_MAX_SESSIONS", "6")
+        monkeypatch.setenv("DB_MAX_CURSORS", "4")
+        with pytest.raises(ValueError, match="must be less than DB_POOL_MAX_SIZE"):
+            server.DatabaseService.held_connection_limits(10)
+
+
+class TestConnectionRegistry:
+    @pytest.fixture
+    def registry(self, monkeypatch, driver):
+        monkeypatch.setattr(server.pyodbc, "connect", driver)
+        registry = server.ConnectionRegistry()
+        yield registry
+        registry.disconnect_all()
+
+    def test_reuses_the_pool_of_a_connected_handle(self, registry, driver):
+        handle = registry.connect("sql1", "app")
+        service = registry.get(handle)
+        opened = driver.attempts
+        assert registry.connect("sql1", "app") == handle
+        assert registry.get(handle) is service
+        assert driver.attempts == opened
+
+    def test_handles_are_per_server_database_and_login(self, registry):
+        first = registry.connect("sql1", "app")
+        second = registry.connect("sql1", "audit", "reader", "secret")
+        assert (first, second) == ("sql1/app", "reader@sql1/audit")
+        # The most recent connection is the default
+        assert registry.get() is registry.get(second)
+        assert [item["default"] for item in registry.list_connections()] == [False, True]
+
+    def test_another_password_logs_in_on_its_own(self, registry):
+        handle = registry.connect("sql1", "app", "reader", "secret")
+        service = registry.get(handle)
+        assert registry.connect("sql1", "app", "reader", "other") == handle
+        assert registry.get(handle) is not service
+        assert not service.is_connected
+        # Only a digest of the password is kept
+        assert len(registry.credentials[handle]) == 32
+        assert b"other" not in registry.credentials[handle]
+
+    def test_disconnect_moves_the_default(self, registry):
+        first = registry.connect("sql1", "app")
+        second = registry.connect("sql2", "app")
+        registry.disconnect()
+        assert registry.default_handle == first
+        with pytest.raises(Exception, match="Unknown connection"):
+            registry.get(second)
+
+    def test_requires_a_connection(self, registry):
+        with pytest.raises(Exception, match="not connected"):
+            registry.get()
+
+
+class TestLimitPushdown:
+    def test_plain_select_asks_the_server_for_one_row_past_the_cap(self, service, driver):
+        driver.handler = numbers(3)
+        result = service.execute_query("SELECT n FROM t", max_rows=2)
+        statements = [sql for connection in driver.connections for sql, _ in connection.statements]
+        assert "SELECT TOP (3) n FROM t" in statements
+        assert len(result["recordset"]) == 2
+        assert result["truncated"]
+        assert result["rowsSkippedEstimate"] is None
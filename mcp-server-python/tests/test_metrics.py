@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import pytest
+
+from metrics import LatencyHistogram, LoopLagMonitor, QueryStats
+
+
+class TestLoopLagMonitor:
+    def test_reports_lag_in_milliseconds_and_counts_stalls(self):
+        monitor = LoopLagMonitor(interval=0.1, stall_threshold=0.1)
+        for lag in (0.001, 0.002, 0.25):
+            monitor.record(lag)
+        snapshot = monitor.snapshot()
+        assert snapshot["samples"] == 3
+        assert snapshot["last_ms"] == 250.0
+        assert snapshot["max_ms"] == 250.0
+        assert snapshot["mean_ms"] == 84.333
+        assert snapshot["recent_p99_ms"] == 250.0
+        assert snapshot["stalls"] == 1
+
+    def test_percentile_covers_only_the_recent_window(self):
+        monitor = LoopLagMonitor(window=2)
+        for lag in (0.5, 0.001, 0.002):
+            monitor.record(lag)
+        snapshot = monitor.snapshot()
+        assert snapshot["recent_p99_ms"] == 2.0
+        assert snapshot["max_ms"] == 500.0
+
+    def test_samples_a_blocked_event_loop(self):
+        async def scenario():
+            monitor = LoopLagMonitor(interval=0.01, stall_threshold=0.05)
+            monitor.start()
+            await asyncio.sleep(0.02)
+            # Blocking the loop delays the monitor's next wake-up
+            time.sleep(0.1)
+            await asyncio.sleep(0.03)
+            monitor.stop()
+            return monitor.snapshot()
+
+        snapshot = asyncio.run(scenario())
+        assert snapshot["samples"] >= 2
+        assert snapshot["stalls"] >= 1
+        assert snapshot["max_ms"] >= 50
+
+
+class TestLatencyHistogram:
+    def test_percentiles_overstate_by_at_most_one_bucket(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 101):
+            histogram.record(float(value))
+        assert 50 <= histogram.percentile(0.50) <= 50 * LatencyHistogram.GROWTH
+        assert 95 <= histogram.percentile(0.95) <= 95 * LatencyHistogram.GROWTH
+        assert histogram.percentile(1.0) == 100
+        assert histogram.count == 100
+        assert histogram.total == 5050
+
+    def test_never_reports_past_the_maximum(self):
+        histogram = LatencyHistogram()
+        histogram.record(3.0)
+        assert histogram.percentile(0.99) == 3.0
+
+    def test_empty_and_tiny_values(self):
+        histogram = LatencyHistogram()
+        assert histogram.percentile(0.5) == 0.0
+        histogram.record(0.0)
+        assert histogram.percentile(0.5) == 0.0
+
+
+class TestQueryStats:
+    def test_accumulates_per_fingerprint(self):
+        stats = QueryStats()
+        stats.record("a", "SELECT 1", 10.0, rows=2, size=20)
+        stats.record("a", "SELECT 1", 30.0, rows=3, size=30, error=True)
+        stats.record("b", "SELECT 2", 5.0)
+        top = stats.top("totalMs")
+        assert [entry["fingerprint"] for entry in top["queries"]] == ["a", "b"]
+        entry = top["queries"][0]
+        assert (entry["calls"], entry["errors"], entry["rows"], entry["bytes"]) == (2, 1, 5, 50)
+        assert entry["totalMs"] == 40.0
+        assert entry["meanMs"] == 20.0
+
+    def test_cache_hits_are_counted_but_not_timed(self):
+        stats = QueryStats()
+        stats.record("a", "SELECT 1", 10.0)
+        stats.record("a", "SELECT 1", 0.0, cached=True)
+        entry = stats.top()["queries"][0]
+        assert (entry["calls"], entry["cacheHits"], entry["meanMs"]) == (2, 1, 10.0)
+
+    def test_drops_the_least_recently_seen_fingerprint(self):
+        stats = QueryStats(max_fingerprints=2)
+        stats.record("a", "SELECT 1", 1.0)
+        stats.record("b", "SELECT 2", 1.0)
+        stats.record("a", "SELECT 1", 1.0)
+        stats.record("c", "SELECT 3", 1.0)
+        top = stats.top("calls", limit=0)
+        assert sorted(entry["fingerprint"] for entry in top["queries"]) == ["a", "c"]
+        assert top["evicted"] == 1
+
+    def test_shortens_stored_text(self):
+        stats = QueryStats()
+        stats.record("a", "x" * 1000, 1.0)
+        assert len(stats.top()["queries"][0]["query"]) == QueryStats.MAX_TEXT
+
+    def test_rejects_unknown_order_fields(self):
+        with pytest.raises(ValueError, match="orderBy"):
+            QueryStats().top("name")
@@ -0,0 +1,113 @@
+import pytest
+
+from procedures import (
+    ProcedureParameter, ProcedureSignature, SignatureCache, build_exec_batch, parameter_defaults, table_parameter_value
+)
+
+
+def signature():
+    return ProcedureSignature("dbo.usp_save", [
+        ProcedureParameter("@id", "int", "sys", False, False, False),
+        ProcedureParameter("@rows", "OrderLineType", "dbo", True, False, True, columns=("sku", "qty")),
+        ProcedureParameter("@status", "nvarchar", "sys", False, True, False, max_length=100),
+        ProcedureParameter("@total", "decimal", "sys", False, True, False, precision=18, scale=2),
+    ])
+
+
+def test_declares_outputs_and_selects_the_return_code():
+    batch = build_exec_batch("dbo.usp_save", signature(), {"id": 7})
+    assert batch.sql == (
+        "DECLARE @__return_code int, @__output0 nvarchar(50), @__output1 decimal(18, 2);\n"
+        "EXEC @__return_code = dbo.usp_save @id = ?, @status = @__output0 OUTPUT, @total = @__output1 OUTPUT;\n"
+        "SELECT @__return_code AS __return_code, @__output0, @__output1;"
+    )
+    assert batch.params == [7]
+    assert batch.outputs == ("@status", "@total")
+
+
+def test_passed_output_values_initialize_the_variable():
+    batch = build_exec_batch("dbo.usp_save", signature(), {"@STATUS": "new", "id": 1})
+    assert "@__output0 nvarchar(50) = ?" in batch.sql
+    assert batch.params == ["new", 1]
+
+
+def test_table_valued_rows_become_pyodbc_tvp_values():
+    batch = build_exec_batch("dbo.usp_save", signature(), {"rows": [{"QTY": 2, "sku": "A"}, ["B", 1]]})
+    assert "@rows = ?" in batch.sql
+    assert batch.params == [["OrderLineType", "dbo", ("A", 2), ("B", 1)]]
+
+
+def test_empty_table_valued_parameter_is_omitted():
+    batch = build_exec_batch("dbo.usp_save", signature(), {"rows": []})
+    assert "@rows" not in batch.sql
+    assert batch.params == []
+
+
+def test_rejects_arrays_for_scalar_parameters():
+    with pytest.raises(ValueError, match="not a table type"):
+        build_exec_batch("dbo.usp_save", signature(), {"id": [1, 2]})
+
+
+def test_rejects_unknown_table_columns():
+    with pytest.raises(ValueError, match="price"):
+        build_exec_batch("dbo.usp_save", signature(), {"rows": [{"sku": "A", "price": 1}]})
+
+
+def test_omitted_output_with_a_default_is_left_to_the_procedure():
+    parameters = signature().parameters + [
+        ProcedureParameter("@note", "nvarchar", "sys", False, True, True, max_length=20),
+    ]
+    batch = build_exec_batch("dbo.usp_save", ProcedureSignature("dbo.usp_save", parameters), {"id": 7})
+    assert "@note" not in batch.sql
+    assert batch.outputs == ("@status", "@total")
+
+    batch = build_exec_batch("dbo.usp_save", ProcedureSignature("dbo.usp_save", parameters), {"id": 7, "note": "x"})
+    assert "@note = @__output2 OUTPUT" in batch.sql
+    assert batch.outputs == ("@status", "@total", "@note")
+
+
+def test_defaults_come_from_the_procedure_header():
+    definition = (
+        "-- CREATE PROCEDURE old @id int = 1\n"
+        "CREATE PROCEDURE [dbo].[usp_save] @id int, @total decimal(18, 2) = 0 OUTPUT,\n"
+        "    @status nvarchar(50) = N'new' OUT, @note nvarchar(20) OUTPUT\n"
+        "WITH RECOMPILE AS BEGIN DECLARE @count int = 1; END"
+    )
+    assert parameter_defaults(definition) == {"@total", "@status"}
+
+
+def test_signature_marks_header_defaults():
+    row = {"parameter_name": "@Total", "data_type": "int", "type_schema": "sys", "is_table_type": 0,
+           "is_output": 1, "has_default_value": 0, "max_length": 4, "precision": 10, "scale": 0}
+    definition = "create or alter proc dbo.usp_save (@total int = 0 output) as select 1"
+    signature = ProcedureSignature.from_result_sets("dbo.usp_save", [row], [], definition)
+    assert signature.parameters[0].has_default
+
+
+def test_single_column_table_types_accept_plain_values():
+    ids = ProcedureParameter("@ids", "IdList", "dbo", True, False, False, columns=("id",))
+    assert table_parameter_value(ids, [1, 2]) == ["IdList", "dbo", (1,), (2,)]
+
+
+def test_rejects_rows_with_the_wrong_width():
+    with pytest.raises(ValueError, match="Row 2 of @rows has 1 values"):
+        build_exec_batch("dbo.usp_save", signature(), {"rows": [["A", 1], ["B"]]})
+
+
+def test_signature_cache_reloads_after_its_ttl():
+    loads = []
+
+    def load(name):
+        loads.append(name)
+        return signature()
+
+    cache = SignatureCache(ttl=60)
+    assert cache.get("dbo.usp_save", load) is cache.get("DBO.USP_SAVE", load)
+    assert loads == ["dbo.usp_save"]
+    cache.ttl = -1
+    cache.clear()
+    cache.get("dbo.usp_save", load)
+    cache.get("dbo.usp_save", load)
+    assert len(loads) == 3
+    assert cache.stats()["hits"] == 1
+
@@ -0,0 +1,101 @@
+from profiling import SHOWPLAN_COLUMN, SUMMARY_LIMIT, QueryProfile, statistics_sql, summarize_plans
+from fakes import FakeConnection
+
+IO_MESSAGE = (
+    "[01000] (3615) Table 'Orders'. Scan count 1, logical reads 120, physical reads 2, "
+    "page server reads 0, read-ahead reads 40, page server read-ahead reads 0, lob logical reads 0"
+)
+TIME_MESSAGE = "[01000] (3612)  SQL Server Execution Times:\n   CPU time = 15 ms,  elapsed time = 22 ms."
+COMPILE_MESSAGE = "[01000] (3613) SQL Server parse and compile time: \n   CPU time = 3 ms, elapsed time = 4 ms."
+
+PLAN = """<ShowPlanXML xmlns="http://schemas.microsoft.com/sqlserver/2004/07/showplan">
+  <BatchSequence><Batch><Statements><StmtSimple><QueryPlan>
+    <Warnings NoJoinPredicate="1"><SpillToTempDb SpillLevel="1"/></Warnings>
+    <MissingIndexes>
+      <MissingIndexGroup Impact="87.5">
+        <MissingIndex Database="[app]" Schema="[dbo]" Table="[Orders]">
+          <ColumnGroup Usage="EQUALITY"><Column Name="[CustomerId]" ColumnId="2"/></ColumnGroup>
+        </MissingIndex>
+      </MissingIndexGroup>
+    </MissingIndexes>
+    <RelOp PhysicalOp="Hash Match" EstimateCPU="0.5" EstimateIO="0" EstimateRows="10">
+      <RunTimeInformation><RunTimeCountersPerThread Thread="0" ActualRows="12"/></RunTimeInformation>
+      <RelOp PhysicalOp="Clustered Index Scan" EstimateCPU="0.1" EstimateIO="2" EstimateRows="1000">
+        <RunTimeInformation>
+          <RunTimeCountersPerThread Thread="1" ActualRows="600"/>
+          <RunTimeCountersPerThread Thread="2" ActualRows="400"/>
+        </RunTimeInformation>
+        <IndexScan><Object Schema="[dbo]" Table="[Orders]" Index="[PK_Orders]"/></IndexScan>
+      </RelOp>
+    </RelOp>
+  </QueryPlan></StmtSimple></Statements></Batch></BatchSequence>
+</ShowPlanXML>"""
+
+
+def cursor(messages, result_sets=()):
+    """A cursor positioned on the first of result_sets, carrying the driver messages"""
+    connection = FakeConnection(lambda sql, params: list(result_sets))
+    cursor = connection.cursor().execute("batch")
+    cursor.messages = messages
+    return cursor
+
+
+def test_statistics_sql():
+    assert statistics_sql(False, True) == "SET STATISTICS IO, TIME ON;"
+    assert statistics_sql(True, False) == "SET STATISTICS IO, TIME OFF; SET STATISTICS XML OFF;"
+
+
+def test_sums_io_and_time_messages():
+    profile = QueryProfile()
+    profile.collect_messages(cursor([("[01000]", IO_MESSAGE), ("[01000]", COMPILE_MESSAGE)]))
+    profile.collect_messages(cursor([("[01000]", IO_MESSAGE), ("[01000]", TIME_MESSAGE), ("[01000]", TIME_MESSAGE)]))
+    summary = profile.summary()
+    assert (summary["cpuMs"], summary["elapsedMs"]) == (30, 44)
+    assert (summary["compileCpuMs"], summary["compileElapsedMs"]) == (3, 4)
+    assert (summary["logicalReads"], summary["physicalReads"]) == (240, 4)
+    assert summary["tables"] == [
+        {"table": "Orders", "scans": 2, "logicalReads": 240, "physicalReads": 4, "readAheadReads": 80}
+    ]
+
+
+def test_nested_calls_report_the_outermost_time():
+    profile = QueryProfile(nested=True)
+    profile.collect_messages(cursor([("[01000]", TIME_MESSAGE), ("[01000]", TIME_MESSAGE.replace("15", "40"))]))
+    assert profile.summary()["cpuMs"] == 40
+
+
+def test_lists_only_the_busiest_tables():
+    profile = QueryProfile()
+    messages = [("[01000]", IO_MESSAGE.replace("Orders", f"T{n}").replace("120", str(n)))
+                for n in range(SUMMARY_LIMIT + 2)]
+    profile.collect_messages(cursor(messages))
+    summary = profile.summary()
+    assert [table["table"] for table in summary["tables"]][0] == f"T{SUMMARY_LIMIT + 1}"
+    assert summary["tablesOmitted"] == 2
+
+
+def test_skip_plans_moves_past_showplan_result_sets():
+    profile = QueryProfile(include_plan=True)
+    results = cursor([], [([SHOWPLAN_COLUMN], [(PLAN,)]), (["id"], [(1,)])])
+    profile.skip_plans(results)
+    assert results.description[0][0] == "id"
+    assert profile.plans == [PLAN]
+
+
+def test_drain_collects_plans_after_the_result_that_was_read():
+    profile = QueryProfile(include_plan=True)
+    results = cursor([], [(["id"], [(1,)]), ([SHOWPLAN_COLUMN], [(PLAN,)])])
+    results.fetchall()
+    profile.drain(results)
+    assert profile.summary()["plan"]["statements"] == 1
+
+
+def test_summarize_plans():
+    plan = summarize_plans([PLAN, "<not xml"])
+    assert plan["statements"] == 1
+    assert plan["warnings"] == ["NoJoinPredicate", "SpillToTempDb"]
+    assert plan["missingIndexes"] == [{"impact": 87.5, "table": "Orders", "columns": ["CustomerId"]}]
+    scan, join = plan["costliestOperators"]
+    assert scan == {"operator": "Clustered Index Scan", "object": "dbo.Orders.PK_Orders",
+                    "estimatedCost": 2.1, "estimatedRows": 1000.0, "actualRows": 1000}
+    assert (join["operator"], join["actualRows"]) == ("Hash Match", 12)
@@ -0,0 +1,63 @@
+from query_cache import QueryCache
+
+
+def test_returns_copies_of_cached_values():
+    cache = QueryCache(max_bytes=1000, ttl=60)
+    value = {"recordset": [{"id": 1}]}
+    cache.put("q", value, 10, {"t"}, cache.generation)
+    value["recordset"].append({"id": 2})
+    hit = cache.get("q")
+    hit["recordset"][0]["id"] = 99
+    assert cache.get("q") == {"recordset": [{"id": 1}]}
+
+
+def test_evicts_least_recently_used_over_max_bytes():
+    cache = QueryCache(max_bytes=25, ttl=60)
+    cache.put("a", 1, 10, set(), cache.generation)
+    cache.put("b", 2, 10, set(), cache.generation)
+    cache.get("a")
+    cache.put("c", 3, 10, set(), cache.generation)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_skips_values_larger_than_the_cache():
+    cache = QueryCache(max_bytes=5, ttl=60)
+    cache.put("a", 1, 10, set(), cache.generation)
+    assert cache.get("a") is None
+
+
+def test_expires_after_ttl():
+    cache = QueryCache(max_bytes=100, ttl=0)
+    cache.put("a", 1, 10, set(), cache.generation)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_invalidates_entries_by_table():
+    cache = QueryCache(max_bytes=100, ttl=60)
+    cache.put("orders", 1, 10, {"orders"}, cache.generation)
+    cache.put("join", 2, 10, {"orders", "customers"}, cache.generation)
+    cache.put("customers", 3, 10, {"customers"}, cache.generation)
+    assert cache.invalidate_tables(["orders"]) == 2
+    assert cache.get("orders") is None
+    assert cache.get("join") is None
+    assert cache.get("customers") == 3
+
+
+def test_does_not_cache_a_read_that_overlapped_a_write():
+    cache = QueryCache(max_bytes=100, ttl=60)
+    generation = cache.generation
+    cache.invalidate_tables(["orders"])
+    cache.put("orders", 1, 10, {"orders"}, generation)
+    assert cache.get("orders") is None
+
+
+def test_clear_drops_everything():
+    cache = QueryCache(max_bytes=100, ttl=60)
+    cache.put("a", 1, 10, {"t"}, cache.generation)
+    assert cache.clear() == 1
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bytes"] == 0
@@ -0,0 +1,148 @@
+import pytest
+
+import resilience
+from connection_pool import PoolTimeoutError
+from resilience import (
+    CircuitBreaker, CircuitOpenError, call_with_retry, is_disconnect_error, is_outage_error, is_transient_error
+)
+
+
+class DriverError(Exception):
+    """Stands in for pyodbc.Error: args are (sqlstate, message)"""
+
+
+@pytest.fixture(autouse=True)
+def driver_errors(monkeypatch):
+    monkeypatch.setattr(resilience, "DRIVER_ERRORS", (DriverError,))
+
+
+def wrapped(error):
+    """The error as the tools raise it, wrapped in a plain Exception"""
+    try:
+        raise error
+    except Exception as e:
+        try:
+            raise Exception(f"Failed to execute query: {str(e)}")
+        except Exception as outer:
+            return outer
+
+
+class TestClassification:
+    def test_disconnects_are_transient(self):
+        error = DriverError("08S01", "[Microsoft][ODBC Driver 17] Communication link failure (10054)")
+        assert is_disconnect_error(error)
+        assert is_transient_error(error)
+
+    def test_deadlock_is_transient(self):
+        error = DriverError("40001", "Transaction was deadlocked (1205)")
+        assert is_transient_error(error)
+        assert not is_disconnect_error(error)
+
+    def test_syntax_error_is_neither(self):
+        error = DriverError("42000", "Incorrect syntax near 'FORM'. (102)")
+        assert not is_transient_error(error)
+
+    def test_reads_the_chain_of_wrapped_errors(self):
+        assert is_transient_error(wrapped(DriverError("HYT01", "Connection timeout expired")))
+
+    def test_disconnects_are_outages(self):
+        assert is_outage_error(DriverError("08S01", "Communication link failure (10054)"))
+
+    def test_deadlock_is_not_an_outage(self):
+        assert not is_outage_error(DriverError("40001", "Transaction was deadlocked (1205)"))
+
+    def test_fail_fast_rejections_are_not_transient(self):
+        rejection = CircuitOpenError("circuit is open (last error: link failure (10054))", 5.0)
+        assert not is_transient_error(rejection)
+        assert not is_transient_error(wrapped(rejection))
+        assert not is_transient_error(PoolTimeoutError("Timed out waiting for a database connection"))
+
+    def test_ignores_numbers_in_non_driver_messages(self):
+        assert not is_transient_error(Exception("08S01", "lost connection (10054)"))
+        assert not is_transient_error(wrapped(ValueError("bad value (1205)")))
+
+
+class TestCallWithRetry:
+    def test_retries_transient_errors_then_succeeds(self):
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise DriverError("40001", "deadlocked (1205)")
+            return "ok"
+
+        retries = []
+        assert call_with_retry(flaky, max_retries=3, base_delay=0, on_retry=lambda n, e: retries.append(n)) == "ok"
+        assert retries == [1, 2]
+
+    def test_gives_up_after_max_retries(self):
+        calls = []
+
+        def always_fails():
+            calls.append(1)
+            raise DriverError("08S01", "link failure")
+
+        with pytest.raises(DriverError):
+            call_with_retry(always_fails, max_retries=2, base_delay=0)
+        assert len(calls) == 3
+
+    def test_never_retries_a_circuit_rejection(self):
+        calls = []
+
+        def rejected():
+            calls.append(1)
+            raise CircuitOpenError("open", 1.0)
+
+        with pytest.raises(CircuitOpenError):
+            call_with_retry(rejected, max_retries=3, base_delay=0, is_retryable=lambda e: True)
+        assert len(calls) == 1
+
+
+def trip(breaker, times):
+    for _ in range(times):
+        with pytest.raises(DriverError):
+            with breaker.guard():
+                raise DriverError("08001", "server not found")
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_outages_and_fails_fast(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        trip(breaker, 1)
+        assert breaker.state == "closed"
+        trip(breaker, 1)
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError) as rejected:
+            breaker.before_call()
+        assert 0 < rejected.value.retry_after <= 60
+        assert breaker.stats()["rejected"] == 1
+
+    def test_sql_errors_do_not_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        trip(breaker, 1)
+        with pytest.raises(DriverError):
+            with breaker.guard():
+                raise DriverError("42S02", "Invalid object name 'x'. (208)")
+        trip(breaker, 1)
+        assert breaker.state == "closed"
+
+    def test_half_open_trial_success_closes(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0, half_open_max_calls=1)
+        trip(breaker, 1)
+        assert breaker.state == "half_open"
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_half_open_trial_failure_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        trip(breaker, 1)
+        breaker.reset_timeout = 0
+        assert breaker.state == "half_open"
+        breaker.reset_timeout = 60
+        trip(breaker, 1)
+        assert breaker.state == "open"
+        assert breaker.stats()["times_opened"] == 2
@@ -0,0 +1,55 @@
+from results import ResultLimits
+
+
+class Cursor:
+    """Serves rows through fetchmany and records cancel()"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.rowcount = -1
+        self.cancelled = False
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def cancel(self):
+        self.cancelled = True
+
+
+def test_call_caps_only_lower_the_global_caps():
+    limits = ResultLimits.combine(100, 1000, call_rows=500, call_bytes=10)
+    assert (limits.max_rows, limits.max_bytes) == (100, 10)
+    assert ResultLimits.combine(0, 0).max_rows is None
+
+
+def test_reads_everything_under_the_caps():
+    limits = ResultLimits(max_rows=10)
+    assert limits.read_result_set(Cursor([(1,), (2,)]), ["id"]) == [{"id": 1}, {"id": 2}]
+    assert limits.report() == {"truncated": False}
+
+
+def test_stops_and_cancels_at_max_rows():
+    cursor = Cursor([(n,) for n in range(10)])
+    limits = ResultLimits(max_rows=3)
+    assert len(limits.read_result_set(cursor, ["id"])) == 3
+    assert cursor.cancelled
+    report = limits.report()
+    assert report["truncatedBy"] == "max_rows"
+    assert report["rowsFetched"] == 3
+    assert report["rowsSkippedEstimate"] == 1
+
+
+def test_skipped_rows_are_unknown_when_the_limit_was_pushed_down():
+    limits = ResultLimits(max_rows=3)
+    limits.pushed_down = True
+    limits.read_result_set(Cursor([(n,) for n in range(4)]), ["id"])
+    assert limits.report()["rowsSkippedEstimate"] is None
+
+
+def test_stops_at_max_bytes():
+    limits = ResultLimits(max_bytes=40)
+    rows = limits.read_result_set(Cursor([("x" * 10,)] * 5), ["name"])
+    assert 0 < len(rows) < 5
+    assert limits.report()["truncatedBy"] == "max_bytes"
+    assert limits.bytes <= 40
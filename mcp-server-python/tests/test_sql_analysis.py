@@ -0,0 +1,106 @@
+import pytest
+
+from sql_analysis import (
+    bind_parameters, compile_named_parameters, is_read_only, limit_select, referenced_tables
+)
+
+
+class TestCompileNamedParameters:
+    def test_replaces_references_in_order(self):
+        compiled = compile_named_parameters("SELECT * FROM t WHERE a = @A AND b = @b", frozenset({"a", "b"}))
+        assert compiled.sql == "SELECT * FROM t WHERE a = ? AND b = ?"
+        assert compiled.slots == ("a", "b")
+
+    def test_skips_strings_comments_and_quoted_names(self):
+        sql = "SELECT '@id', [@id], \"@id\" -- @id\n/* @id */ FROM t WHERE id = @id"
+        compiled = compile_named_parameters(sql, frozenset({"id"}))
+        assert compiled.sql == "SELECT '@id', [@id], \"@id\" -- @id\n/* @id */ FROM t WHERE id = ?"
+        assert compiled.slots == ("id",)
+
+    def test_leaves_system_and_local_variables(self):
+        sql = "DECLARE @n int = @@ROWCOUNT; SELECT @n, @id"
+        compiled = compile_named_parameters(sql, frozenset({"id", "rowcount"}))
+        assert compiled.sql == "DECLARE @n int = @@ROWCOUNT; SELECT @n, ?"
+
+    def test_matches_whole_names_only(self):
+        compiled = compile_named_parameters("SELECT @ID, @ID2, @ID", frozenset({"id"}))
+        assert compiled.sql == "SELECT ?, @ID2, ?"
+        assert compiled.slots == ("id", "id")
+
+
+class TestBindParameters:
+    def test_repeats_values_for_repeated_names(self):
+        sql, values = bind_parameters("SELECT @x + @x, @y", {"@x": 1, "y": 2})
+        assert sql == "SELECT ? + ?, ?"
+        assert values == [1, 1, 2]
+
+    def test_unused_parameter_is_an_error(self):
+        with pytest.raises(ValueError, match="extra"):
+            bind_parameters("SELECT @x", {"x": 1, "extra": 2})
+
+    def test_positional_sql_passes_values_through(self):
+        assert bind_parameters("SELECT ? , ?", {"a": 1, "b": 2}) == ("SELECT ? , ?", [1, 2])
+
+
+class TestIsReadOnly:
+    @pytest.mark.parametrize("sql", [
+        "SELECT * FROM t",
+        "  -- note\nselect 1",
+        "WITH c AS (SELECT 1 AS x) SELECT x FROM c",
+        "DECLARE @n int = 1; SELECT @n",
+        "SELECT 'insert into t' AS text",
+    ])
+    def test_reads(self, sql):
+        assert is_read_only(sql)
+
+    @pytest.mark.parametrize("sql", [
+        "INSERT INTO t VALUES (1)",
+        "SELECT * INTO t2 FROM t",
+        "SELECT * FROM t WITH (UPDLOCK)",
+        "SET NOCOUNT ON; SELECT 1",
+        "SELECT * FROM #temp",
+        "dbo.usp_do_work",
+        "SELECT 1; DELETE FROM t",
+        "",
+    ])
+    def test_writes_or_unknown(self, sql):
+        assert not is_read_only(sql)
+
+
+class TestLimitSelect:
+    def test_adds_top_to_a_plain_select(self):
+        assert limit_select("SELECT * FROM t;", 11) == "SELECT TOP (11) * FROM t;"
+
+    def test_goes_after_distinct_and_ctes(self):
+        sql = "WITH c AS (SELECT TOP 5 x FROM t) SELECT DISTINCT x FROM c"
+        assert limit_select(sql, 3) == "WITH c AS (SELECT TOP 5 x FROM t) SELECT DISTINCT TOP (3) x FROM c"
+
+    def test_subqueries_do_not_count_as_statements(self):
+        assert limit_select("SELECT (SELECT 1) AS a FROM t", 2) == "SELECT TOP (2) (SELECT 1) AS a FROM t"
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT TOP 5 * FROM t",
+        "SELECT * FROM t ORDER BY a OFFSET 0 ROWS FETCH NEXT 5 ROWS ONLY",
+        "SELECT 1 UNION ALL SELECT 2",
+        "SELECT * FROM t FOR JSON PATH",
+        "SELECT @x = a FROM t",
+        "SELECT * INTO t2 FROM t",
+        "SELECT 1; SELECT 2",
+        "DECLARE @x int; SELECT 1",
+        "EXEC dbo.p",
+    ])
+    def test_leaves_other_batches_alone(self, sql):
+        assert limit_select(sql, 10) is None
+
+
+class TestReferencedTables:
+    def test_reads_joined_and_listed_tables(self):
+        sql = "SELECT * FROM Customers c, dbo.Orders o JOIN [Sales].[Order Lines] AS l ON l.id = o.id WHERE 1 = 1"
+        assert referenced_tables(sql) == {"orders", "order lines", "customers"}
+
+    def test_reads_write_targets(self):
+        assert referenced_tables("UPDATE Server.Db.dbo.Accounts SET x = 1") == {"accounts"}
+        assert referenced_tables("INSERT INTO audit (a) SELECT a FROM log") == {"audit", "log"}
+
+    def test_ignores_names_in_strings(self):
+        assert referenced_tables("SELECT 'FROM secret' FROM visible") == {"visible"}